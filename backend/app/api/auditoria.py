@@ -7,15 +7,21 @@ Solo accesible para administradores.
 
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, func, select
 from typing import Optional
 from datetime import datetime, date
+from collections import Counter
 import math
 
-from app.core.database import get_db
-from app.core.deps import get_current_user, get_current_active_admin
+from app.core.audit import condicion_campo_modificado
+from app.core.busqueda import condicion_busqueda
+from app.core.database import get_db, get_async_db
+from app.core.deps import get_current_active_admin, get_current_active_admin_async
+from app.core.pagination import preparar_consulta_cursor, resultado_cursor
 from app.models.user import User
 from app.models.audit_log import AuditLog
+from app.models.auditoria_diaria import AuditoriaDiaria
 from app.schemas.audit_log import (
     AuditLogResponse, 
     AuditLogList, 
@@ -39,48 +45,76 @@ def obtener_filtros(
 
 
 @router.get("", response_model=AuditLogList)
-def listar_logs(
+async def listar_logs(
     page: int = Query(1, ge=1, description="Número de página"),
     size: int = Query(20, ge=1, le=100, description="Tamaño de página"),
     accion: Optional[str] = Query(None, description="Filtrar por acción (crear, editar, eliminar)"),
     entidad: Optional[str] = Query(None, description="Filtrar por entidad"),
+    entidad_id: Optional[int] = Query(None, description="Filtrar por ID del registro (historial de un registro)"),
+    campo: Optional[str] = Query(
+        None,
+        pattern=r"^[a-z_][a-z0-9_]*$",
+        description="Solo entradas que crearon o modificaron este campo (ej: litros_totales)"
+    ),
     usuario_id: Optional[int] = Query(None, description="Filtrar por usuario"),
     fecha_desde: Optional[date] = Query(None, description="Filtrar desde fecha"),
     fecha_hasta: Optional[date] = Query(None, description="Filtrar hasta fecha"),
     search: Optional[str] = Query(None, description="Buscar en descripción o username"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_admin)
+    cursor: Optional[str] = Query(None, description="Cursor de paginación (vacío para la primera página en modo cursor)"),
+    incluir_total: bool = Query(False, description="Calcular el total en modo cursor"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_admin_async)
 ):
     """
     Lista los logs de auditoría con paginación y filtros.
     Solo para administradores (solo lectura).
-    """
-    query = db.query(AuditLog)
     
+    Si se envía `cursor`, se pagina por cursor sobre (fecha_hora, id) en lugar
+    de OFFSET; el total solo se calcula con incluir_total=true.
+    """
     # Filtros
+    condiciones = []
     if accion:
-        query = query.filter(AuditLog.accion == accion)
+        condiciones.append(AuditLog.accion == accion)
     if entidad:
-        query = query.filter(AuditLog.entidad == entidad)
+        condiciones.append(AuditLog.entidad == entidad)
+    if entidad_id is not None:
+        condiciones.append(AuditLog.entidad_id == entidad_id)
+    if campo:
+        condiciones.append(condicion_campo_modificado(campo))
     if usuario_id:
-        query = query.filter(AuditLog.usuario_id == usuario_id)
+        condiciones.append(AuditLog.usuario_id == usuario_id)
     if fecha_desde:
-        query = query.filter(AuditLog.fecha_hora >= datetime.combine(fecha_desde, datetime.min.time()))
+        condiciones.append(AuditLog.fecha_hora >= datetime.combine(fecha_desde, datetime.min.time()))
     if fecha_hasta:
-        query = query.filter(AuditLog.fecha_hora <= datetime.combine(fecha_hasta, datetime.max.time()))
+        condiciones.append(AuditLog.fecha_hora <= datetime.combine(fecha_hasta, datetime.max.time()))
     if search:
-        query = query.filter(
-            (AuditLog.entidad_descripcion.ilike(f"%{search}%")) |
-            (AuditLog.usuario_username.ilike(f"%{search}%"))
-        )
+        condiciones.append(condicion_busqueda(search, AuditLog.entidad_descripcion, AuditLog.usuario_username))
     
-    # Contar total
-    total = query.count()
-    pages = math.ceil(total / size) if total > 0 else 1
+    stmt = select(AuditLog).where(*condiciones)
+    count_stmt = select(func.count(AuditLog.id)).where(*condiciones)
     
-    # Paginación - ordenar por fecha más reciente primero
-    offset = (page - 1) * size
-    items = query.order_by(desc(AuditLog.fecha_hora)).offset(offset).limit(size).all()
+    next_cursor = None
+    if cursor is not None:
+        # Modo cursor: keyset sobre (fecha_hora, id) sin OFFSET
+        total = await db.scalar(count_stmt) if incluir_total else None
+        pages = (math.ceil(total / size) if total > 0 else 1) if total is not None else None
+        stmt = preparar_consulta_cursor(
+            stmt,
+            [AuditLog.fecha_hora, AuditLog.id],
+            cursor,
+            size,
+            orden="fecha_hora:desc"
+        )
+        items, next_cursor = resultado_cursor((await db.execute(stmt)).all(), size, "fecha_hora:desc")
+    else:
+        # Contar total
+        total = await db.scalar(count_stmt)
+        pages = math.ceil(total / size) if total > 0 else 1
+        
+        # Paginación - ordenar por fecha más reciente primero
+        offset = (page - 1) * size
+        items = (await db.scalars(stmt.order_by(desc(AuditLog.fecha_hora)).offset(offset).limit(size))).all()
     
     # Convertir a response con labels
     items_response = []
@@ -95,7 +129,8 @@ def listar_logs(
         total=total,
         page=page,
         size=size,
-        pages=pages
+        pages=pages,
+        next_cursor=next_cursor
     )
 
 
@@ -109,49 +144,49 @@ def obtener_estadisticas(
     """
     Obtiene estadísticas de auditoría.
     Solo para administradores.
-    """
-    from sqlalchemy import func
-    
-    query = db.query(AuditLog)
     
+    Se calculan sobre los contadores diarios (auditoria_diaria) con una sola
+    consulta: el costo depende de los días del rango, no de la cantidad de logs.
+    """
+    condiciones = []
     if fecha_desde:
-        query = query.filter(AuditLog.fecha_hora >= datetime.combine(fecha_desde, datetime.min.time()))
+        condiciones.append(AuditoriaDiaria.fecha >= fecha_desde)
     if fecha_hasta:
-        query = query.filter(AuditLog.fecha_hora <= datetime.combine(fecha_hasta, datetime.max.time()))
-    
-    # Estadísticas por acción
-    stats_accion = query.with_entities(
-        AuditLog.accion,
-        func.count(AuditLog.id).label('cantidad')
-    ).group_by(AuditLog.accion).all()
+        condiciones.append(AuditoriaDiaria.fecha <= fecha_hasta)
     
-    # Estadísticas por entidad
-    stats_entidad = query.with_entities(
-        AuditLog.entidad,
-        func.count(AuditLog.id).label('cantidad')
-    ).group_by(AuditLog.entidad).all()
+    filas = db.query(
+        AuditoriaDiaria.accion,
+        AuditoriaDiaria.entidad,
+        AuditoriaDiaria.usuario_username,
+        func.sum(AuditoriaDiaria.cantidad)
+    ).filter(*condiciones).group_by(
+        AuditoriaDiaria.accion,
+        AuditoriaDiaria.entidad,
+        AuditoriaDiaria.usuario_username
+    ).all()
     
-    # Estadísticas por usuario (top 10)
-    stats_usuario = query.with_entities(
-        AuditLog.usuario_username,
-        func.count(AuditLog.id).label('cantidad')
-    ).group_by(AuditLog.usuario_username).order_by(
-        desc(func.count(AuditLog.id))
-    ).limit(10).all()
+    # Totales por acción, entidad y usuario a partir de la misma consulta
+    stats_accion = Counter()
+    stats_entidad = Counter()
+    stats_usuario = Counter()
+    for accion, entidad, usuario, cantidad in filas:
+        stats_accion[accion] += cantidad
+        stats_entidad[entidad] += cantidad
+        stats_usuario[usuario] += cantidad
     
     return {
-        "total_logs": query.count(),
+        "total_logs": sum(stats_accion.values()),
         "por_accion": [
             {"accion": a, "accion_label": ACCION_LABELS.get(a, a), "cantidad": c}
-            for a, c in stats_accion
+            for a, c in sorted(stats_accion.items())
         ],
         "por_entidad": [
             {"entidad": e, "entidad_label": ENTIDAD_LABELS.get(e, e), "cantidad": c}
-            for e, c in stats_entidad
+            for e, c in sorted(stats_entidad.items())
         ],
         "por_usuario": [
             {"usuario": u or "sistema", "cantidad": c}
-            for u, c in stats_usuario
+            for u, c in stats_usuario.most_common(10)
         ]
     }
 
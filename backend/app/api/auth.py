@@ -1,9 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
-from app.core.security import verify_password, create_access_token, get_password_hash
-from app.core.deps import get_current_user
+from app.core.database import get_db, get_async_db
+from app.core.security import (
+    create_access_token,
+    verify_password_async,
+    verify_and_update_password_async,
+    get_password_hash_async,
+)
+from app.core.deps import get_current_user, get_current_user_async, usuarios_cache
+from app.core.invalidacion import bus_invalidacion
 from app.models.user import User
 from app.schemas.user import UserLogin, Token, UserResponse, UserProfileUpdate, PasswordChange
 
@@ -11,13 +19,15 @@ router = APIRouter(prefix="/auth", tags=["Autenticación"])
 
 
 @router.post("/login", response_model=Token)
-def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """
     Endpoint para iniciar sesión.
     Retorna un token JWT si las credenciales son correctas.
     """
     # Buscar usuario por username
-    user = db.query(User).filter(User.username == user_data.username).first()
+    user = await db.scalar(
+        select(User).options(joinedload(User.role)).where(User.username == user_data.username)
+    )
     
     if not user:
         raise HTTPException(
@@ -26,8 +36,9 @@ def login(user_data: UserLogin, db: Session = Depends(get_db)):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Verificar contraseña
-    if not verify_password(user_data.password, user.hashed_password):
+    # Verificar contraseña (en el pool de hashing, sin bloquear el event loop)
+    valida, nuevo_hash = await verify_and_update_password_async(user_data.password, user.hashed_password)
+    if not valida:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuario o contraseña incorrectos",
@@ -41,6 +52,11 @@ def login(user_data: UserLogin, db: Session = Depends(get_db)):
             detail="Usuario inactivo"
         )
     
+    # Rehash transparente si el hash usa un costo distinto al configurado
+    if nuevo_hash:
+        user.hashed_password = nuevo_hash
+        await db.commit()
+    
     # Crear token
     access_token = create_access_token(
         data={"sub": user.username, "role": user.role.name}
@@ -124,17 +140,17 @@ def update_profile(
 
 
 @router.put("/me/password")
-def change_password(
+async def change_password(
     password_data: PasswordChange,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Cambia la contraseña del usuario autenticado.
     Requiere la contraseña actual y la nueva contraseña.
     """
     # Verificar que la contraseña actual sea correcta
-    if not verify_password(password_data.current_password, current_user.hashed_password):
+    if not await verify_password_async(password_data.current_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="La contraseña actual es incorrecta"
@@ -162,7 +178,12 @@ def change_password(
         )
     
     # Actualizar la contraseña
-    current_user.hashed_password = get_password_hash(password_data.new_password)
-    db.commit()
+    nuevo_hash = await get_password_hash_async(password_data.new_password)
+    await db.execute(
+        update(User).where(User.id == current_user.id).values(hashed_password=nuevo_hash)
+    )
+    # El update() no pasa por el ORM: invalidar el cache del usuario con el commit
+    await db.run_sync(bus_invalidacion.registrar, usuarios_cache.nombre, [current_user.id])
+    await db.commit()
     
     return {"message": "Contraseña actualizada correctamente"}
@@ -1,15 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from typing import Optional
+from typing import List, Optional
 import math
 
 from app.core.database import get_db
+from app.core.autocompletar import indice_clientes
+from app.core.busqueda import condicion_busqueda, orden_busqueda
 from app.core.deps import get_current_user, get_current_active_admin
 from app.core.id_generator import generar_codigo_cliente
 from app.models.user import User
 from app.models.cliente import Cliente
 from app.schemas.cliente import ClienteCreate, ClienteUpdate, ClienteResponse, ClienteList
+from app.schemas.producto import ClienteSimple
 
 router = APIRouter(prefix="/clientes", tags=["Clientes"])
 
@@ -27,12 +30,9 @@ def listar_clientes(
     query = db.query(Cliente)
     
     # Filtros
+    columnas_busqueda = (Cliente.codigo, Cliente.nombre, Cliente.cuit)
     if search:
-        query = query.filter(
-            (Cliente.codigo.ilike(f"%{search}%")) | 
-            (Cliente.nombre.ilike(f"%{search}%")) |
-            (Cliente.cuit.ilike(f"%{search}%"))
-        )
+        query = query.filter(condicion_busqueda(search, *columnas_busqueda))
     if activo is not None:
         query = query.filter(Cliente.activo == activo)
     
@@ -42,6 +42,9 @@ def listar_clientes(
     
     # Paginación
     offset = (page - 1) * size
+    if search:
+        # Más parecidos primero
+        query = query.order_by(orden_busqueda(search, *columnas_busqueda))
     items = query.order_by(Cliente.nombre).offset(offset).limit(size).all()
     
     return ClienteList(
@@ -53,6 +56,23 @@ def listar_clientes(
     )
 
 
+@router.get("/autocomplete", response_model=List[ClienteSimple])
+def autocompletar_clientes(
+    q: str = Query("", max_length=100, description="Inicio del código, nombre (o una de sus palabras) o CUIT"),
+    limite: int = Query(20, ge=1, le=1000, description="Cantidad máxima de resultados"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Clientes activos para autocompletar (solo id, código y nombre).
+    Se resuelve con el índice de prefijos en memoria, sin consultar la base.
+    """
+    return [
+        ClienteSimple(id=id_, codigo=codigo, nombre=nombre)
+        for id_, codigo, nombre in indice_clientes.buscar(db, q, limite)
+    ]
+
+
 @router.get("/{cliente_id}", response_model=ClienteResponse)
 def obtener_cliente(
     cliente_id: int,
@@ -1,14 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from typing import Optional, List
+from collections import defaultdict
 from datetime import datetime, date, time, timedelta
+import json
 import math
 
-from app.core.database import get_db
-from app.core.deps import get_current_user, get_current_active_admin
+from app.core.database import get_db, get_async_db
+from app.core.deps import get_current_user, get_current_user_async, get_current_user_sse, get_current_active_admin
+from app.core.eventos import broadcaster, CANAL_TIMELINE
+from app.core.etag import consulta_version, verificar_etag
+from app.core.catalogos import catalogo_sectores, catalogo_lineas
 from app.core.audit import audit_crear, audit_editar, audit_eliminar, get_client_info, _model_to_dict
 from app.core.id_generator import generar_codigo_estado_linea
+from app.core.pagination import paginar_por_cursor
 from app.models.user import User
 from app.models.estado_linea import EstadoLinea
 from app.models.sector import Sector
@@ -26,9 +35,24 @@ from app.schemas.estado_linea import (
 router = APIRouter(prefix="/estados-linea", tags=["Estados de Línea"])
 
 
+# Labels por valor de tipo de estado (para armar el timeline sin instanciar el enum)
+_LABELS_POR_VALOR = {tipo.value: label for tipo, label in TIPO_ESTADO_LABELS.items()}
+
+_VERSION_TIPOS_ESTADO = tuple(sorted(_LABELS_POR_VALOR.items()))
+
+
 @router.get("/tipos-estado", response_model=list[TipoEstadoOption])
-def listar_tipos_estado(current_user: User = Depends(get_current_user)):
+def listar_tipos_estado(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user)
+):
     """Lista todos los tipos de estado disponibles."""
+    # Lista fija: la versión son los propios valores y labels
+    no_modificado = verificar_etag(request, response, _VERSION_TIPOS_ESTADO)
+    if no_modificado:
+        return no_modificado
+    
     return [
         TipoEstadoOption(value=tipo.value, label=TIPO_ESTADO_LABELS[tipo])
         for tipo in TipoEstadoEnum
@@ -36,12 +60,15 @@ def listar_tipos_estado(current_user: User = Depends(get_current_user)):
 
 
 @router.get("/timeline/{fecha}", response_model=dict)
-def obtener_estados_timeline(
+async def obtener_estados_timeline(
+    request: Request,
+    response: Response,
     fecha: date,
     sector_id: Optional[int] = Query(None, description="Filtrar por sector"),
     linea_id: Optional[int] = Query(None, description="Filtrar por línea"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    incluir_estados: bool = Query(True, description="Incluir la lista plana de estados (duplica los del árbol)"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     Obtiene todos los estados de línea para un día específico, 
@@ -50,113 +77,276 @@ def obtener_estados_timeline(
     Retorna:
     - fecha: La fecha consultada
     - sectores: Lista de sectores con sus líneas y estados
-    - estados: Lista plana de todos los estados del día
+    - estados: Lista plana de todos los estados del día (se omite con incluir_estados=false)
+    
+    Responde 304 si el cliente envía el ETag de la versión actual (If-None-Match).
     """
     # Definir inicio y fin del día
     fecha_inicio = datetime.combine(fecha, time.min)
     fecha_fin = datetime.combine(fecha, time.max)
     
-    # Obtener todos los sectores activos
-    sectores_query = db.query(Sector).filter(Sector.activo == True)
-    if sector_id:
-        sectores_query = sectores_query.filter(Sector.id == sector_id)
-    sectores = sectores_query.order_by(Sector.nombre).all()
-    
-    # Obtener todas las líneas activas
-    lineas_query = db.query(Linea).filter(Linea.activo == True)
+    # Versión: catálogos completos y solo los estados que tocan el día
+    estados_del_dia = [
+        EstadoLinea.fecha_hora_inicio <= fecha_fin,
+        (EstadoLinea.fecha_hora_fin >= fecha_inicio) | (EstadoLinea.fecha_hora_fin == None)
+    ]
+    version = (await db.execute(
+        consulta_version(Sector, Linea, User, (EstadoLinea, estados_del_dia))
+    )).one()
+    no_modificado = verificar_etag(request, response, version)
+    if no_modificado:
+        return no_modificado
+    
+    # Sectores y líneas activos desde el cache de catálogos (mismo orden: nombre, id)
+    sectores, lineas = await db.run_sync(
+        lambda sesion: (catalogo_sectores.listar(sesion), catalogo_lineas.listar(sesion))
+    )
     if sector_id:
-        lineas_query = lineas_query.filter(Linea.sector_id == sector_id)
-    if linea_id:
-        lineas_query = lineas_query.filter(Linea.id == linea_id)
-    lineas = lineas_query.order_by(Linea.sector_id, Linea.nombre).all()
-    
-    # Query de estados para el día
-    estados_query = db.query(EstadoLinea).options(
-        joinedload(EstadoLinea.sector),
-        joinedload(EstadoLinea.linea),
-        joinedload(EstadoLinea.usuario)
-    ).filter(
+        sectores = [sector for sector in sectores if sector["id"] == sector_id]
+    ids_sectores = {sector["id"] for sector in sectores}
+    lineas_por_sector = defaultdict(list)
+    for linea in lineas:
+        if linea["sector_id"] in ids_sectores and (not linea_id or linea["id"] == linea_id):
+            lineas_por_sector[linea["sector_id"]].append(linea)
+    ids_lineas = [linea["id"] for lineas_sector in lineas_por_sector.values() for linea in lineas_sector]
+    
+    # Solo se consultan los estados activos que se superponen con el día
+    # (comienzan antes del fin del día y terminan después del inicio, o siguen
+    # abiertos). La lista plana lleva todos, también los de líneas o sectores
+    # inactivos; sin ella alcanza con los de las líneas del árbol.
+    condiciones_estado = [
         EstadoLinea.activo == True,
-        # Estados que comienzan en el día O que terminan en el día O que abarcan todo el día
-        (
-            (EstadoLinea.fecha_hora_inicio >= fecha_inicio) & 
-            (EstadoLinea.fecha_hora_inicio <= fecha_fin)
-        ) | (
-            (EstadoLinea.fecha_hora_fin >= fecha_inicio) & 
-            (EstadoLinea.fecha_hora_fin <= fecha_fin)
-        ) | (
-            (EstadoLinea.fecha_hora_inicio <= fecha_inicio) & 
-            (
-                (EstadoLinea.fecha_hora_fin >= fecha_fin) | 
-                (EstadoLinea.fecha_hora_fin == None)
-            )
-        )
-    )
-    
-    # Aplicar filtros adicionales
+        EstadoLinea.fecha_hora_inicio <= fecha_fin,
+        (EstadoLinea.fecha_hora_fin >= fecha_inicio) | (EstadoLinea.fecha_hora_fin == None)
+    ]
     if sector_id:
-        estados_query = estados_query.filter(EstadoLinea.sector_id == sector_id)
+        condiciones_estado.append(EstadoLinea.sector_id == sector_id)
     if linea_id:
-        estados_query = estados_query.filter(EstadoLinea.linea_id == linea_id)
+        condiciones_estado.append(EstadoLinea.linea_id == linea_id)
+    if not incluir_estados:
+        condiciones_estado.append(EstadoLinea.linea_id.in_(ids_lineas))
     
-    estados = estados_query.order_by(EstadoLinea.fecha_hora_inicio).all()
-    
-    # Convertir estados a diccionarios con labels
     estados_response = []
-    for estado in estados:
-        estado_dict = {
-            "id": estado.id,
-            "sector_id": estado.sector_id,
-            "linea_id": estado.linea_id,
-            "tipo_estado": estado.tipo_estado,
-            "fecha_hora_inicio": estado.fecha_hora_inicio.isoformat() if estado.fecha_hora_inicio else None,
-            "fecha_hora_fin": estado.fecha_hora_fin.isoformat() if estado.fecha_hora_fin else None,
-            "duracion_minutos": estado.duracion_minutos,
-            "observaciones": estado.observaciones,
-            "sector": {"id": estado.sector.id, "nombre": estado.sector.nombre} if estado.sector else None,
-            "linea": {"id": estado.linea.id, "nombre": estado.linea.nombre} if estado.linea else None,
-            "usuario": {
-                "id": estado.usuario.id, 
-                "username": estado.usuario.username,
-                "full_name": estado.usuario.full_name
-            } if estado.usuario else None,
-        }
-        
-        # Agregar label del tipo de estado
-        try:
-            tipo_enum = TipoEstadoEnum(estado.tipo_estado)
-            estado_dict["tipo_estado_label"] = TIPO_ESTADO_LABELS.get(tipo_enum, estado.tipo_estado)
-        except ValueError:
-            estado_dict["tipo_estado_label"] = estado.tipo_estado
-        
-        estados_response.append(estado_dict)
-    
-    # Organizar sectores con sus líneas
-    sectores_response = []
-    for sector in sectores:
-        lineas_sector = [l for l in lineas if l.sector_id == sector.id]
-        sectores_response.append({
-            "id": sector.id,
-            "nombre": sector.nombre,
+    estados_por_linea = defaultdict(list)
+    if incluir_estados or ids_lineas:
+        stmt = select(
+            EstadoLinea.id.label("estado_id"),
+            EstadoLinea.sector_id,
+            EstadoLinea.linea_id,
+            EstadoLinea.tipo_estado,
+            EstadoLinea.fecha_hora_inicio,
+            EstadoLinea.fecha_hora_fin,
+            EstadoLinea.duracion_minutos,
+            EstadoLinea.observaciones,
+            Sector.nombre.label("sector_nombre"),
+            Linea.nombre.label("linea_nombre"),
+            User.id.label("usuario_id"),
+            User.username,
+            User.full_name,
+        ).select_from(EstadoLinea).outerjoin(
+            Sector, EstadoLinea.sector_id == Sector.id
+        ).outerjoin(
+            Linea, EstadoLinea.linea_id == Linea.id
+        ).outerjoin(
+            User, EstadoLinea.usuario_id == User.id
+        ).where(
+            *condiciones_estado
+        ).order_by(
+            EstadoLinea.fecha_hora_inicio
+        )
+        for fila in (await db.execute(stmt)).all():
+            estado = {
+                "id": fila.estado_id,
+                "sector_id": fila.sector_id,
+                "linea_id": fila.linea_id,
+                "tipo_estado": fila.tipo_estado,
+                "tipo_estado_label": _LABELS_POR_VALOR.get(fila.tipo_estado, fila.tipo_estado),
+                "fecha_hora_inicio": fila.fecha_hora_inicio.isoformat() if fila.fecha_hora_inicio else None,
+                "fecha_hora_fin": fila.fecha_hora_fin.isoformat() if fila.fecha_hora_fin else None,
+                "duracion_minutos": fila.duracion_minutos,
+                "observaciones": fila.observaciones,
+                "sector": {"id": fila.sector_id, "nombre": fila.sector_nombre} if fila.sector_nombre is not None else None,
+                "linea": {"id": fila.linea_id, "nombre": fila.linea_nombre} if fila.linea_nombre is not None else None,
+                "usuario": {
+                    "id": fila.usuario_id,
+                    "username": fila.username,
+                    "full_name": fila.full_name
+                } if fila.usuario_id is not None else None,
+            }
+            estados_response.append(estado)
+            estados_por_linea[fila.linea_id].append(estado)
+    
+    # Árbol sector → línea → estado (sectores y líneas activos)
+    sectores_response = [
+        {
+            "id": datos_sector["id"],
+            "nombre": datos_sector["nombre"],
             "lineas": [
                 {
-                    "id": linea.id,
-                    "nombre": linea.nombre,
-                    "estados": [e for e in estados_response if e["linea_id"] == linea.id]
+                    "id": datos_linea["id"],
+                    "nombre": datos_linea["nombre"],
+                    "estados": estados_por_linea[datos_linea["id"]],
                 }
-                for linea in lineas_sector
-            ]
-        })
+                for datos_linea in lineas_por_sector[datos_sector["id"]]
+            ],
+        }
+        for datos_sector in sectores
+    ]
     
-    return {
+    respuesta = {
         "fecha": fecha.isoformat(),
         "sectores": sectores_response,
-        "estados": estados_response,
         "tipos_estado": [
             {"value": tipo.value, "label": TIPO_ESTADO_LABELS[tipo]}
             for tipo in TipoEstadoEnum
         ]
     }
+    if incluir_estados:
+        # Todos los estados activos del día por hora de inicio
+        respuesta["estados"] = estados_response
+    return respuesta
+
+
+# Segundos sin eventos tras los que se envía un comentario para mantener viva la conexión SSE
+INTERVALO_PING_SSE = 15
+
+
+def _estado_timeline(estado: EstadoLinea) -> dict:
+    """Estado con el mismo formato que en el timeline (relaciones ya cargadas)."""
+    return {
+        "id": estado.id,
+        "sector_id": estado.sector_id,
+        "linea_id": estado.linea_id,
+        "tipo_estado": estado.tipo_estado,
+        "tipo_estado_label": _LABELS_POR_VALOR.get(estado.tipo_estado, estado.tipo_estado),
+        "fecha_hora_inicio": estado.fecha_hora_inicio.isoformat() if estado.fecha_hora_inicio else None,
+        "fecha_hora_fin": estado.fecha_hora_fin.isoformat() if estado.fecha_hora_fin else None,
+        "duracion_minutos": estado.duracion_minutos,
+        "observaciones": estado.observaciones,
+        "activo": estado.activo,
+        "sector": {"id": estado.sector.id, "nombre": estado.sector.nombre} if estado.sector else None,
+        "linea": {"id": estado.linea.id, "nombre": estado.linea.nombre} if estado.linea else None,
+        "usuario": {
+            "id": estado.usuario.id,
+            "username": estado.usuario.username,
+            "full_name": estado.usuario.full_name
+        } if estado.usuario else None,
+    }
+
+
+def _ubicacion_estado(datos: dict) -> dict:
+    """Campos que definen en qué timeline aparece un estado."""
+    return {
+        "id": datos["id"],
+        "sector_id": datos["sector_id"],
+        "linea_id": datos["linea_id"],
+        "fecha_hora_inicio": datos["fecha_hora_inicio"],
+        "fecha_hora_fin": datos["fecha_hora_fin"],
+    }
+
+
+def _en_timeline(
+    ubicacion: dict,
+    fecha_inicio: datetime,
+    fecha_fin: datetime,
+    sector_id: Optional[int],
+    linea_id: Optional[int]
+) -> bool:
+    """Indica si un estado aparece en el timeline del día y filtros dados."""
+    if sector_id and ubicacion["sector_id"] != sector_id:
+        return False
+    if linea_id and ubicacion["linea_id"] != linea_id:
+        return False
+    if not ubicacion["fecha_hora_inicio"]:
+        return False
+    inicio = datetime.fromisoformat(ubicacion["fecha_hora_inicio"])
+    fin = datetime.fromisoformat(ubicacion["fecha_hora_fin"]) if ubicacion["fecha_hora_fin"] else None
+    # Comparar sin zona horaria, igual que la consulta del timeline
+    inicio = inicio.replace(tzinfo=None)
+    fin = fin.replace(tzinfo=None) if fin else None
+    return inicio <= fecha_fin and (fin is None or fin >= fecha_inicio)
+
+
+def _delta_timeline(
+    evento: dict,
+    fecha: date,
+    sector_id: Optional[int],
+    linea_id: Optional[int]
+) -> Optional[dict]:
+    """
+    Traduce un evento del canal timeline al delta que necesita un suscriptor
+    (día y filtros), o None si no le afecta.
+    """
+    fecha_inicio = datetime.combine(fecha, time.min)
+    fecha_fin = datetime.combine(fecha, time.max)
+    tipo = evento.get("tipo")
+    
+    if tipo == "estado":
+        estado = evento["estado"]
+        if estado.get("activo", True) and _en_timeline(estado, fecha_inicio, fecha_fin, sector_id, linea_id):
+            return {"tipo": "estado", "estado": estado}
+        # Dejó de aparecer en este timeline (cambió de día, línea o se desactivó)
+        anterior = evento.get("anterior")
+        if anterior and _en_timeline(anterior, fecha_inicio, fecha_fin, sector_id, linea_id):
+            return {"tipo": "estado_eliminado", "id": estado["id"]}
+        return None
+    
+    if tipo == "estado_eliminado":
+        if _en_timeline(evento["estado"], fecha_inicio, fecha_fin, sector_id, linea_id):
+            return {"tipo": "estado_eliminado", "id": evento["estado"]["id"]}
+        return None
+    
+    if tipo == "lote":
+        if evento["lote"]["fecha_produccion"] == fecha.isoformat():
+            return evento
+        return None
+    
+    # resync u otros: el cliente vuelve a pedir el timeline completo
+    return evento
+
+
+@router.get("/timeline/{fecha}/eventos")
+async def eventos_timeline(
+    fecha: date,
+    request: Request,
+    sector_id: Optional[int] = Query(None, description="Filtrar por sector"),
+    linea_id: Optional[int] = Query(None, description="Filtrar por línea"),
+    current_user: User = Depends(get_current_user_sse)
+):
+    """
+    Cambios del timeline en tiempo real (Server-Sent Events).
+    
+    Cada mensaje es un JSON con "tipo":
+    - estado: estado nuevo o modificado (mismo formato que en el timeline)
+    - estado_eliminado: id del estado que ya no corresponde mostrar
+    - lote: lote creado, modificado o eliminado en el día
+    - resync: el cliente debe volver a pedir el timeline completo
+    
+    El token se envía como query param (?token=) porque EventSource no
+    permite headers.
+    """
+    suscripcion = broadcaster.suscribir(CANAL_TIMELINE)
+    
+    async def generar():
+        try:
+            # Tiempo de reconexión del navegador si se corta la conexión
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                evento = await suscripcion.siguiente(INTERVALO_PING_SSE)
+                if evento is None:
+                    yield ": ping\n\n"
+                    continue
+                delta = _delta_timeline(evento, fecha, sector_id, linea_id)
+                if delta is not None:
+                    yield f"data: {json.dumps(delta, default=str)}\n\n"
+        finally:
+            broadcaster.cancelar(suscripcion)
+    
+    return StreamingResponse(
+        generar(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.get("", response_model=EstadoLineaList)
@@ -169,10 +359,17 @@ def listar_estados(
     fecha_desde: Optional[datetime] = Query(None, description="Filtrar desde fecha"),
     fecha_hasta: Optional[datetime] = Query(None, description="Filtrar hasta fecha"),
     activo: Optional[bool] = Query(None, description="Filtrar por estado activo"),
+    cursor: Optional[str] = Query(None, description="Cursor de paginación (vacío para la primera página en modo cursor)"),
+    incluir_total: bool = Query(False, description="Calcular el total en modo cursor"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Lista todos los estados de línea con paginación y filtros."""
+    """
+    Lista todos los estados de línea con paginación y filtros.
+    
+    Si se envía `cursor`, se pagina por cursor sobre (fecha_hora_inicio, id)
+    en lugar de OFFSET; el total solo se calcula con incluir_total=true.
+    """
     query = db.query(EstadoLinea).options(
         joinedload(EstadoLinea.sector),
         joinedload(EstadoLinea.linea),
@@ -193,13 +390,26 @@ def listar_estados(
     if activo is not None:
         query = query.filter(EstadoLinea.activo == activo)
     
-    # Contar total
-    total = query.count()
-    pages = math.ceil(total / size) if total > 0 else 1
-    
-    # Paginación - ordenar por fecha más reciente primero
-    offset = (page - 1) * size
-    items = query.order_by(EstadoLinea.fecha_hora_inicio.desc()).offset(offset).limit(size).all()
+    next_cursor = None
+    if cursor is not None:
+        # Modo cursor: keyset sobre (fecha_hora_inicio, id) sin OFFSET
+        total = query.count() if incluir_total else None
+        pages = (math.ceil(total / size) if total > 0 else 1) if total is not None else None
+        items, next_cursor = paginar_por_cursor(
+            query,
+            [EstadoLinea.fecha_hora_inicio, EstadoLinea.id],
+            cursor,
+            size,
+            orden="fecha_hora_inicio:desc"
+        )
+    else:
+        # Contar total
+        total = query.count()
+        pages = math.ceil(total / size) if total > 0 else 1
+        
+        # Paginación - ordenar por fecha más reciente primero
+        offset = (page - 1) * size
+        items = query.order_by(EstadoLinea.fecha_hora_inicio.desc()).offset(offset).limit(size).all()
     
     # Convertir a response con labels
     items_response = []
@@ -217,7 +427,8 @@ def listar_estados(
         total=total,
         page=page,
         size=size,
-        pages=pages
+        pages=pages,
+        next_cursor=next_cursor
     )
 
 
@@ -259,7 +470,7 @@ def crear_estado(
 ):
     """Crea un nuevo estado de línea."""
     # Verificar que el sector exista
-    sector = db.query(Sector).filter(Sector.id == estado_data.sector_id).first()
+    sector = catalogo_sectores.obtener(db, estado_data.sector_id)
     if not sector:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -267,13 +478,13 @@ def crear_estado(
         )
     
     # Verificar que la línea exista y pertenezca al sector
-    linea = db.query(Linea).filter(Linea.id == estado_data.linea_id).first()
+    linea = catalogo_lineas.obtener(db, estado_data.linea_id)
     if not linea:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="La línea especificada no existe"
         )
-    if linea.sector_id != estado_data.sector_id:
+    if linea["sector_id"] != estado_data.sector_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="La línea no pertenece al sector seleccionado"
@@ -299,7 +510,8 @@ def crear_estado(
     db.add(estado)
     
     try:
-        db.commit()
+        # Un solo commit: el cambio y su auditoría
+        db.flush()
         db.refresh(estado)
         
         # Registrar auditoría
@@ -309,7 +521,7 @@ def crear_estado(
             usuario=current_user,
             entidad="estado_linea",
             registro=estado,
-            descripcion=f"Estado: {estado_data.tipo_estado.value} en línea {linea.nombre}",
+            descripcion=f"Estado: {estado_data.tipo_estado.value} en línea {linea['nombre']}",
             ip_address=ip_address,
             user_agent=user_agent
         )
@@ -328,6 +540,8 @@ def crear_estado(
         joinedload(EstadoLinea.usuario)
     ).filter(EstadoLinea.id == estado.id).first()
     
+    broadcaster.publicar(CANAL_TIMELINE, {"tipo": "estado", "estado": _estado_timeline(estado)})
+    
     response = EstadoLineaResponse.model_validate(estado)
     try:
         tipo_enum = TipoEstadoEnum(estado.tipo_estado)
@@ -354,14 +568,15 @@ def actualizar_estado(
             detail="Estado de línea no encontrado"
         )
     
-    # Guardar datos anteriores para auditoría
+    # Guardar datos anteriores para auditoría y para avisar al timeline
     datos_anteriores = _model_to_dict(estado)
+    ubicacion_anterior = _ubicacion_estado(datos_anteriores)
     
     update_data = estado_data.model_dump(exclude_unset=True)
     
     # Verificar sector si se está cambiando
     if 'sector_id' in update_data:
-        sector = db.query(Sector).filter(Sector.id == update_data['sector_id']).first()
+        sector = catalogo_sectores.obtener(db, update_data['sector_id'])
         if not sector:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -370,7 +585,7 @@ def actualizar_estado(
     
     # Verificar línea si se está cambiando
     if 'linea_id' in update_data:
-        linea = db.query(Linea).filter(Linea.id == update_data['linea_id']).first()
+        linea = catalogo_lineas.obtener(db, update_data['linea_id'])
         if not linea:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -378,7 +593,7 @@ def actualizar_estado(
             )
         # Verificar que la línea pertenezca al sector
         sector_id = update_data.get('sector_id', estado.sector_id)
-        if linea.sector_id != sector_id:
+        if linea["sector_id"] != sector_id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="La línea no pertenece al sector seleccionado"
@@ -401,7 +616,8 @@ def actualizar_estado(
         setattr(estado, field, value)
     
     try:
-        db.commit()
+        # Un solo commit: el cambio y su auditoría
+        db.flush()
         db.refresh(estado)
         
         # Registrar auditoría
@@ -431,6 +647,12 @@ def actualizar_estado(
         joinedload(EstadoLinea.usuario)
     ).filter(EstadoLinea.id == estado.id).first()
     
+    broadcaster.publicar(CANAL_TIMELINE, {
+        "tipo": "estado",
+        "estado": _estado_timeline(estado),
+        "anterior": ubicacion_anterior
+    })
+    
     response = EstadoLineaResponse.model_validate(estado)
     try:
         tipo_enum = TipoEstadoEnum(estado.tipo_estado)
@@ -468,6 +690,9 @@ def eliminar_estado(
         user_agent=user_agent
     )
     
+    ubicacion = _ubicacion_estado(_model_to_dict(estado))
     db.delete(estado)
     db.commit()
+    
+    broadcaster.publicar(CANAL_TIMELINE, {"tipo": "estado_eliminado", "estado": ubicacion})
     return None
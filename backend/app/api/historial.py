@@ -3,26 +3,32 @@ API de Historial de Producción.
 
 Este módulo implementa:
 - Consulta de historial de lotes con filtros avanzados
-- Exportación a CSV
+- Exportación a CSV (streaming)
 - Estadísticas de producción
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, desc, asc, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, desc, asc, and_, or_, select
 from typing import Optional, List
 from datetime import date, datetime
 import csv
 import io
 
-from app.core.database import get_db
-from app.core.deps import get_current_user
-from app.models import Lote, Producto, User
+from app.core.busqueda import condicion_busqueda
+from app.core.database import get_db, get_async_db, SessionLocal
+from app.core.pagination import preparar_consulta_cursor, resultado_cursor
+from app.core.deps import get_current_user, get_current_user_async
+from app.models import Lote, Producto, ProduccionDiaria, User
 from app.schemas.lote import LoteResponse, LoteList
 
 router = APIRouter(prefix="/historial", tags=["Historial"])
 
+# Campos por los que se puede ordenar el historial (offset y cursor)
+ORDEN_CAMPOS = ("fecha_produccion", "numero_lote", "litros_totales", "created_at")
+
 
 # ============================================================================
 # SCHEMAS ESPECÍFICOS DE HISTORIAL
@@ -57,28 +63,46 @@ class HistorialResponse(BaseModel):
     items: List[LoteResponse]
     estadisticas: HistorialEstadisticas
     filtros_aplicados: dict
-    total: int
+    total: Optional[int] = None  # None en modo cursor si no se pide el total
     page: int
     size: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # Cursor de la página siguiente (modo cursor)
 
 
 # ============================================================================
 # ENDPOINTS
 # ============================================================================
 
+def _condiciones_acumulado(
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    producto_id: Optional[int] = None
+) -> list:
+    """Filtros del historial aplicados a la tabla produccion_diaria."""
+    condiciones = []
+    if fecha_desde:
+        condiciones.append(ProduccionDiaria.fecha >= fecha_desde)
+    if fecha_hasta:
+        condiciones.append(ProduccionDiaria.fecha <= fecha_hasta)
+    if producto_id:
+        condiciones.append(ProduccionDiaria.producto_id == producto_id)
+    return condiciones
+
+
 @router.get("", response_model=HistorialResponse)
-def get_historial(
+async def get_historial(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
     fecha_desde: Optional[date] = None,
     fecha_hasta: Optional[date] = None,
     producto_id: Optional[int] = None,
     numero_lote: Optional[str] = None,
-    orden_campo: str = Query("fecha_produccion", regex="^(fecha_produccion|numero_lote|litros_totales|created_at)$"),
+    orden_campo: str = Query("fecha_produccion", regex=f"^({'|'.join(ORDEN_CAMPOS)})$"),
     orden_direccion: str = Query("desc", regex="^(asc|desc)$"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    cursor: Optional[str] = Query(None, description="Cursor de paginación (vacío para la primera página en modo cursor)"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     Obtener historial de producción con filtros avanzados.
@@ -92,42 +116,56 @@ def get_historial(
     Ordenamiento:
     - orden_campo: fecha_produccion, numero_lote, litros_totales, created_at
     - orden_direccion: asc (ascendente) o desc (descendente)
-    """
-    # Construir query base
-    query = db.query(Lote).options(
-        joinedload(Lote.producto),
-        joinedload(Lote.estado_linea)
-    ).filter(Lote.activo == True)
     
+    Paginación:
+    - page/size: paginación tradicional con OFFSET
+    - cursor: paginación por cursor sobre (orden_campo, id); enviar vacío para
+      la primera página
+    """
     # Aplicar filtros
+    condiciones = [Lote.activo == True]
     filtros_aplicados = {}
     
     if fecha_desde:
-        query = query.filter(Lote.fecha_produccion >= fecha_desde)
+        condiciones.append(Lote.fecha_produccion >= fecha_desde)
         filtros_aplicados["fecha_desde"] = fecha_desde.isoformat()
     
     if fecha_hasta:
-        query = query.filter(Lote.fecha_produccion <= fecha_hasta)
+        condiciones.append(Lote.fecha_produccion <= fecha_hasta)
         filtros_aplicados["fecha_hasta"] = fecha_hasta.isoformat()
     
     if producto_id:
-        query = query.filter(Lote.producto_id == producto_id)
+        condiciones.append(Lote.producto_id == producto_id)
         filtros_aplicados["producto_id"] = producto_id
     
     if numero_lote:
-        query = query.filter(Lote.numero_lote.ilike(f"%{numero_lote}%"))
+        condiciones.append(condicion_busqueda(numero_lote, Lote.numero_lote))
         filtros_aplicados["numero_lote"] = numero_lote
     
-    # Calcular estadísticas antes de paginar
-    stats_query = query.with_entities(
-        func.count(Lote.id).label("total_lotes"),
-        func.coalesce(func.sum(Lote.litros_totales), 0).label("total_litros"),
-        func.coalesce(func.sum(Lote.pallets), 0).label("total_pallets"),
-        func.coalesce(func.sum(Lote.parciales), 0).label("total_parciales"),
-        func.count(func.distinct(Lote.producto_id)).label("productos_unicos"),
-        func.min(Lote.fecha_produccion).label("fecha_primer_lote"),
-        func.max(Lote.fecha_produccion).label("fecha_ultimo_lote")
-    ).first()
+    # Calcular estadísticas antes de paginar. Sin filtro por número de lote
+    # se responden desde el acumulado diario (no recorren toda la tabla lotes)
+    if numero_lote:
+        stats_stmt = select(
+            func.count(Lote.id).label("total_lotes"),
+            func.coalesce(func.sum(Lote.litros_totales), 0).label("total_litros"),
+            func.coalesce(func.sum(Lote.pallets), 0).label("total_pallets"),
+            func.coalesce(func.sum(Lote.parciales), 0).label("total_parciales"),
+            func.count(func.distinct(Lote.producto_id)).label("productos_unicos"),
+            func.min(Lote.fecha_produccion).label("fecha_primer_lote"),
+            func.max(Lote.fecha_produccion).label("fecha_ultimo_lote")
+        ).where(*condiciones)
+    else:
+        stats_stmt = select(
+            func.coalesce(func.sum(ProduccionDiaria.total_lotes), 0).label("total_lotes"),
+            func.coalesce(func.sum(ProduccionDiaria.total_litros), 0).label("total_litros"),
+            func.coalesce(func.sum(ProduccionDiaria.total_pallets), 0).label("total_pallets"),
+            func.coalesce(func.sum(ProduccionDiaria.total_parciales), 0).label("total_parciales"),
+            func.count(func.distinct(ProduccionDiaria.producto_id)).label("productos_unicos"),
+            func.min(ProduccionDiaria.fecha).label("fecha_primer_lote"),
+            func.max(ProduccionDiaria.fecha).label("fecha_ultimo_lote")
+        ).where(*_condiciones_acumulado(fecha_desde, fecha_hasta, producto_id))
+    
+    stats_query = (await db.execute(stats_stmt)).first()
     
     estadisticas = HistorialEstadisticas(
         total_lotes=stats_query.total_lotes or 0,
@@ -139,21 +177,53 @@ def get_historial(
         fecha_ultimo_lote=stats_query.fecha_ultimo_lote
     )
     
+    # El total ya viene en las estadísticas (mismos filtros)
+    total = estadisticas.total_lotes
+    pages = (total + size - 1) // size if total > 0 else 1
+    
+    stmt = select(Lote).options(
+        joinedload(Lote.producto),
+        joinedload(Lote.estado_linea)
+    ).where(*condiciones)
+    
+    # Modo cursor: keyset sobre (orden_campo, id) sin OFFSET
+    if cursor is not None:
+        orden_columna = getattr(Lote, orden_campo)
+        if orden_campo == "litros_totales":
+            # Columna nullable: comparar sin NULLs para que el keyset sea consistente
+            orden_columna = func.coalesce(Lote.litros_totales, 0)
+        orden = f"{orden_campo}:{orden_direccion}"
+        stmt = preparar_consulta_cursor(
+            stmt,
+            [orden_columna, Lote.id],
+            cursor,
+            size,
+            descendente=orden_direccion == "desc",
+            orden=orden
+        )
+        items, next_cursor = resultado_cursor((await db.execute(stmt)).all(), size, orden)
+        return HistorialResponse(
+            items=[LoteResponse.model_validate(item) for item in items],
+            estadisticas=estadisticas,
+            filtros_aplicados=filtros_aplicados,
+            total=total,
+            page=page,
+            size=size,
+            pages=pages,
+            next_cursor=next_cursor
+        )
+    
     # Aplicar ordenamiento
     orden_columna = getattr(Lote, orden_campo, Lote.fecha_produccion)
     if orden_direccion == "desc":
-        query = query.order_by(desc(orden_columna))
+        stmt = stmt.order_by(desc(orden_columna))
     else:
-        query = query.order_by(asc(orden_columna))
-    
-    # Contar total
-    total = query.count()
+        stmt = stmt.order_by(asc(orden_columna))
     
     # Paginación
-    pages = (total + size - 1) // size if total > 0 else 1
     offset = (page - 1) * size
     
-    items = query.offset(offset).limit(size).all()
+    items = (await db.scalars(stmt.offset(offset).limit(size))).all()
     
     return HistorialResponse(
         items=[LoteResponse.model_validate(item) for item in items],
@@ -166,6 +236,67 @@ def get_historial(
     )
 
 
+# Columnas del CSV (encabezado y columna de origen)
+COLUMNAS_CSV = [
+    ("Nº Lote", Lote.numero_lote),
+    ("Producto Código", Producto.codigo),
+    ("Producto Nombre", Producto.nombre),
+    ("Pallets", Lote.pallets),
+    ("Parciales", Lote.parciales),
+    ("Unid/Pallet", Lote.unidades_por_pallet),
+    ("Litros Totales", Lote.litros_totales),
+    ("Fecha Producción", Lote.fecha_produccion),
+    ("Fecha Vencimiento", Lote.fecha_vencimiento),
+    ("Link SENASA", Lote.link_senasa),
+    ("Observaciones", Lote.observaciones),
+]
+
+# Filas que se acumulan antes de enviar un bloque del CSV
+FILAS_POR_BLOQUE_CSV = 1000
+
+
+def _generar_csv(stmt):
+    """
+    Genera el CSV por bloques a medida que se leen las filas.
+    
+    Usa su propia sesión (la del request puede cerrarse antes de que
+    termine el streaming) y un cursor del lado del servidor (yield_per),
+    de modo que la memoria usada no depende de la cantidad de lotes.
+    """
+    db = SessionLocal()
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=';')
+        
+        # Encabezados
+        writer.writerow([encabezado for encabezado, _ in COLUMNAS_CSV])
+        yield buffer.getvalue()
+        
+        result = db.execute(stmt.execution_options(yield_per=FILAS_POR_BLOQUE_CSV))
+        for filas in result.partitions():
+            buffer.seek(0)
+            buffer.truncate(0)
+            for (numero_lote, producto_codigo, producto_nombre, pallets, parciales,
+                 unidades_por_pallet, litros_totales, fecha_produccion,
+                 fecha_vencimiento, link_senasa, observaciones) in filas:
+                writer.writerow([
+                    numero_lote,
+                    producto_codigo or "",
+                    producto_nombre or "",
+                    pallets,
+                    parciales,
+                    unidades_por_pallet,
+                    litros_totales or 0,
+                    fecha_produccion.isoformat() if fecha_produccion else "",
+                    fecha_vencimiento.isoformat() if fecha_vencimiento else "",
+                    link_senasa or "",
+                    observaciones or ""
+                ])
+            yield buffer.getvalue()
+    finally:
+        db.close()
+
+
 @router.get("/exportar/csv")
 def exportar_historial_csv(
     fecha_desde: Optional[date] = None,
@@ -174,86 +305,48 @@ def exportar_historial_csv(
     numero_lote: Optional[str] = None,
     orden_campo: str = Query("fecha_produccion"),
     orden_direccion: str = Query("desc"),
-    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Exportar historial a CSV.
     
     Devuelve un archivo CSV con todos los lotes que coincidan con los filtros.
+    El archivo se envía por bloques a medida que se leen los lotes, sin
+    cargarlos todos en memoria.
     """
-    # Construir query base
-    query = db.query(Lote).options(
-        joinedload(Lote.producto)
-    ).filter(Lote.activo == True)
+    # Solo las columnas necesarias, sin cargar objetos Lote/Producto completos
+    stmt = select(*[columna for _, columna in COLUMNAS_CSV]).outerjoin(
+        Producto, Lote.producto_id == Producto.id
+    ).where(Lote.activo == True)
     
     # Aplicar filtros
     if fecha_desde:
-        query = query.filter(Lote.fecha_produccion >= fecha_desde)
+        stmt = stmt.where(Lote.fecha_produccion >= fecha_desde)
     
     if fecha_hasta:
-        query = query.filter(Lote.fecha_produccion <= fecha_hasta)
+        stmt = stmt.where(Lote.fecha_produccion <= fecha_hasta)
     
     if producto_id:
-        query = query.filter(Lote.producto_id == producto_id)
+        stmt = stmt.where(Lote.producto_id == producto_id)
     
     if numero_lote:
-        query = query.filter(Lote.numero_lote.ilike(f"%{numero_lote}%"))
+        stmt = stmt.where(condicion_busqueda(numero_lote, Lote.numero_lote))
     
     # Aplicar ordenamiento
-    orden_columna = getattr(Lote, orden_campo, Lote.fecha_produccion)
+    if orden_campo not in ORDEN_CAMPOS:
+        orden_campo = "fecha_produccion"
+    orden_columna = getattr(Lote, orden_campo)
     if orden_direccion == "desc":
-        query = query.order_by(desc(orden_columna))
+        stmt = stmt.order_by(desc(orden_columna))
     else:
-        query = query.order_by(asc(orden_columna))
-    
-    # Obtener todos los resultados (sin paginación)
-    lotes = query.all()
-    
-    # Crear CSV en memoria
-    output = io.StringIO()
-    writer = csv.writer(output, delimiter=';')
-    
-    # Encabezados
-    writer.writerow([
-        "Nº Lote",
-        "Producto Código",
-        "Producto Nombre",
-        "Pallets",
-        "Parciales",
-        "Unid/Pallet",
-        "Litros Totales",
-        "Fecha Producción",
-        "Fecha Vencimiento",
-        "Link SENASA",
-        "Observaciones"
-    ])
-    
-    # Datos
-    for lote in lotes:
-        writer.writerow([
-            lote.numero_lote,
-            lote.producto.codigo if lote.producto else "",
-            lote.producto.nombre if lote.producto else "",
-            lote.pallets,
-            lote.parciales,
-            lote.unidades_por_pallet,
-            lote.litros_totales or 0,
-            lote.fecha_produccion.isoformat() if lote.fecha_produccion else "",
-            lote.fecha_vencimiento.isoformat() if lote.fecha_vencimiento else "",
-            lote.link_senasa or "",
-            lote.observaciones or ""
-        ])
-    
-    # Preparar respuesta
-    output.seek(0)
+        stmt = stmt.order_by(asc(orden_columna))
     
     # Generar nombre de archivo con fecha
     fecha_export = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"historial_produccion_{fecha_export}.csv"
     
     return StreamingResponse(
-        iter([output.getvalue()]),
+        _generar_csv(stmt),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -271,44 +364,30 @@ def get_estadisticas_generales(
     
     Devuelve estadísticas agregadas por producto.
     """
-    # Construir query base
-    query = db.query(Lote).filter(Lote.activo == True)
-    
-    # Aplicar filtros de fecha
-    if fecha_desde:
-        query = query.filter(Lote.fecha_produccion >= fecha_desde)
-    
-    if fecha_hasta:
-        query = query.filter(Lote.fecha_produccion <= fecha_hasta)
+    # Se responden desde el acumulado diario (no recorren toda la tabla lotes)
+    condiciones = _condiciones_acumulado(fecha_desde, fecha_hasta)
     
     # Estadísticas generales
-    stats_general = query.with_entities(
-        func.count(Lote.id).label("total_lotes"),
-        func.coalesce(func.sum(Lote.litros_totales), 0).label("total_litros"),
-        func.coalesce(func.sum(Lote.pallets), 0).label("total_pallets"),
-        func.coalesce(func.sum(Lote.parciales), 0).label("total_parciales")
-    ).first()
+    stats_general = db.query(
+        func.coalesce(func.sum(ProduccionDiaria.total_lotes), 0).label("total_lotes"),
+        func.coalesce(func.sum(ProduccionDiaria.total_litros), 0).label("total_litros"),
+        func.coalesce(func.sum(ProduccionDiaria.total_pallets), 0).label("total_pallets"),
+        func.coalesce(func.sum(ProduccionDiaria.total_parciales), 0).label("total_parciales")
+    ).filter(*condiciones).first()
     
     # Estadísticas por producto
     stats_por_producto = db.query(
         Producto.id,
         Producto.codigo,
         Producto.nombre,
-        func.count(Lote.id).label("total_lotes"),
-        func.coalesce(func.sum(Lote.litros_totales), 0).label("total_litros"),
-        func.coalesce(func.sum(Lote.pallets), 0).label("total_pallets")
+        func.sum(ProduccionDiaria.total_lotes).label("total_lotes"),
+        func.coalesce(func.sum(ProduccionDiaria.total_litros), 0).label("total_litros"),
+        func.coalesce(func.sum(ProduccionDiaria.total_pallets), 0).label("total_pallets")
     ).join(
-        Lote, Lote.producto_id == Producto.id
+        ProduccionDiaria, ProduccionDiaria.producto_id == Producto.id
     ).filter(
-        Lote.activo == True
-    )
-    
-    if fecha_desde:
-        stats_por_producto = stats_por_producto.filter(Lote.fecha_produccion >= fecha_desde)
-    if fecha_hasta:
-        stats_por_producto = stats_por_producto.filter(Lote.fecha_produccion <= fecha_hasta)
-    
-    stats_por_producto = stats_por_producto.group_by(
+        *condiciones
+    ).group_by(
         Producto.id, Producto.codigo, Producto.nombre
     ).order_by(desc("total_litros")).all()
     
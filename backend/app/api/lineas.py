@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import IntegrityError
 from typing import Optional
 import math
 
 from app.core.database import get_db
+from app.core.catalogos import catalogo_sectores
 from app.core.deps import get_current_user, get_current_active_admin
+from app.core.etag import consulta_version, verificar_etag
 from app.core.id_generator import generar_codigo_linea
 from app.models.user import User
 from app.models.linea import Linea
@@ -18,6 +20,8 @@ router = APIRouter(prefix="/lineas", tags=["Líneas"])
 
 @router.get("", response_model=LineaList)
 def listar_lineas(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1, description="Número de página"),
     size: int = Query(10, ge=1, le=100, description="Tamaño de página"),
     search: Optional[str] = Query(None, description="Buscar por nombre"),
@@ -26,7 +30,14 @@ def listar_lineas(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Lista todas las líneas con paginación y filtros."""
+    """
+    Lista todas las líneas con paginación y filtros.
+    Responde 304 si el cliente envía el ETag de la versión actual (If-None-Match).
+    """
+    no_modificado = verificar_etag(request, response, db.execute(consulta_version(Linea, Sector)).one())
+    if no_modificado:
+        return no_modificado
+    
     query = db.query(Linea).options(joinedload(Linea.sector))
     
     # Filtros
@@ -78,7 +89,7 @@ def crear_linea(
 ):
     """Crea una nueva línea. Solo para administradores."""
     # Verificar que el sector exista
-    sector = db.query(Sector).filter(Sector.id == linea_data.sector_id).first()
+    sector = catalogo_sectores.obtener(db, linea_data.sector_id)
     if not sector:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -123,7 +134,7 @@ def actualizar_linea(
     
     # Verificar que el sector exista si se está cambiando
     if linea_data.sector_id:
-        sector = db.query(Sector).filter(Sector.id == linea_data.sector_id).first()
+        sector = catalogo_sectores.obtener(db, linea_data.sector_id)
         if not sector:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
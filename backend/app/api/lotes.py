@@ -3,24 +3,39 @@ API de Lotes con validaciones inteligentes.
 
 Este módulo implementa:
 - CRUD de lotes
+- Carga masiva de lotes con validaciones por conjunto
+- Mantenimiento del acumulado de producción diaria
 - Cálculo automático de litros totales
 - Cálculo automático de fecha de vencimiento
 - Validación de lote duplicado
 - Validación de salto de lote
+- Reporte de números de lote faltantes de todo el historial
 - Advertencias de fecha (muy antigua o futura)
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, desc, select, and_, or_
 from typing import Optional, List
 from datetime import date, timedelta
-import re
+from bisect import bisect_left, insort
 
-from app.core.database import get_db
-from app.core.deps import get_current_user
+from app.core.database import get_db, get_async_db
+from app.core.deps import get_current_user, get_current_user_async
+from app.core.eventos import broadcaster, CANAL_TIMELINE
 from app.core.audit import audit_crear, audit_editar, audit_eliminar, get_client_info, _model_to_dict
-from app.core.id_generator import generar_codigo_lote
+from app.core.id_generator import generar_codigo_lote, generar_codigos_lote
+from app.core.pagination import preparar_consulta_cursor, resultado_cursor
+from app.core.produccion_diaria import aporte_lote, actualizar_produccion_diaria
+from app.core.faltantes_lote import calcular_faltantes
+from app.core.busqueda import condicion_busqueda, orden_busqueda
+from app.core.secuencia_lote import descomponer_numero_lote, formatear_numero_lote
+from app.core.ultimo_lote import (
+    buscar_lote_anterior,
+    obtener_ultimo_lote,
+    invalidar_ultimo_lote,
+)
 from app.models import Lote, Producto, EstadoLinea, User, TipoEstado
 from app.schemas.lote import (
     LoteCreate,
@@ -28,10 +43,16 @@ from app.schemas.lote import (
     LoteResponse,
     LoteResponseConAdvertencias,
     LoteList,
+    LoteBulkCreate,
+    LoteBulkItem,
+    LoteBulkResponse,
     LoteWarning,
     WarningType,
     ValidacionLoteRequest,
     ValidacionLoteResponse,
+    RangoFaltante,
+    FaltantesProducto,
+    ReporteFaltantesLote,
 )
 
 router = APIRouter(prefix="/lotes", tags=["Lotes"])
@@ -50,14 +71,11 @@ def extraer_numero_de_lote(numero_lote: str) -> Optional[int]:
     - "LOTE-2024-0005" -> 5
     - "ABC123XYZ" -> 123
     
-    Busca el último grupo de dígitos consecutivos en el string.
+    Busca el último grupo de dígitos consecutivos en el string (el mismo
+    valor que se guarda en Lote.numero_secuencia).
     """
-    # Buscar todos los grupos de dígitos
-    matches = re.findall(r'\d+', numero_lote)
-    if matches:
-        # Retornar el último grupo como número entero
-        return int(matches[-1])
-    return None
+    secuencia = descomponer_numero_lote(numero_lote)
+    return secuencia.numero if secuencia else None
 
 
 def detectar_lote_duplicado(
@@ -85,19 +103,15 @@ def detectar_lote_duplicado(
     return query.first() is not None
 
 
-def detectar_salto_lote(
-    db: Session,
+def evaluar_salto_lote(
     numero_lote: str,
-    producto_id: int
+    numero_lote_anterior: Optional[str]
 ) -> tuple[bool, Optional[str], Optional[str]]:
     """
-    Detecta si hay un salto en la secuencia de números de lote.
+    Compara un número de lote con el último lote conocido del producto.
     
-    Lógica:
-    1. Extrae el número del lote nuevo (ej: "L-005" -> 5)
-    2. Busca el último lote del mismo producto
-    3. Extrae el número del último lote (ej: "L-003" -> 3)
-    4. Si nuevo_numero > ultimo_numero + 1, hay salto
+    No consulta la base de datos: recibe el número del último lote (o None
+    si es el primero), para poder reutilizarse en la carga masiva.
     
     Retorna: (hay_salto, numero_lote_anterior, numero_lote_esperado)
     """
@@ -106,36 +120,58 @@ def detectar_salto_lote(
     if numero_nuevo is None:
         return False, None, None
     
-    # Buscar el último lote del mismo producto
-    ultimo_lote = db.query(Lote).filter(
-        Lote.producto_id == producto_id,
-        Lote.activo == True
-    ).order_by(desc(Lote.id)).first()
-    
-    if ultimo_lote is None:
+    if numero_lote_anterior is None:
         # Es el primer lote, verificar si empieza desde un número razonable
         if numero_nuevo > 1:
             return True, None, "1"
         return False, None, None
     
-    numero_anterior = extraer_numero_de_lote(ultimo_lote.numero_lote)
+    numero_anterior = extraer_numero_de_lote(numero_lote_anterior)
     
     if numero_anterior is None:
         return False, None, None
     
     # Verificar si hay salto
     if numero_nuevo > numero_anterior + 1:
-        # Hay salto - calcular el número esperado
-        numero_esperado = numero_anterior + 1
-        # Reconstruir el formato del lote esperado
-        lote_esperado = re.sub(
-            r'\d+$',
-            str(numero_esperado).zfill(len(str(numero_anterior))),
-            ultimo_lote.numero_lote
-        )
-        return True, ultimo_lote.numero_lote, lote_esperado
+        # Hay salto - el esperado mantiene el formato del lote anterior
+        lote_esperado = formatear_numero_lote(numero_lote_anterior, numero_anterior + 1)
+        return True, numero_lote_anterior, lote_esperado
     
-    return False, ultimo_lote.numero_lote, None
+    return False, numero_lote_anterior, None
+
+
+def detectar_salto_lote(
+    db: Session,
+    numero_lote: str,
+    producto_id: int
+) -> tuple[bool, Optional[str], Optional[str]]:
+    """
+    Detecta si hay un salto en la secuencia de números de lote.
+    
+    Lógica:
+    1. Extrae el número del lote nuevo (ej: "L-005" -> 5)
+    2. Busca el lote del mismo producto con el mayor número menor al nuevo
+       (ej: "L-003" -> 3), aunque se haya cargado después
+    3. Si nuevo_numero > anterior_numero + 1, hay salto
+    
+    Retorna: (hay_salto, numero_lote_anterior, numero_lote_esperado)
+    """
+    numero = extraer_numero_de_lote(numero_lote)
+    if numero is None:
+        return False, None, None
+    
+    # Caso habitual (el lote sigue al último): sale del cache del último lote
+    ultimo = obtener_ultimo_lote(db, producto_id)
+    if ultimo is None or ultimo.numero_secuencia is None:
+        numero_lote_anterior = None
+    elif numero > ultimo.numero_secuencia:
+        numero_lote_anterior = ultimo.numero_lote
+    else:
+        # Lote fuera de orden: buscar el anterior en el índice
+        lote_anterior = buscar_lote_anterior(db, producto_id, numero)
+        numero_lote_anterior = lote_anterior.numero_lote if lote_anterior else None
+    
+    return evaluar_salto_lote(numero_lote, numero_lote_anterior)
 
 
 def validar_fecha_produccion(fecha_produccion: date) -> List[LoteWarning]:
@@ -167,28 +203,27 @@ def validar_fecha_produccion(fecha_produccion: date) -> List[LoteWarning]:
     return advertencias
 
 
-def validar_lote(
-    db: Session,
+def construir_advertencias(
     numero_lote: str,
-    producto_id: int,
     fecha_produccion: date,
-    lote_id_excluir: Optional[int] = None
+    es_duplicado: bool,
+    salto: tuple[bool, Optional[str], Optional[str]]
 ) -> List[LoteWarning]:
     """
-    Ejecuta todas las validaciones para un lote y retorna las advertencias.
+    Arma la lista de advertencias a partir del resultado de las validaciones.
     """
     advertencias = []
     
-    # 1. Verificar lote duplicado
-    if detectar_lote_duplicado(db, numero_lote, producto_id, lote_id_excluir):
+    # 1. Lote duplicado
+    if es_duplicado:
         advertencias.append(LoteWarning(
             tipo=WarningType.LOTE_DUPLICADO,
             mensaje=f"Ya existe un lote '{numero_lote}' para este producto",
             detalle="Se recomienda verificar si es un error o si el lote ya fue registrado"
         ))
     
-    # 2. Verificar salto de lote
-    hay_salto, lote_anterior, lote_esperado = detectar_salto_lote(db, numero_lote, producto_id)
+    # 2. Salto de lote
+    hay_salto, lote_anterior, lote_esperado = salto
     if hay_salto:
         if lote_anterior:
             advertencias.append(LoteWarning(
@@ -203,12 +238,124 @@ def validar_lote(
                 detalle="Se recomienda iniciar la secuencia desde 1 o verificar si faltan lotes anteriores"
             ))
     
-    # 3. Validar fecha de producción
+    # 3. Fecha de producción
     advertencias.extend(validar_fecha_produccion(fecha_produccion))
     
     return advertencias
 
 
+def validar_lote(
+    db: Session,
+    numero_lote: str,
+    producto_id: int,
+    fecha_produccion: date,
+    lote_id_excluir: Optional[int] = None
+) -> List[LoteWarning]:
+    """
+    Ejecuta todas las validaciones para un lote y retorna las advertencias.
+    """
+    return construir_advertencias(
+        numero_lote,
+        fecha_produccion,
+        detectar_lote_duplicado(db, numero_lote, producto_id, lote_id_excluir),
+        detectar_salto_lote(db, numero_lote, producto_id)
+    )
+
+
+def validar_lotes_en_bloque(db: Session, lotes: List[LoteCreate]) -> List[List[LoteWarning]]:
+    """
+    Ejecuta las validaciones de una lista de lotes con consultas por conjunto.
+    
+    En lugar de consultar duplicados y lote anterior uno por uno, hace:
+    - Una consulta de lotes existentes con los números/productos del bloque
+    - Una consulta de los números de secuencia existentes de cada producto
+      entre el menor y el mayor número del bloque
+    - Una consulta del lote anterior al menor número del bloque de cada producto
+    
+    Los lotes del bloque se validan en orden, considerando también los
+    anteriores del mismo bloque (duplicados y saltos internos).
+    
+    Retorna una lista de advertencias por cada lote, en el mismo orden.
+    """
+    producto_ids = {lote.producto_id for lote in lotes}
+    numeros = {lote.numero_lote for lote in lotes}
+    
+    # Lotes existentes que coinciden con algún número del bloque
+    existentes = set(
+        db.query(Lote.numero_lote, Lote.producto_id).filter(
+            Lote.activo == True,
+            Lote.producto_id.in_(producto_ids),
+            Lote.numero_lote.in_(numeros)
+        ).all()
+    )
+    
+    # Rango de números de secuencia del bloque por producto
+    rangos = {}
+    for lote in lotes:
+        numero = extraer_numero_de_lote(lote.numero_lote)
+        if numero is not None:
+            minimo, maximo = rangos.get(lote.producto_id, (numero, numero))
+            rangos[lote.producto_id] = (min(minimo, numero), max(maximo, numero))
+    
+    # Secuencia conocida de cada producto: [(numero, numero_lote)] ordenada
+    secuencias = {producto_id: [] for producto_id in rangos}
+    if rangos:
+        en_rango = or_(*[
+            and_(Lote.producto_id == producto_id, Lote.numero_secuencia.between(minimo, maximo))
+            for producto_id, (minimo, maximo) in rangos.items()
+        ])
+        debajo_del_rango = or_(*[
+            and_(Lote.producto_id == producto_id, Lote.numero_secuencia < minimo)
+            for producto_id, (minimo, _) in rangos.items()
+        ])
+        pisos = db.query(
+            Lote.producto_id,
+            func.max(Lote.numero_secuencia).label("numero")
+        ).filter(Lote.activo == True, debajo_del_rango).group_by(Lote.producto_id).subquery()
+        
+        filas = db.query(Lote.producto_id, Lote.numero_secuencia, Lote.numero_lote).filter(
+            Lote.activo == True, en_rango
+        ).union_all(
+            db.query(Lote.producto_id, Lote.numero_secuencia, Lote.numero_lote).join(
+                pisos,
+                and_(Lote.producto_id == pisos.c.producto_id, Lote.numero_secuencia == pisos.c.numero)
+            ).filter(Lote.activo == True)
+        ).all()
+        for producto_id, numero, numero_lote in filas:
+            secuencias[producto_id].append((numero, numero_lote))
+        for secuencia in secuencias.values():
+            secuencia.sort()
+    
+    resultado = []
+    for lote in lotes:
+        clave = (lote.numero_lote, lote.producto_id)
+        es_duplicado = clave in existentes
+        
+        numero = extraer_numero_de_lote(lote.numero_lote)
+        lote_anterior = None
+        if numero is not None:
+            secuencia = secuencias[lote.producto_id]
+            # Mayor número menor al del lote
+            posicion = bisect_left(secuencia, (numero, ""))
+            if posicion > 0:
+                lote_anterior = secuencia[posicion - 1][1]
+            # El lote pasa a formar parte de la secuencia para los siguientes del bloque
+            insort(secuencia, (numero, lote.numero_lote))
+        
+        salto = evaluar_salto_lote(lote.numero_lote, lote_anterior)
+        
+        resultado.append(construir_advertencias(
+            lote.numero_lote,
+            lote.fecha_produccion,
+            es_duplicado,
+            salto
+        ))
+        
+        existentes.add(clave)
+    
+    return resultado
+
+
 def calcular_litros_totales(
     pallets: int,
     parciales: int,
@@ -233,10 +380,66 @@ def calcular_fecha_vencimiento(fecha_produccion: date, anos_vencimiento: int) ->
     return fecha_produccion + timedelta(days=365 * (anos_vencimiento or 2))
 
 
+def construir_lote(lote: LoteCreate, producto: Producto, codigo: str, usuario_id: int) -> Lote:
+    """
+    Crea la instancia de Lote calculando litros totales y fecha de vencimiento
+    si no se especificaron.
+    """
+    # Calcular litros totales si no se especifica
+    litros_totales = lote.litros_totales
+    if litros_totales is None:
+        litros_totales = calcular_litros_totales(
+            lote.pallets or 0,
+            lote.parciales or 0,
+            lote.unidades_por_pallet or 1,
+            producto.litros_por_unidad or 1.0
+        )
+    
+    # Calcular fecha de vencimiento si no se especifica
+    fecha_vencimiento = lote.fecha_vencimiento
+    if fecha_vencimiento is None:
+        fecha_vencimiento = calcular_fecha_vencimiento(
+            lote.fecha_produccion,
+            producto.anos_vencimiento or 2
+        )
+    
+    return Lote(
+        codigo=codigo,
+        numero_lote=lote.numero_lote,
+        producto_id=lote.producto_id,
+        estado_linea_id=lote.estado_linea_id,
+        pallets=lote.pallets or 0,
+        parciales=lote.parciales or 0,
+        unidades_por_pallet=lote.unidades_por_pallet or 1,
+        litros_totales=litros_totales,
+        fecha_produccion=lote.fecha_produccion,
+        fecha_vencimiento=fecha_vencimiento,
+        link_senasa=lote.link_senasa,
+        observaciones=lote.observaciones,
+        usuario_id=usuario_id,
+        activo=lote.activo
+    )
+
+
 # ============================================================================
 # ENDPOINTS
 # ============================================================================
 
+def publicar_lote_timeline(lote: Lote, accion: str) -> None:
+    """Avisa a los timelines conectados que cambió un lote (después del commit)."""
+    broadcaster.publicar(CANAL_TIMELINE, {
+        "tipo": "lote",
+        "accion": accion,
+        "lote": {
+            "id": lote.id,
+            "numero_lote": lote.numero_lote,
+            "producto_id": lote.producto_id,
+            "estado_linea_id": lote.estado_linea_id,
+            "fecha_produccion": lote.fecha_produccion.isoformat() if lote.fecha_produccion else None,
+        }
+    })
+
+
 @router.post("/validar", response_model=ValidacionLoteResponse)
 def validar_lote_endpoint(
     data: ValidacionLoteRequest,
@@ -248,15 +451,19 @@ def validar_lote_endpoint(
     Útil para mostrar advertencias en el frontend antes de confirmar la creación.
     """
     # Verificar que el producto existe
-    producto = db.query(Producto).filter(Producto.id == data.producto_id).first()
+    producto = db.get(Producto, data.producto_id)
     if not producto:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     
-    # Ejecutar validaciones
-    advertencias = validar_lote(db, data.numero_lote, data.producto_id, data.fecha_produccion)
-    
-    # Obtener información del último lote
-    _, lote_anterior, lote_esperado = detectar_salto_lote(db, data.numero_lote, data.producto_id)
+    # Ejecutar validaciones (el salto se calcula una vez y también da el lote anterior)
+    salto = detectar_salto_lote(db, data.numero_lote, data.producto_id)
+    advertencias = construir_advertencias(
+        data.numero_lote,
+        data.fecha_produccion,
+        detectar_lote_duplicado(db, data.numero_lote, data.producto_id),
+        salto
+    )
+    _, lote_anterior, lote_esperado = salto
     
     return ValidacionLoteResponse(
         valido=len(advertencias) == 0,
@@ -280,7 +487,7 @@ def create_lote(
     retorna las advertencias sin crear el lote.
     """
     # Verificar que el producto existe
-    producto = db.query(Producto).filter(Producto.id == lote.producto_id).first()
+    producto = db.get(Producto, lote.producto_id)
     if not producto:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     
@@ -307,47 +514,14 @@ def create_lote(
             mensaje="Se encontraron advertencias. Confirme para continuar."
         )
     
-    # Calcular litros totales si no se especifica
-    litros_totales = lote.litros_totales
-    if litros_totales is None:
-        litros_totales = calcular_litros_totales(
-            lote.pallets or 0,
-            lote.parciales or 0,
-            lote.unidades_por_pallet or 1,
-            producto.litros_por_unidad or 1.0
-        )
-    
-    # Calcular fecha de vencimiento si no se especifica
-    fecha_vencimiento = lote.fecha_vencimiento
-    if fecha_vencimiento is None:
-        fecha_vencimiento = calcular_fecha_vencimiento(
-            lote.fecha_produccion,
-            producto.anos_vencimiento or 2
-        )
-    
-    # Generar código automático
+    # Generar código automático y crear el lote
     codigo = generar_codigo_lote(db)
-    
-    # Crear el lote
-    db_lote = Lote(
-        codigo=codigo,
-        numero_lote=lote.numero_lote,
-        producto_id=lote.producto_id,
-        estado_linea_id=lote.estado_linea_id,
-        pallets=lote.pallets or 0,
-        parciales=lote.parciales or 0,
-        unidades_por_pallet=lote.unidades_por_pallet or 1,
-        litros_totales=litros_totales,
-        fecha_produccion=lote.fecha_produccion,
-        fecha_vencimiento=fecha_vencimiento,
-        link_senasa=lote.link_senasa,
-        observaciones=lote.observaciones,
-        usuario_id=current_user.id,
-        activo=lote.activo
-    )
+    db_lote = construir_lote(lote, producto, codigo, current_user.id)
     
     db.add(db_lote)
-    db.commit()
+    actualizar_produccion_diaria(db, nuevos=[aporte_lote(db_lote)])
+    # Un solo commit: el cambio y su auditoría
+    db.flush()
     db.refresh(db_lote)
     
     # Registrar auditoría
@@ -369,6 +543,8 @@ def create_lote(
         joinedload(Lote.estado_linea)
     ).filter(Lote.id == db_lote.id).first()
     
+    publicar_lote_timeline(db_lote, "creado")
+    
     return LoteResponseConAdvertencias(
         lote=LoteResponse.model_validate(db_lote),
         advertencias=advertencias,
@@ -377,41 +553,201 @@ def create_lote(
     )
 
 
+@router.post("/bulk", response_model=LoteBulkResponse)
+def create_lotes_bulk(
+    data: LoteBulkCreate,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Crear varios lotes en una sola operación (carga de fin de turno).
+    
+    Los productos y estados de línea se cargan con una consulta cada uno y
+    las validaciones se ejecutan sobre todo el bloque, incluyendo duplicados
+    y saltos dentro del mismo bloque.
+    
+    Si algún lote tiene advertencias que no se ignoran, no se crea ninguno y
+    se retornan las advertencias de cada lote. Si no, todos los lotes y sus
+    registros de auditoría se guardan en una única transacción.
+    """
+    # Cargar productos referenciados
+    producto_ids = {lote.producto_id for lote in data.lotes}
+    productos = {
+        producto.id: producto
+        for producto in db.query(Producto).filter(Producto.id.in_(producto_ids)).all()
+    }
+    
+    # Cargar estados de línea referenciados
+    estado_ids = {lote.estado_linea_id for lote in data.lotes if lote.estado_linea_id}
+    estados = {}
+    if estado_ids:
+        estados = {
+            estado.id: estado
+            for estado in db.query(EstadoLinea).filter(EstadoLinea.id.in_(estado_ids)).all()
+        }
+    
+    for indice, lote in enumerate(data.lotes):
+        if lote.producto_id not in productos:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Producto no encontrado (lote #{indice + 1}: {lote.numero_lote})"
+            )
+        if lote.estado_linea_id:
+            estado = estados.get(lote.estado_linea_id)
+            if not estado:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Estado de línea no encontrado (lote #{indice + 1}: {lote.numero_lote})"
+                )
+            if estado.tipo_estado != TipoEstado.PRODUCCION:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Solo se pueden asociar lotes a estados de tipo 'Producción' (lote #{indice + 1}: {lote.numero_lote})"
+                )
+    
+    # Ejecutar validaciones sobre todo el bloque
+    advertencias_por_lote = validar_lotes_en_bloque(db, data.lotes)
+    
+    # Si algún lote tiene advertencias que no se ignoran, retornar sin crear
+    bloqueado = any(
+        advertencias and not (data.ignorar_advertencias or lote.ignorar_advertencias)
+        for lote, advertencias in zip(data.lotes, advertencias_por_lote)
+    )
+    if bloqueado:
+        return LoteBulkResponse(
+            items=[
+                LoteBulkItem(indice=indice, numero_lote=lote.numero_lote, advertencias=advertencias)
+                for indice, (lote, advertencias) in enumerate(zip(data.lotes, advertencias_por_lote))
+            ],
+            creados=0,
+            creado=False,
+            mensaje="Se encontraron advertencias. Confirme para continuar."
+        )
+    
+    # Reservar códigos en bloque y crear los lotes
+    codigos = generar_codigos_lote(db, len(data.lotes))
+    db_lotes = [
+        construir_lote(lote, productos[lote.producto_id], codigo, current_user.id)
+        for lote, codigo in zip(data.lotes, codigos)
+    ]
+    db.add_all(db_lotes)
+    actualizar_produccion_diaria(db, nuevos=[aporte_lote(db_lote) for db_lote in db_lotes])
+    db.flush()
+    
+    # Registrar auditoría en la misma transacción
+    ip_address, user_agent = get_client_info(request)
+    for db_lote in db_lotes:
+        audit_crear(
+            db=db,
+            usuario=current_user,
+            entidad="lote",
+            registro=db_lote,
+            descripcion=f"Lote: {db_lote.numero_lote}",
+            ip_address=ip_address,
+            user_agent=user_agent
+        )
+    
+    lote_ids = [db_lote.id for db_lote in db_lotes]
+    db.commit()
+    
+    # Cargar relaciones de todos los lotes en una consulta
+    cargados = {
+        db_lote.id: db_lote
+        for db_lote in db.query(Lote).options(
+            joinedload(Lote.producto),
+            joinedload(Lote.estado_linea)
+        ).filter(Lote.id.in_(lote_ids)).all()
+    }
+    for db_lote in cargados.values():
+        publicar_lote_timeline(db_lote, "creado")
+    
+    con_advertencias = sum(1 for advertencias in advertencias_por_lote if advertencias)
+    
+    return LoteBulkResponse(
+        items=[
+            LoteBulkItem(
+                indice=indice,
+                numero_lote=lote.numero_lote,
+                lote=LoteResponse.model_validate(cargados[lote_id]),
+                advertencias=advertencias,
+                creado=True
+            )
+            for indice, (lote, lote_id, advertencias) in enumerate(zip(data.lotes, lote_ids, advertencias_por_lote))
+        ],
+        creados=len(lote_ids),
+        creado=True,
+        mensaje=f"{len(lote_ids)} lote(s) creado(s) exitosamente" + (
+            f" ({con_advertencias} con advertencias ignoradas)" if con_advertencias else ""
+        )
+    )
+
+
 @router.get("", response_model=LoteList)
-def list_lotes(
+async def list_lotes(
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=100),
     producto_id: Optional[int] = None,
     estado_linea_id: Optional[int] = None,
     activo: Optional[bool] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    cursor: Optional[str] = Query(None, description="Cursor de paginación (vacío para la primera página en modo cursor)"),
+    incluir_total: bool = Query(False, description="Calcular el total en modo cursor"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
-    """Listar lotes con paginación y filtros."""
-    query = db.query(Lote).options(
-        joinedload(Lote.producto),
-        joinedload(Lote.estado_linea)
-    )
+    """
+    Listar lotes con paginación y filtros.
     
+    Con `search`, los resultados se ordenan por parecido con el texto
+    (salvo en modo cursor).
+    
+    Si se envía `cursor`, se pagina por cursor (keyset sobre id) en lugar de
+    OFFSET y se ignora `page`; el total solo se calcula con incluir_total=true.
+    """
     # Filtros
+    condiciones = []
     if producto_id:
-        query = query.filter(Lote.producto_id == producto_id)
+        condiciones.append(Lote.producto_id == producto_id)
     if estado_linea_id:
-        query = query.filter(Lote.estado_linea_id == estado_linea_id)
+        condiciones.append(Lote.estado_linea_id == estado_linea_id)
     if activo is not None:
-        query = query.filter(Lote.activo == activo)
+        condiciones.append(Lote.activo == activo)
     if search:
-        query = query.filter(Lote.numero_lote.ilike(f"%{search}%"))
+        condiciones.append(condicion_busqueda(search, Lote.numero_lote))
+    
+    stmt = select(Lote).options(
+        joinedload(Lote.producto),
+        joinedload(Lote.estado_linea)
+    ).where(*condiciones)
+    
+    # Modo cursor: sin OFFSET ni conteo obligatorio
+    if cursor is not None:
+        total = None
+        if incluir_total:
+            total = await db.scalar(select(func.count(Lote.id)).where(*condiciones))
+        stmt = preparar_consulta_cursor(stmt, [Lote.id], cursor, size, orden="id:desc")
+        items, next_cursor = resultado_cursor((await db.execute(stmt)).all(), size, orden="id:desc")
+        return LoteList(
+            items=[LoteResponse.model_validate(item) for item in items],
+            total=total,
+            page=page,
+            size=size,
+            pages=(total + size - 1) // size if total is not None else None,
+            next_cursor=next_cursor
+        )
     
     # Contar total
-    total = query.count()
+    total = await db.scalar(select(func.count(Lote.id)).where(*condiciones))
     
     # Paginación
     pages = (total + size - 1) // size
     offset = (page - 1) * size
     
-    items = query.order_by(desc(Lote.id)).offset(offset).limit(size).all()
+    if search:
+        # Más parecidos primero
+        stmt = stmt.order_by(orden_busqueda(search, Lote.numero_lote))
+    items = (await db.scalars(stmt.order_by(desc(Lote.id)).offset(offset).limit(size))).all()
     
     return LoteList(
         items=[LoteResponse.model_validate(item) for item in items],
@@ -422,6 +758,54 @@ def list_lotes(
     )
 
 
+@router.get("/gaps", response_model=ReporteFaltantesLote)
+def reporte_faltantes(
+    producto_id: Optional[int] = Query(None, description="Limitar a un producto"),
+    desde_uno: bool = Query(False, description="Contar los números faltantes antes del primer lote de cada producto"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Reporte de saltos de lote: todos los números faltantes en la secuencia de
+    lotes activos de cada producto, agrupados en rangos consecutivos.
+    """
+    rangos_por_producto = {}
+    for id_producto, numero_anterior, lote_anterior, numero, lote in calcular_faltantes(db, producto_id, desde_uno):
+        desde = (numero_anterior or 0) + 1
+        rangos_por_producto.setdefault(id_producto, []).append(RangoFaltante(
+            desde=desde,
+            hasta=numero - 1,
+            cantidad=numero - desde,
+            lote_anterior=lote_anterior,
+            lote_siguiente=lote
+        ))
+    
+    productos = {}
+    if rangos_por_producto:
+        productos = {
+            p.id: p for p in db.query(Producto.id, Producto.codigo, Producto.nombre).filter(
+                Producto.id.in_(rangos_por_producto.keys())
+            )
+        }
+    
+    items = []
+    for id_producto, rangos in rangos_por_producto.items():
+        producto = productos.get(id_producto)
+        items.append(FaltantesProducto(
+            producto_id=id_producto,
+            producto_codigo=producto.codigo if producto else None,
+            producto_nombre=producto.nombre if producto else None,
+            rangos=rangos,
+            total_faltantes=sum(rango.cantidad for rango in rangos)
+        ))
+    
+    return ReporteFaltantesLote(
+        productos=items,
+        total_productos=len(items),
+        total_faltantes=sum(item.total_faltantes for item in items)
+    )
+
+
 @router.get("/{lote_id}", response_model=LoteResponse)
 def get_lote(
     lote_id: int,
@@ -458,8 +842,9 @@ def update_lote(
     if not db_lote:
         raise HTTPException(status_code=404, detail="Lote no encontrado")
     
-    # Guardar datos anteriores para auditoría
+    # Guardar datos anteriores para auditoría y para el acumulado diario
     datos_anteriores = _model_to_dict(db_lote)
+    aporte_anterior = aporte_lote(db_lote)
     
     # Preparar datos para validación
     numero_lote = lote_update.numero_lote or db_lote.numero_lote
@@ -467,7 +852,7 @@ def update_lote(
     fecha_produccion = lote_update.fecha_produccion or db_lote.fecha_produccion
     
     # Verificar producto si se cambió
-    producto = db.query(Producto).filter(Producto.id == producto_id).first()
+    producto = db.get(Producto, producto_id)
     if not producto:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     
@@ -517,7 +902,9 @@ def update_lote(
             producto.anos_vencimiento or 2
         )
     
-    db.commit()
+    actualizar_produccion_diaria(db, [aporte_anterior], [aporte_lote(db_lote)])
+    # Un solo commit: el cambio y su auditoría
+    db.flush()
     db.refresh(db_lote)
     
     # Registrar auditoría
@@ -540,6 +927,8 @@ def update_lote(
         joinedload(Lote.estado_linea)
     ).filter(Lote.id == db_lote.id).first()
     
+    publicar_lote_timeline(db_lote, "actualizado")
+    
     return LoteResponseConAdvertencias(
         lote=LoteResponse.model_validate(db_lote),
         advertencias=advertencias,
@@ -572,8 +961,11 @@ def delete_lote(
         user_agent=user_agent
     )
     
+    aporte_anterior = aporte_lote(db_lote)
     db_lote.activo = False
+    actualizar_produccion_diaria(db, anteriores=[aporte_anterior])
     db.commit()
+    publicar_lote_timeline(db_lote, "eliminado")
     
     return {"message": "Lote eliminado exitosamente"}
 
@@ -584,14 +976,24 @@ def get_ultimo_lote_producto(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Obtener el último lote de un producto (útil para sugerir el siguiente número)."""
-    lote = db.query(Lote).options(
-        joinedload(Lote.producto),
-        joinedload(Lote.estado_linea)
-    ).filter(
-        Lote.producto_id == producto_id,
-        Lote.activo == True
-    ).order_by(desc(Lote.id)).first()
+    """
+    Obtener el último lote de un producto (útil para sugerir el siguiente número):
+    el de mayor número de secuencia, o el último cargado si no tienen número.
+    """
+    ultimo = obtener_ultimo_lote(db, producto_id)
+    
+    opciones = (joinedload(Lote.producto), joinedload(Lote.estado_linea))
+    lote = None
+    if ultimo is not None:
+        lote = db.query(Lote).options(*opciones).filter(Lote.id == ultimo.id).first()
+        if lote and (not lote.activo or lote.producto_id != producto_id):
+            lote = None
+    if lote is None:
+        # Entrada desactualizada (cambio hecho fuera de la API) o "sin lotes",
+        # que también puede haber quedado vieja: buscar de nuevo
+        lote = buscar_lote_anterior(db, producto_id, opciones=opciones)
+        if ultimo is not None or lote is not None:
+            invalidar_ultimo_lote(producto_id)
     
     if not lote:
         return None
@@ -606,18 +1008,16 @@ def sugerir_numero_lote(
     current_user: User = Depends(get_current_user)
 ):
     """
-    Sugiere el siguiente número de lote basándose en el último lote del producto.
+    Sugiere el siguiente número de lote basándose en el último lote del producto
+    (el de mayor número de secuencia).
     """
     # Verificar que el producto existe
-    producto = db.query(Producto).filter(Producto.id == producto_id).first()
+    producto = db.get(Producto, producto_id)
     if not producto:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     
     # Buscar el último lote
-    ultimo_lote = db.query(Lote).filter(
-        Lote.producto_id == producto_id,
-        Lote.activo == True
-    ).order_by(desc(Lote.id)).first()
+    ultimo_lote = obtener_ultimo_lote(db, producto_id)
     
     if not ultimo_lote:
         # Sugerir el primer lote
@@ -627,17 +1027,9 @@ def sugerir_numero_lote(
             "mensaje": "No hay lotes anteriores. Se sugiere iniciar desde 001."
         }
     
-    # Extraer número y sugerir el siguiente
-    numero_actual = extraer_numero_de_lote(ultimo_lote.numero_lote)
-    
-    if numero_actual is not None:
-        siguiente_numero = numero_actual + 1
-        # Mantener el formato del último lote
-        sugerencia = re.sub(
-            r'\d+$',
-            str(siguiente_numero).zfill(len(str(numero_actual)) if numero_actual > 0 else 3),
-            ultimo_lote.numero_lote
-        )
+    # Sugerir el siguiente número manteniendo el formato del último lote
+    if ultimo_lote.numero_secuencia is not None:
+        sugerencia = formatear_numero_lote(ultimo_lote.numero_lote, ultimo_lote.numero_secuencia + 1)
     else:
         sugerencia = ultimo_lote.numero_lote + "-2"
     
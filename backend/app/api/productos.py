@@ -1,54 +1,96 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import IntegrityError
-from typing import Optional
+from typing import List, Optional
 import math
 
 from app.core.database import get_db
 from app.core.deps import get_current_user, get_current_active_admin
+from app.core.etag import consulta_version, verificar_etag
+from app.core.autocompletar import indice_productos
+from app.core.busqueda import condicion_busqueda, orden_busqueda
+from app.core.catalogos import catalogo_clientes
 from app.core.audit import audit_crear, audit_editar, audit_eliminar, get_client_info, _model_to_dict
 from app.core.id_generator import generar_codigo_producto
+from app.core.pagination import paginar_por_cursor
 from app.models.user import User
 from app.models.producto import Producto
 from app.models.lote import Lote
 from app.models.cliente import Cliente
-from app.schemas.producto import ProductoCreate, ProductoUpdate, ProductoResponse, ProductoList
+from app.schemas.producto import ProductoCreate, ProductoUpdate, ProductoResponse, ProductoList, ProductoSimple
 
 router = APIRouter(prefix="/productos", tags=["Productos"])
 
 
 @router.get("", response_model=ProductoList)
 def listar_productos(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1, description="Número de página"),
     size: int = Query(10, ge=1, le=1000, description="Tamaño de página"),
     search: Optional[str] = Query(None, description="Buscar por código o nombre"),
     activo: Optional[bool] = Query(None, description="Filtrar por estado activo"),
     cliente_id: Optional[int] = Query(None, description="Filtrar por cliente"),
+    cursor: Optional[str] = Query(None, description="Cursor de paginación (vacío para la primera página en modo cursor)"),
+    incluir_total: bool = Query(False, description="Calcular el total en modo cursor"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Lista todos los productos con paginación y filtros."""
+    """
+    Lista todos los productos con paginación y filtros.
+    
+    Con `search`, los resultados se ordenan por parecido con el texto
+    (salvo en modo cursor).
+    
+    Si se envía `cursor`, se pagina por cursor sobre (codigo, id) en lugar
+    de OFFSET; el total solo se calcula con incluir_total=true.
+    
+    Responde 304 si el cliente envía el ETag de la versión actual (If-None-Match).
+    """
+    no_modificado = verificar_etag(request, response, db.execute(consulta_version(Producto, Cliente)).one())
+    if no_modificado:
+        return no_modificado
+    
     query = db.query(Producto).options(joinedload(Producto.cliente))
     
     # Filtros
+    columnas_busqueda = (Producto.codigo, Producto.nombre, Producto.codigo_producto, Producto.formato_lote)
     if search:
-        query = query.filter(
-            (Producto.codigo.ilike(f"%{search}%")) | 
-            (Producto.nombre.ilike(f"%{search}%")) |
-            (Producto.codigo_producto.ilike(f"%{search}%")) |
-            (Producto.formato_lote.ilike(f"%{search}%"))
-        )
+        query = query.filter(condicion_busqueda(search, *columnas_busqueda))
     if activo is not None:
         query = query.filter(Producto.activo == activo)
     if cliente_id is not None:
         query = query.filter(Producto.cliente_id == cliente_id)
     
+    # Modo cursor: keyset sobre (codigo, id) sin OFFSET
+    if cursor is not None:
+        total = query.count() if incluir_total else None
+        items, next_cursor = paginar_por_cursor(
+            query,
+            [Producto.codigo, Producto.id],
+            cursor,
+            size,
+            descendente=False,
+            orden="codigo:asc"
+        )
+        return ProductoList(
+            items=items,
+            total=total,
+            page=page,
+            size=size,
+            pages=math.ceil(total / size) if total is not None else None,
+            next_cursor=next_cursor
+        )
+    
     # Contar total
     total = query.count()
     pages = math.ceil(total / size)
     
     # Paginación
     offset = (page - 1) * size
+    if search:
+        # Más parecidos primero
+        query = query.order_by(orden_busqueda(search, *columnas_busqueda))
     items = query.order_by(Producto.codigo).offset(offset).limit(size).all()
     
     return ProductoList(
@@ -60,6 +102,23 @@ def listar_productos(
     )
 
 
+@router.get("/autocomplete", response_model=List[ProductoSimple])
+def autocompletar_productos(
+    q: str = Query("", max_length=100, description="Inicio del código, nombre (o una de sus palabras), código de producto o formato de lote"),
+    limite: int = Query(20, ge=1, le=1000, description="Cantidad máxima de resultados"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Productos activos para autocompletar (solo id, código y nombre).
+    Se resuelve con el índice de prefijos en memoria, sin consultar la base.
+    """
+    return [
+        ProductoSimple(id=id_, codigo=codigo, nombre=nombre)
+        for id_, codigo, nombre in indice_productos.buscar(db, q, limite)
+    ]
+
+
 @router.get("/{producto_id}", response_model=ProductoResponse)
 def obtener_producto(
     producto_id: int,
@@ -86,7 +145,7 @@ def crear_producto(
     """Crea un nuevo producto. Solo para administradores."""
     # Verificar que el cliente existe si se proporciona
     if producto_data.cliente_id:
-        cliente = db.query(Cliente).filter(Cliente.id == producto_data.cliente_id).first()
+        cliente = catalogo_clientes.obtener(db, producto_data.cliente_id)
         if not cliente:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -100,7 +159,8 @@ def crear_producto(
     db.add(producto)
     
     try:
-        db.commit()
+        # Un solo commit: el cambio y su auditoría
+        db.flush()
         db.refresh(producto)
         
         # Registrar auditoría
@@ -145,7 +205,7 @@ def actualizar_producto(
     
     # Verificar que el cliente existe si se proporciona
     if producto_data.cliente_id:
-        cliente = db.query(Cliente).filter(Cliente.id == producto_data.cliente_id).first()
+        cliente = catalogo_clientes.obtener(db, producto_data.cliente_id)
         if not cliente:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -161,7 +221,8 @@ def actualizar_producto(
         setattr(producto, field, value)
     
     try:
-        db.commit()
+        # Un solo commit: el cambio y su auditoría
+        db.flush()
         db.refresh(producto)
         
         # Registrar auditoría
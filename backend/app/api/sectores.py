@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from typing import Optional
@@ -6,6 +6,7 @@ import math
 
 from app.core.database import get_db
 from app.core.deps import get_current_user, get_current_active_admin
+from app.core.etag import consulta_version, verificar_etag
 from app.core.id_generator import generar_codigo_sector
 from app.models.user import User
 from app.models.sector import Sector
@@ -16,6 +17,8 @@ router = APIRouter(prefix="/sectores", tags=["Sectores"])
 
 @router.get("", response_model=SectorList)
 def listar_sectores(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1, description="Número de página"),
     size: int = Query(10, ge=1, le=100, description="Tamaño de página"),
     search: Optional[str] = Query(None, description="Buscar por nombre"),
@@ -23,7 +26,14 @@ def listar_sectores(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Lista todos los sectores con paginación y filtros."""
+    """
+    Lista todos los sectores con paginación y filtros.
+    Responde 304 si el cliente envía el ETag de la versión actual (If-None-Match).
+    """
+    no_modificado = verificar_etag(request, response, db.execute(consulta_version(Sector)).one())
+    if no_modificado:
+        return no_modificado
+    
     query = db.query(Sector)
     
     # Filtros
@@ -4,9 +4,11 @@ from typing import Optional, List
 
 from app.core.database import get_db
 from app.core.security import get_password_hash
+from app.core.busqueda import condicion_busqueda, orden_busqueda
+from app.core.catalogos import catalogo_roles
 from app.core.deps import get_current_user, get_admin_user
 from app.core.id_generator import generar_codigo_usuario
-from app.models.user import User, Role
+from app.models.user import User
 from app.schemas.user import (
     UserResponse, UserAdminCreate, UserAdminUpdate, UserResetPassword
 )
@@ -31,13 +33,11 @@ def list_users(
     query = db.query(User)
     
     # Filtros
+    columnas_busqueda = (User.username, User.email, User.full_name)
     if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            (User.username.ilike(search_filter)) |
-            (User.email.ilike(search_filter)) |
-            (User.full_name.ilike(search_filter))
-        )
+        query = query.filter(condicion_busqueda(search, *columnas_busqueda))
+        # Más parecidos primero
+        query = query.order_by(orden_busqueda(search, *columnas_busqueda))
     
     if is_active is not None:
         query = query.filter(User.is_active == is_active)
@@ -74,8 +74,7 @@ def list_roles(
     """
     Lista todos los roles disponibles (solo admin).
     """
-    roles = db.query(Role).all()
-    return roles
+    return catalogo_roles.listar(db)
 
 
 @router.get("/{user_id}", response_model=UserResponse)
@@ -134,7 +133,7 @@ def create_user(
         )
     
     # Verificar que el rol existe
-    role = db.query(Role).filter(Role.id == user_data.role_id).first()
+    role = catalogo_roles.obtener(db, user_data.role_id)
     if not role:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -239,7 +238,7 @@ def update_user(
     
     # Verificar que el rol existe
     if user_data.role_id is not None:
-        role = db.query(Role).filter(Role.id == user_data.role_id).first()
+        role = catalogo_roles.obtener(db, user_data.role_id)
         if not role:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -3,16 +3,47 @@ Servicio de Auditoría.
 
 Proporciona funciones para registrar acciones de auditoría
 en la base de datos.
+
+Con AUDIT_MODO=transaccion (por defecto) el log se agrega a la sesión y se
+guarda en el mismo commit del endpoint. Con AUDIT_MODO=cola la entrada
+queda pendiente en la sesión y, después del commit, pasa a la cola del
+escritor en segundo plano (ver app/core/audit_cola.py); si la transacción
+se revierte, se descarta.
 """
 
+from sqlalchemy import event, func
 from sqlalchemy.orm import Session
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, Tuple
 from datetime import datetime
-import json
 
+from app.core.config import settings
+from app.core.audit_cola import escritor_auditoria
+from app.core.auditoria_diaria import clave_entrada, sumar_auditoria_diaria
+from app.core.database import engine
 from app.models.audit_log import AuditLog
 from app.models.user import User
 
+# Clave en Session.info con las entradas a encolar al hacer commit
+_PENDIENTES = "auditoria_pendiente"
+
+
+@event.listens_for(Session, "after_commit")
+def _encolar_pendientes(session: Session) -> None:
+    # after_commit también se dispara al liberar un savepoint (begin_nested)
+    if session.in_nested_transaction():
+        return
+    pendientes = session.info.pop(_PENDIENTES, None)
+    if pendientes:
+        escritor_auditoria.encolar(pendientes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_pendientes(session: Session) -> None:
+    # El rollback de un savepoint no descarta lo registrado en la transacción principal
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_PENDIENTES, None)
+
 
 def _serialize_value(value: Any) -> Any:
     """Serializa un valor para poder guardarlo en JSON."""
@@ -49,6 +80,32 @@ def _model_to_dict(obj: Any, exclude_fields: Optional[list] = None) -> Dict[str,
     return result
 
 
+def diferencias(
+    anterior: Dict[str, Any],
+    nuevo: Dict[str, Any]
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Campos que cambiaron entre dos versiones: (valores anteriores, valores nuevos)."""
+    cambios_anteriores = {}
+    cambios_nuevos = {}
+    for key in nuevo.keys() | anterior.keys():
+        if anterior.get(key) != nuevo.get(key):
+            cambios_anteriores[key] = anterior.get(key)
+            cambios_nuevos[key] = nuevo.get(key)
+    return cambios_anteriores, cambios_nuevos
+
+
+def condicion_campo_modificado(campo: str):
+    """
+    Condición para filtrar las entradas que incluyen un campo en datos_nuevos
+    (creaciones y ediciones que cambiaron ese campo).
+    
+    En PostgreSQL usa el operador ? de JSONB (índice GIN ix_audit_logs_datos_nuevos).
+    """
+    if engine.dialect.name == "postgresql":
+        return AuditLog.datos_nuevos.op("?")(campo)
+    return func.json_type(AuditLog.datos_nuevos, f'$."{campo}"').isnot(None)
+
+
 def registrar_auditoria(
     db: Session,
     usuario: Optional[User],
@@ -60,7 +117,7 @@ def registrar_auditoria(
     datos_nuevos: Optional[Dict[str, Any]] = None,
     ip_address: Optional[str] = None,
     user_agent: Optional[str] = None
-) -> AuditLog:
+) -> Optional[AuditLog]:
     """
     Registra una acción de auditoría en la base de datos.
     
@@ -77,23 +134,34 @@ def registrar_auditoria(
         user_agent: User-Agent del cliente
     
     Returns:
-        El registro de auditoría creado
+        El registro de auditoría creado (None en modo cola, donde se inserta
+        después del commit)
     """
-    log = AuditLog(
+    entrada = dict(
         usuario_id=usuario.id if usuario else None,
         usuario_username=usuario.username if usuario else "sistema",
         accion=accion,
         entidad=entidad,
         entidad_id=entidad_id,
         entidad_descripcion=entidad_descripcion,
-        datos_anteriores=json.dumps(datos_anteriores, ensure_ascii=False) if datos_anteriores else None,
-        datos_nuevos=json.dumps(datos_nuevos, ensure_ascii=False) if datos_nuevos else None,
+        datos_anteriores=datos_anteriores or None,
+        datos_nuevos=datos_nuevos or None,
         fecha_hora=datetime.utcnow(),
         ip_address=ip_address,
         user_agent=user_agent
     )
     
+    if settings.AUDIT_MODO == "cola" and escritor_auditoria.activo:
+        # El INSERT (y la serialización a JSON) la hace el escritor, fuera del request
+        db.info.setdefault(_PENDIENTES, []).append(entrada)
+        return None
+    
+    log = AuditLog(**entrada)
+    
     db.add(log)
+    sumar_auditoria_diaria(db, [clave_entrada(
+        entrada["fecha_hora"], accion, entidad, entrada["usuario_username"]
+    )])
     # No hacemos commit aquí para que sea parte de la transacción principal
     # El commit se hará en el endpoint
     
@@ -108,7 +176,7 @@ def audit_crear(
     descripcion: Optional[str] = None,
     ip_address: Optional[str] = None,
     user_agent: Optional[str] = None
-) -> AuditLog:
+) -> Optional[AuditLog]:
     """
     Registra la creación de un registro.
     
@@ -121,7 +189,11 @@ def audit_crear(
         ip_address: Dirección IP del cliente
         user_agent: User-Agent del cliente
     """
-    datos_nuevos = _model_to_dict(registro)
+    # Los campos vacíos no aportan al registro de la creación
+    datos_nuevos = {
+        key: valor for key, valor in _model_to_dict(registro).items()
+        if valor is not None
+    }
     
     return registrar_auditoria(
         db=db,
@@ -145,7 +217,7 @@ def audit_editar(
     descripcion: Optional[str] = None,
     ip_address: Optional[str] = None,
     user_agent: Optional[str] = None
-) -> AuditLog:
+) -> Optional[AuditLog]:
     """
     Registra la edición de un registro.
     
@@ -159,17 +231,8 @@ def audit_editar(
         ip_address: Dirección IP del cliente
         user_agent: User-Agent del cliente
     """
-    datos_nuevos = _model_to_dict(registro_nuevo)
-    
-    # Filtrar solo los campos que cambiaron
-    cambios_anteriores = {}
-    cambios_nuevos = {}
-    
-    for key, valor_nuevo in datos_nuevos.items():
-        valor_anterior = registro_anterior.get(key)
-        if valor_anterior != valor_nuevo:
-            cambios_anteriores[key] = valor_anterior
-            cambios_nuevos[key] = valor_nuevo
+    # Guardar solo los campos que cambiaron (vacío si no cambió ninguno)
+    cambios_anteriores, cambios_nuevos = diferencias(registro_anterior, _model_to_dict(registro_nuevo))
     
     return registrar_auditoria(
         db=db,
@@ -178,8 +241,8 @@ def audit_editar(
         entidad=entidad,
         entidad_id=registro_nuevo.id,
         entidad_descripcion=descripcion,
-        datos_anteriores=cambios_anteriores if cambios_anteriores else registro_anterior,
-        datos_nuevos=cambios_nuevos if cambios_nuevos else datos_nuevos,
+        datos_anteriores=cambios_anteriores,
+        datos_nuevos=cambios_nuevos,
         ip_address=ip_address,
         user_agent=user_agent
     )
@@ -193,7 +256,7 @@ def audit_eliminar(
     descripcion: Optional[str] = None,
     ip_address: Optional[str] = None,
     user_agent: Optional[str] = None
-) -> AuditLog:
+) -> Optional[AuditLog]:
     """
     Registra la eliminación de un registro.
     
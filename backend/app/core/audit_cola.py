@@ -0,0 +1,342 @@
+"""
+Escritura de auditoría en segundo plano (AUDIT_MODO=cola).
+
+En este modo los endpoints no insertan los logs en su transacción: al hacer
+commit, las entradas de la sesión pasan a una cola en memoria y un thread
+las inserta en bloque (un INSERT por lote de hasta AUDIT_BATCH_SIZE filas,
+como mínimo cada AUDIT_FLUSH_INTERVAL segundos).
+
+Si la base no está disponible (error de conexión), o la cola está llena,
+las entradas se guardan en disco (AUDIT_SPILL_DIR, un JSON por línea) y se
+reintentan después de cada inserción correcta o, sin actividad, cada
+_REINTENTO_DISCO segundos; también después de reiniciar. Al apagar la
+aplicación se vacía la cola antes de salir.
+
+Si la base rechaza el INSERT por los datos (IntegrityError/DataError, ej:
+un User-Agent más largo que la columna), el bloque se reintenta de a una
+fila: las válidas se guardan y las rechazadas van a un .invalidas.
+
+Archivos en disco:
+- Cada grupo de entradas va a su propio archivo
+  auditoria_{pid}_{n}.jsonl, escrito en un .tmp y renombrado al terminar:
+  un archivo pendiente nunca se modifica después.
+- Cada worker reintenta sus propios archivos y los de procesos que ya no
+  existen (ej: un worker reiniciado), nunca los de otro worker vivo. Para
+  tomarlo lo renombra a .{pid}.procesando.
+- Las líneas que no se pueden leer (ej: un archivo cortado por un apagado)
+  y las filas que la base rechaza se mueven a un .invalidas para
+  revisarlas a mano.
+"""
+
+import glob
+import itertools
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.core.auditoria_diaria import clave_entrada, sumar_auditoria_diaria
+from app.core.config import settings
+from app.core.database import engine
+from app.models.audit_log import AuditLog
+
+logger = logging.getLogger(__name__)
+
+# Marca para despertar al thread al apagar
+_FIN = object()
+
+# Segundos entre reintentos de los archivos de disco cuando no llegan entradas
+_REINTENTO_DISCO = 30.0
+
+# Errores por los datos de una fila (se descarta la fila, no el bloque)
+_ERRORES_DE_FILA = (IntegrityError, DataError, ValueError, KeyError, TypeError)
+
+# Proceso dueño de un archivo de disco: auditoria_{pid}_... (el que lo escribió)
+# o ....{pid}.procesando (el que lo tomó)
+_PID_PROCESANDO = re.compile(r"\.(\d+)\.procesando$")
+_PID_ESCRITOR = re.compile(r"^auditoria_(\d+)")
+
+
+def _pid_del_archivo(nombre: str) -> Optional[int]:
+    coincidencia = _PID_PROCESANDO.search(nombre) or _PID_ESCRITOR.match(nombre)
+    return int(coincidencia.group(1)) if coincidencia else None
+
+
+def _proceso_vivo(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Existe, pero de otro usuario
+        return True
+    return True
+
+
+def _nombre_base(nombre: str) -> str:
+    """Nombre del archivo pendiente, sin .tmp ni .{pid}.procesando."""
+    nombre = _PID_PROCESANDO.sub("", nombre)
+    return nombre[:-len(".tmp")] if nombre.endswith(".tmp") else nombre
+
+
+def _fila_para_insertar(entrada: Dict[str, Any]) -> Dict[str, Any]:
+    """Fila para el INSERT (las entradas leídas de disco traen la fecha como texto)."""
+    fila = dict(entrada)
+    if isinstance(fila.get("fecha_hora"), str):
+        fila["fecha_hora"] = datetime.fromisoformat(fila["fecha_hora"])
+    return fila
+
+
+class EscritorAuditoria:
+    """Cola de entradas de auditoría con inserción en bloque en un thread."""
+
+    def __init__(
+        self,
+        batch_size: int = 200,
+        intervalo: float = 1.0,
+        maximo_cola: int = 10000,
+        directorio_spill: str = "audit_spill"
+    ):
+        self.batch_size = batch_size
+        self.intervalo = intervalo
+        self.directorio_spill = directorio_spill
+        self._cola: "queue.Queue" = queue.Queue(maxsize=maximo_cola)
+        self._thread: Optional[threading.Thread] = None
+        self._secuencia = itertools.count()
+        self.escritas = 0
+        self.en_disco = 0
+
+    @property
+    def activo(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def iniciar(self) -> None:
+        if self.activo:
+            return
+        os.makedirs(self.directorio_spill, exist_ok=True)
+        self._thread = threading.Thread(target=self._ejecutar, name="auditoria", daemon=True)
+        self._thread.start()
+
+    def encolar(self, entradas: List[Dict[str, Any]]) -> None:
+        """Agrega entradas a la cola sin bloquear; si está llena, van a disco."""
+        desbordadas = []
+        for entrada in entradas:
+            try:
+                self._cola.put_nowait(entrada)
+            except queue.Full:
+                desbordadas.append(entrada)
+        if desbordadas:
+            logger.warning("Cola de auditoría llena: %d entradas a disco", len(desbordadas))
+            self._guardar_en_disco(desbordadas)
+
+    def detener(self, timeout: float = 30.0) -> None:
+        """Vacía la cola y detiene el thread (al apagar la aplicación)."""
+        if not self.activo:
+            return
+        self._cola.put(_FIN)
+        self._thread.join(timeout=timeout)
+        if self._thread.is_alive():
+            logger.error("La cola de auditoría no terminó de vaciarse en %.0f s", timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "modo": "cola",
+            "en_cola": self._cola.qsize(),
+            "escritas": self.escritas,
+            "enviadas_a_disco": self.en_disco,
+            "archivos_pendientes": len(glob.glob(os.path.join(self.directorio_spill, "auditoria_*.jsonl"))),
+        }
+
+    # ------------------------------------------------------------------
+    # Thread de escritura
+    # ------------------------------------------------------------------
+
+    def _ejecutar(self) -> None:
+        self._reintentar_disco()
+        ultimo_reintento = time.monotonic()
+        terminar = False
+        while not terminar:
+            lote, terminar = self._tomar_lote()
+            if lote:
+                pendientes = self._insertar(lote)
+                if pendientes:
+                    self._guardar_en_disco(pendientes)
+                    continue
+            elif time.monotonic() - ultimo_reintento < _REINTENTO_DISCO:
+                continue
+            self._reintentar_disco()
+            ultimo_reintento = time.monotonic()
+
+    def _tomar_lote(self) -> tuple:
+        """Junta hasta batch_size entradas o lo que llegue en el intervalo."""
+        lote = []
+        limite = time.monotonic() + self.intervalo
+        while len(lote) < self.batch_size:
+            restante = limite - time.monotonic()
+            try:
+                entrada = self._cola.get(timeout=max(restante, 0)) if restante > 0 else self._cola.get_nowait()
+            except queue.Empty:
+                break
+            if entrada is _FIN:
+                # Vaciar lo que quede antes de terminar
+                while True:
+                    try:
+                        lote.append(self._cola.get_nowait())
+                    except queue.Empty:
+                        return lote, True
+            lote.append(entrada)
+        return lote, False
+
+    def _insertar_bloque(self, entradas: List[Dict[str, Any]]) -> None:
+        """Inserta las entradas en una transacción (con sus contadores diarios)."""
+        with engine.begin() as conn:
+            filas = [_fila_para_insertar(e) for e in entradas]
+            conn.execute(insert(AuditLog.__table__), filas)
+            # Contadores de estadísticas en la misma transacción
+            sumar_auditoria_diaria(conn, [
+                clave_entrada(f["fecha_hora"], f["accion"], f["entidad"], f["usuario_username"])
+                for f in filas
+            ])
+        self.escritas += len(entradas)
+
+    def _insertar(self, entradas: List[Dict[str, Any]], origen: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Inserta las entradas en bloques de batch_size. Retorna las que
+        quedaron sin guardar porque la base no está disponible (para
+        mandarlas a disco). origen: archivo del que se leyeron, para el
+        .invalidas de las filas rechazadas.
+        """
+        origen = origen or f"auditoria_{os.getpid()}_rechazadas"
+        for inicio in range(0, len(entradas), self.batch_size):
+            bloque = entradas[inicio:inicio + self.batch_size]
+            try:
+                self._insertar_bloque(bloque)
+            except _ERRORES_DE_FILA:
+                logger.warning("Bloque de auditoría rechazado, reintentando de a una fila", exc_info=True)
+                pendientes = self._insertar_de_a_una(bloque, origen)
+                if pendientes:
+                    return pendientes + entradas[inicio + self.batch_size:]
+            except Exception:
+                # Sin conexión (OperationalError/InterfaceError) o un error
+                # desconocido: conservar las entradas en disco antes que perderlas
+                logger.exception("No se pudieron insertar %d entradas de auditoría", len(entradas) - inicio)
+                return entradas[inicio:]
+        return []
+
+    def _insertar_de_a_una(self, entradas: List[Dict[str, Any]], origen: str) -> List[Dict[str, Any]]:
+        """Inserta fila por fila; las rechazadas van al .invalidas. Retorna las pendientes."""
+        rechazadas = []
+        for posicion, entrada in enumerate(entradas):
+            try:
+                self._insertar_bloque([entrada])
+            except _ERRORES_DE_FILA as error:
+                logger.error("Entrada de auditoría rechazada por la base: %s", error)
+                rechazadas.append(entrada)
+            except Exception:
+                logger.exception("No se pudieron insertar %d entradas de auditoría", len(entradas) - posicion)
+                self._guardar_invalidas(origen, rechazadas)
+                return entradas[posicion:]
+        self._guardar_invalidas(origen, rechazadas)
+        return []
+
+    # ------------------------------------------------------------------
+    # Spill a disco
+    # ------------------------------------------------------------------
+
+    def _guardar_en_disco(self, entradas: List[Dict[str, Any]]) -> None:
+        """Guarda las entradas en un archivo nuevo (con fsync, visible solo completo)."""
+        nombre = f"auditoria_{os.getpid()}_{time.time_ns()}_{next(self._secuencia)}.jsonl"
+        ruta = os.path.join(self.directorio_spill, nombre)
+        os.makedirs(self.directorio_spill, exist_ok=True)
+        with open(f"{ruta}.tmp", "w", encoding="utf-8") as archivo:
+            for entrada in entradas:
+                archivo.write(json.dumps(entrada, ensure_ascii=False, default=str) + "\n")
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.rename(f"{ruta}.tmp", ruta)
+        self.en_disco += len(entradas)
+
+    def _archivos_recuperables(self) -> List[str]:
+        """Archivos pendientes de este proceso o de procesos que ya no existen."""
+        propio = os.getpid()
+        rutas = []
+        for ruta in sorted(glob.glob(os.path.join(self.directorio_spill, "auditoria_*"))):
+            nombre = os.path.basename(ruta)
+            pid = _pid_del_archivo(nombre)
+            if pid is None or nombre.endswith(".invalidas"):
+                continue
+            if pid == propio:
+                # Un .tmp propio se está escribiendo desde otro thread
+                if not nombre.endswith(".tmp"):
+                    rutas.append(ruta)
+            elif not _proceso_vivo(pid):
+                rutas.append(ruta)
+        return rutas
+
+    def _escribir_invalidas(self, nombre: str, lineas: List[str]) -> None:
+        if not lineas:
+            return
+        os.makedirs(self.directorio_spill, exist_ok=True)
+        destino = os.path.join(self.directorio_spill, f"{nombre}.invalidas")
+        with open(destino, "a", encoding="utf-8") as archivo:
+            archivo.writelines(lineas)
+        logger.error("%d entradas de auditoría movidas a %s", len(lineas), destino)
+
+    def _guardar_invalidas(self, origen: str, entradas: List[Dict[str, Any]]) -> None:
+        """Guarda las entradas rechazadas por la base en {origen}.invalidas."""
+        self._escribir_invalidas(origen, [
+            json.dumps(entrada, ensure_ascii=False, default=str) + "\n" for entrada in entradas
+        ])
+
+    def _leer_archivo(self, ruta: str) -> List[Dict[str, Any]]:
+        """Entradas de un archivo; las líneas ilegibles van a un .invalidas."""
+        entradas, invalidas = [], []
+        with open(ruta, encoding="utf-8", errors="replace") as archivo:
+            for linea in archivo:
+                if not linea.strip():
+                    continue
+                try:
+                    entradas.append(json.loads(linea))
+                except ValueError:
+                    invalidas.append(linea if linea.endswith("\n") else linea + "\n")
+        self._escribir_invalidas(_nombre_base(os.path.basename(ruta)), invalidas)
+        return entradas
+
+    def _reintentar_disco(self) -> None:
+        """Inserta los archivos pendientes recuperables (ver _archivos_recuperables)."""
+        for ruta in self._archivos_recuperables():
+            # Renombrar para tomar el archivo: si otro worker lo tomó antes, falla
+            tomado = os.path.join(
+                self.directorio_spill, f"{_nombre_base(os.path.basename(ruta))}.{os.getpid()}.procesando"
+            )
+            if ruta != tomado:
+                try:
+                    os.rename(ruta, tomado)
+                except OSError:
+                    continue
+
+            entradas = self._leer_archivo(tomado)
+            pendientes = self._insertar(entradas, _nombre_base(os.path.basename(ruta))) if entradas else []
+            if pendientes:
+                # La base sigue sin responder: devolver las entradas a disco
+                self._guardar_en_disco(pendientes)
+                os.remove(tomado)
+                return
+            os.remove(tomado)
+            logger.info("Recuperadas %d entradas de auditoría desde %s", len(entradas), ruta)
+
+
+escritor_auditoria = EscritorAuditoria(
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    intervalo=settings.AUDIT_FLUSH_INTERVAL,
+    maximo_cola=settings.AUDIT_QUEUE_MAX_SIZE,
+    directorio_spill=settings.AUDIT_SPILL_DIR
+)
@@ -0,0 +1,200 @@
+"""
+Particiones mensuales de audit_logs (solo PostgreSQL).
+
+Con la tabla particionada por rango de fecha_hora (ver
+migrate_audit_particiones.py), las consultas con filtro de fechas del
+listado y las estadísticas de auditoría solo leen las particiones de esos
+meses.
+
+- crear_particiones: crea las particiones de los meses próximos para que las
+  inserciones no caigan en la partición por defecto. Si igual cayeron (ej:
+  no se ejecutó el mantenimiento a tiempo), mueve esas filas a la partición
+  nueva.
+- archivar_particiones: política de retención. Separa (DETACH) las
+  particiones más antiguas que AUDIT_RETENCION_MESES, las exporta a un CSV
+  comprimido en AUDIT_ARCHIVO_DIR y recién entonces las elimina.
+
+Ambas se ejecutan desde mantener_auditoria.py (tarea programada) y la
+primera también al iniciar la aplicación.
+"""
+
+import gzip
+import logging
+import os
+import re
+from datetime import date
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+TABLA = "audit_logs"
+PARTICION_DEFECTO = "audit_logs_default"
+_PATRON_PARTICION = re.compile(r"^audit_logs_p(\d{4})_(\d{2})$")
+
+
+def inicio_mes(fecha: date) -> date:
+    return fecha.replace(day=1)
+
+
+def sumar_meses(mes: date, meses: int) -> date:
+    """Primer día del mes desplazado en `meses` (puede ser negativo)."""
+    indice = mes.year * 12 + mes.month - 1 + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def nombre_particion(mes: date) -> str:
+    return f"audit_logs_p{mes:%Y_%m}"
+
+
+def es_particionada(conn: Connection) -> bool:
+    """True si audit_logs ya es una tabla particionada."""
+    return conn.execute(text("""
+        SELECT 1 FROM pg_partitioned_table pt
+        JOIN pg_class c ON c.oid = pt.partrelid
+        WHERE c.relname = :tabla
+    """), {"tabla": TABLA}).first() is not None
+
+
+def particiones_mensuales(conn: Connection) -> List[Tuple[str, date, bool]]:
+    """
+    Tablas de particiones mensuales existentes: (nombre, mes, adjunta).
+
+    Incluye las separadas que quedaron sin archivar (ej: si falló la
+    exportación), para retomarlas en la siguiente ejecución.
+    """
+    filas = conn.execute(text("""
+        SELECT relname, relispartition FROM pg_class
+        WHERE relname LIKE 'audit\\_logs\\_p%' AND relkind = 'r'
+        ORDER BY relname
+    """)).all()
+    resultado = []
+    for nombre, adjunta in filas:
+        coincidencia = _PATRON_PARTICION.match(nombre)
+        if coincidencia:
+            mes = date(int(coincidencia.group(1)), int(coincidencia.group(2)), 1)
+            resultado.append((nombre, mes, adjunta))
+    return resultado
+
+
+def _filas_en_defecto(conn: Connection, desde: date, hasta: date) -> bool:
+    """True si la partición por defecto tiene logs entre esas fechas."""
+    if conn.execute(text("SELECT to_regclass(:nombre)"), {"nombre": PARTICION_DEFECTO}).scalar() is None:
+        return False
+    return conn.execute(text(
+        f"SELECT 1 FROM {PARTICION_DEFECTO} WHERE fecha_hora >= :desde AND fecha_hora < :hasta LIMIT 1"
+    ), {"desde": desde, "hasta": hasta}).first() is not None
+
+
+def _crear_particion(conn: Connection, tabla: str, mes: date) -> None:
+    """
+    Crea la partición del mes. PostgreSQL no la crea si la partición por
+    defecto ya tiene filas de ese rango: en ese caso se separa la de defecto,
+    se crea la mensual, se mueven las filas y se vuelve a adjuntar (en la
+    transacción de la conexión, con un lock sobre la tabla).
+    """
+    nombre = nombre_particion(mes)
+    hasta = sumar_meses(mes, 1)
+    crear = (
+        f"CREATE TABLE {nombre} PARTITION OF {tabla} "
+        f"FOR VALUES FROM ('{mes.isoformat()}') TO ('{hasta.isoformat()}')"
+    )
+    if not _filas_en_defecto(conn, mes, hasta):
+        conn.execute(text(crear))
+        return
+
+    conn.execute(text(f"ALTER TABLE {tabla} DETACH PARTITION {PARTICION_DEFECTO}"))
+    conn.execute(text(crear))
+    rango = {"desde": mes, "hasta": hasta}
+    movidas = conn.execute(text(
+        f"INSERT INTO {nombre} SELECT * FROM {PARTICION_DEFECTO} "
+        f"WHERE fecha_hora >= :desde AND fecha_hora < :hasta"
+    ), rango).rowcount
+    conn.execute(text(
+        f"DELETE FROM {PARTICION_DEFECTO} WHERE fecha_hora >= :desde AND fecha_hora < :hasta"
+    ), rango)
+    conn.execute(text(f"ALTER TABLE {tabla} ATTACH PARTITION {PARTICION_DEFECTO} DEFAULT"))
+    logger.warning("%d logs movidos de %s a %s", movidas, PARTICION_DEFECTO, nombre)
+
+
+def crear_particiones(conn: Connection, desde: date, hasta: date, tabla: str = TABLA) -> List[str]:
+    """
+    Crea las particiones mensuales de `desde` a `hasta` (inclusive) que no
+    existan y la partición por defecto. Retorna los nombres creados.
+    """
+    existentes = {nombre for nombre, _, _ in particiones_mensuales(conn)}
+    creadas = []
+    mes = inicio_mes(desde)
+    while mes <= hasta:
+        nombre = nombre_particion(mes)
+        if nombre not in existentes:
+            _crear_particion(conn, tabla, mes)
+            creadas.append(nombre)
+        mes = sumar_meses(mes, 1)
+
+    # Red de seguridad para fechas fuera de las particiones creadas
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {PARTICION_DEFECTO} PARTITION OF {tabla} DEFAULT"))
+    conn.commit()
+    return creadas
+
+
+def asegurar_particiones(conn: Connection, meses_adelante: int, hoy: Optional[date] = None) -> List[str]:
+    """Particiones del mes actual y los `meses_adelante` siguientes."""
+    mes_actual = inicio_mes(hoy or date.today())
+    return crear_particiones(conn, mes_actual, sumar_meses(mes_actual, meses_adelante))
+
+
+def _exportar(conn: Connection, nombre: str, directorio: str) -> str:
+    """Exporta una tabla a CSV comprimido (gzip). Retorna la ruta del archivo."""
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, f"{nombre}.csv.gz")
+    temporal = f"{ruta}.tmp"
+
+    cursor = conn.connection.cursor()
+    try:
+        with gzip.open(temporal, "wb") as archivo:
+            cursor.copy_expert(f"COPY {nombre} TO STDOUT WITH (FORMAT csv, HEADER)", archivo)
+    finally:
+        cursor.close()
+
+    # El archivo debe estar completo en disco antes de eliminar la tabla
+    with open(temporal, "rb") as archivo:
+        os.fsync(archivo.fileno())
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def archivar_particiones(
+    conn: Connection,
+    retencion_meses: int,
+    directorio: str,
+    hoy: Optional[date] = None
+) -> List[str]:
+    """
+    Separa, exporta y elimina las particiones de meses anteriores a la retención.
+
+    Args:
+        retencion_meses: Meses completos que se conservan además del actual
+        directorio: Carpeta de los archivos .csv.gz
+
+    Returns:
+        Rutas de los archivos generados
+    """
+    limite = sumar_meses(inicio_mes(hoy or date.today()), -retencion_meses)
+    archivos = []
+    for nombre, mes, adjunta in particiones_mensuales(conn):
+        if sumar_meses(mes, 1) > limite:
+            continue
+
+        if adjunta:
+            conn.execute(text(f"ALTER TABLE {TABLA} DETACH PARTITION {nombre}"))
+            conn.commit()
+
+        ruta = _exportar(conn, nombre, directorio)
+        conn.execute(text(f"DROP TABLE {nombre}"))
+        conn.commit()
+        logger.info("Partición %s archivada en %s", nombre, ruta)
+        archivos.append(ruta)
+    return archivos
@@ -0,0 +1,95 @@
+"""
+Mantenimiento de los contadores diarios de auditoría (tabla auditoria_diaria).
+
+Cada entrada de audit_logs suma 1 a la fila (día, acción, entidad, usuario)
+en la misma transacción que la inserta: en el endpoint con
+AUDIT_MODO=transaccion, o en el INSERT en bloque del escritor con
+AUDIT_MODO=cola. Las estadísticas de auditoría se calculan sobre estos
+contadores.
+
+Las particiones archivadas (ver audit_particiones.py) siguen contando en
+las estadísticas. Si los contadores se desincronizan, se reconstruyen con
+reconstruir_auditoria_diaria() (ver rebuild_auditoria_diaria.py).
+"""
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, Iterable, Tuple, Union
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.audit_log import AuditLog
+from app.models.auditoria_diaria import AuditoriaDiaria
+
+# (fecha, accion, entidad, usuario_username)
+Clave = Tuple[date, str, str, str]
+
+
+def clave_entrada(fecha_hora: Union[datetime, str], accion: str, entidad: str, usuario_username: str) -> Clave:
+    """Fila de contadores a la que suma una entrada de auditoría."""
+    if isinstance(fecha_hora, str):
+        fecha_hora = datetime.fromisoformat(fecha_hora)
+    return (fecha_hora.date(), accion, entidad, usuario_username or "sistema")
+
+
+def _sumar_a_fila(ejecutor: Union[Session, Connection], clave: Clave, cantidad: int) -> None:
+    """Suma a la fila de forma atómica, creándola si no existe."""
+    fecha, accion, entidad, usuario_username = clave
+    condicion = (
+        AuditoriaDiaria.fecha == fecha,
+        AuditoriaDiaria.accion == accion,
+        AuditoriaDiaria.entidad == entidad,
+        AuditoriaDiaria.usuario_username == usuario_username,
+    )
+    sumar = update(AuditoriaDiaria).where(*condicion).values(
+        cantidad=AuditoriaDiaria.cantidad + cantidad
+    ).execution_options(synchronize_session=False)
+
+    # UPDATE cantidad = cantidad + n: dos transacciones concurrentes no se pisan
+    if ejecutor.execute(sumar).rowcount:
+        return
+
+    savepoint = ejecutor.begin_nested()
+    try:
+        ejecutor.execute(insert(AuditoriaDiaria).values(
+            fecha=fecha, accion=accion, entidad=entidad,
+            usuario_username=usuario_username, cantidad=cantidad
+        ))
+        savepoint.commit()
+    except IntegrityError:
+        # Otra transacción creó la fila en paralelo: sumar sobre la suya
+        savepoint.rollback()
+        ejecutor.execute(sumar)
+
+
+def sumar_auditoria_diaria(ejecutor: Union[Session, Connection], claves: Iterable[Clave]) -> None:
+    """
+    Suma las entradas a los contadores, una escritura por fila distinta.
+    Acepta una sesión (endpoint) o una conexión (escritor en bloque). No hace commit.
+    """
+    conteos: Dict[Clave, int] = Counter(claves)
+    for clave, cantidad in conteos.items():
+        _sumar_a_fila(ejecutor, clave, cantidad)
+
+
+def reconstruir_auditoria_diaria(db: Session) -> int:
+    """
+    Recalcula todos los contadores a partir de audit_logs. No hace commit.
+
+    Returns:
+        Cantidad de filas generadas
+    """
+    db.query(AuditoriaDiaria).delete(synchronize_session=False)
+    fecha = func.date(AuditLog.fecha_hora)
+    usuario = func.coalesce(AuditLog.usuario_username, "sistema")
+    agregados = select(
+        fecha, AuditLog.accion, AuditLog.entidad, usuario, func.count(AuditLog.id)
+    ).group_by(
+        fecha, AuditLog.accion, AuditLog.entidad, usuario
+    )
+    db.execute(insert(AuditoriaDiaria).from_select(
+        ["fecha", "accion", "entidad", "usuario_username", "cantidad"], agregados
+    ))
+    return db.query(func.count()).select_from(AuditoriaDiaria).scalar()
@@ -0,0 +1,177 @@
+"""
+Índices de prefijos en memoria para autocompletar productos y clientes.
+
+Los formularios buscan productos/clientes mientras el operador escribe. En
+lugar de traer el listado completo, cada worker guarda un índice ordenado de
+términos (valores normalizados de las columnas buscables y cada palabra a
+partir de la segunda) y resuelve un prefijo con una búsqueda binaria, sin ir a
+la base.
+
+- Carga: completa en la primera consulta (solo registros activos).
+- Escritura: el bus de invalidación (app/core/invalidacion.py) avisa los
+  registros creados, editados o eliminados, en este worker o en otro; se
+  vuelven a leer en la próxima consulta y se reemplazan solo sus términos.
+"""
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.invalidacion import bus_invalidacion
+from app.models.cliente import Cliente
+from app.models.producto import Producto
+
+def normalizar(texto: str) -> str:
+    """Minúsculas y sin acentos: "Glifosáto" -> "glifosato"."""
+    descompuesto = unicodedata.normalize("NFKD", texto.strip().lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+class IndicePrefijos:
+    """
+    Índice ordenado de (término, id) de una tabla con columna activo.
+
+    Cada resultado es la tupla de columnas_respuesta del registro (ej: id,
+    codigo, nombre), en el orden de los términos que coinciden.
+    """
+
+    def __init__(self, nombre: str, modelo, columnas_busqueda: Tuple[str, ...], columnas_respuesta: Tuple[str, ...]):
+        self.nombre = nombre
+        self.modelo = modelo
+        self.columnas_busqueda = columnas_busqueda
+        self.columnas_respuesta = columnas_respuesta
+        self._lock = threading.Lock()
+        self._terminos: List[Tuple[str, int]] = []
+        self._registros: Dict[int, tuple] = {}
+        self._terminos_por_id: Dict[int, List[Tuple[str, int]]] = {}
+        self._cargado = False
+        # Registros cambiados, a releer en la próxima consulta
+        self._pendientes: Set[int] = set()
+        # Sube al descartar el índice completo (una carga en curso queda vieja)
+        self._generacion = 0
+
+    def _terminos_de(self, registro_id: int, valores: Iterable[Optional[str]]) -> List[Tuple[str, int]]:
+        terminos = set()
+        for valor in valores:
+            if not valor:
+                continue
+            normalizado = normalizar(valor)
+            palabras = normalizado.split()
+            # El valor completo y desde cada palabra: "glifosato 48 sl" -> "48 sl", "sl"
+            for i in range(len(palabras)):
+                terminos.add(" ".join(palabras[i:]))
+        return sorted((termino, registro_id) for termino in terminos)
+
+    def _poner(self, fila) -> None:
+        """Agrega o reemplaza un registro. fila: columnas_respuesta + columnas_busqueda."""
+        respuesta = tuple(fila[:len(self.columnas_respuesta)])
+        registro_id = respuesta[0]
+        self._sacar(registro_id)
+        terminos = self._terminos_de(registro_id, fila[len(self.columnas_respuesta):])
+        for termino in terminos:
+            insort(self._terminos, termino)
+        self._registros[registro_id] = respuesta
+        self._terminos_por_id[registro_id] = terminos
+
+    def _sacar(self, registro_id: int) -> None:
+        for termino in self._terminos_por_id.pop(registro_id, ()):
+            posicion = bisect_left(self._terminos, termino)
+            if posicion < len(self._terminos) and self._terminos[posicion] == termino:
+                del self._terminos[posicion]
+        self._registros.pop(registro_id, None)
+
+    def _consulta(self, db: Session):
+        columnas = [getattr(self.modelo, c) for c in self.columnas_respuesta + self.columnas_busqueda]
+        return db.query(*columnas).filter(self.modelo.activo == True)
+
+    def cargar(self, db: Session) -> None:
+        """Reconstruye el índice completo desde la base."""
+        with self._lock:
+            # Los avisos que lleguen durante la lectura quedan pendientes
+            atendidos = set(self._pendientes)
+            generacion = self._generacion
+        filas = self._consulta(db).all()
+        terminos, registros, terminos_por_id = [], {}, {}
+        for fila in filas:
+            registro_id = fila[0]
+            propios = self._terminos_de(registro_id, fila[len(self.columnas_respuesta):])
+            terminos.extend(propios)
+            registros[registro_id] = tuple(fila[:len(self.columnas_respuesta)])
+            terminos_por_id[registro_id] = propios
+        terminos.sort()
+        with self._lock:
+            self._terminos, self._registros, self._terminos_por_id = terminos, registros, terminos_por_id
+            self._pendientes -= atendidos
+            self._cargado = self._generacion == generacion
+
+    def _releer(self, db: Session, ids: Set[int]) -> None:
+        filas = {fila[0]: fila for fila in self._consulta(db).filter(self.modelo.id.in_(ids)).all()}
+        with self._lock:
+            for registro_id in ids:
+                if registro_id in filas:
+                    self._poner(filas[registro_id])
+                else:
+                    self._sacar(registro_id)
+
+    def buscar(self, db: Session, texto: str, limite: int) -> List[tuple]:
+        """Registros con algún término que empieza con el texto (hasta `limite`)."""
+        if not self._cargado:
+            self.cargar(db)
+        elif self._pendientes:
+            with self._lock:
+                pendientes, self._pendientes = self._pendientes, set()
+            self._releer(db, pendientes)
+
+        prefijo = normalizar(texto)
+        resultado, vistos = [], set()
+        with self._lock:
+            if not prefijo:
+                # Sin texto: los primeros según las columnas de respuesta (ej: por código)
+                return sorted(self._registros.values(), key=lambda registro: registro[1:])[:limite]
+            posicion = bisect_left(self._terminos, (prefijo,))
+            while posicion < len(self._terminos) and len(resultado) < limite:
+                termino, registro_id = self._terminos[posicion]
+                if not termino.startswith(prefijo):
+                    break
+                if registro_id not in vistos:
+                    vistos.add(registro_id)
+                    resultado.append(self._registros[registro_id])
+                posicion += 1
+        return resultado
+
+    def invalidar(self, ids: Optional[Set[int]]) -> None:
+        """Registros cambiados: releerlos en la próxima consulta (None: recargar todo)."""
+        with self._lock:
+            if ids is None:
+                self._generacion += 1
+                self._cargado = False
+            else:
+                self._pendientes.update(ids)
+
+    def stats(self) -> dict:
+        return {
+            "nombre": self.nombre,
+            "cargado": self._cargado,
+            "registros": len(self._registros),
+            "terminos": len(self._terminos),
+        }
+
+
+indice_productos = IndicePrefijos(
+    "autocompletar_productos",
+    Producto,
+    columnas_busqueda=("codigo", "nombre", "codigo_producto", "formato_lote"),
+    columnas_respuesta=("id", "codigo", "nombre"),
+)
+
+indice_clientes = IndicePrefijos(
+    "autocompletar_clientes",
+    Cliente,
+    columnas_busqueda=("codigo", "nombre", "cuit"),
+    columnas_respuesta=("id", "codigo", "nombre"),
+)
+
+for _indice in (indice_productos, indice_clientes):
+    bus_invalidacion.suscribir(_indice.nombre, _indice.modelo, _indice.invalidar)
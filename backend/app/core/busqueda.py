@@ -0,0 +1,211 @@
+"""
+Búsqueda por texto parcial (parámetro search de los listados).
+
+Un filtro "contiene" (ILIKE '%texto%') no puede usar los índices B-tree y
+recorre toda la tabla. Para evitarlo:
+
+- PostgreSQL: índices GIN de trigramas (extensión pg_trgm) sobre cada
+  columna buscable, declarados en los modelos con indices_trigramas().
+  ILIKE '%texto%' los usa directamente y los resultados se ordenan por
+  similarity() con el texto buscado.
+- SQLite (local/tests): una tabla FTS5 con tokenizer trigram por tabla
+  ({tabla}_busqueda), mantenida con triggers. El filtro es un MATCH sobre
+  ella y el orden, su rank (bm25). Los textos de menos de 3 caracteres no
+  tienen trigramas y se filtran con LIKE.
+
+COLUMNAS_BUSQUEDA define las columnas buscables de cada tabla. Para crear
+las tablas usar crear_tablas() en lugar de Base.metadata.create_all: activa
+pg_trgm antes (los índices de trigramas la necesitan) y crea las tablas FTS5
+después. En bases existentes los índices de PostgreSQL se crean con
+migrate_busqueda.py.
+"""
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import Index, case, column, func, literal_column, or_, select, table, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+
+from app.core.database import engine
+
+# Columnas buscables de cada tabla
+COLUMNAS_BUSQUEDA: Dict[str, Tuple[str, ...]] = {
+    "productos": ("codigo", "nombre", "codigo_producto", "formato_lote"),
+    "lotes": ("numero_lote",),
+    "clientes": ("codigo", "nombre", "cuit"),
+    "users": ("username", "email", "full_name"),
+    "audit_logs": ("entidad_descripcion", "usuario_username"),
+}
+
+# Longitud mínima para usar el índice de trigramas de SQLite
+MIN_TRIGRAMA = 3
+
+# Tablas FTS5 existentes (SQLite); None hasta la primera consulta
+_tablas_fts: Optional[Set[str]] = None
+
+
+def nombre_indice_trigramas(tabla: str, columna: str) -> str:
+    return f"ix_{tabla}_{columna}_trgm"
+
+
+def indices_trigramas(tabla: str) -> tuple:
+    """Índices GIN de trigramas de una tabla (solo PostgreSQL), para __table_args__."""
+    return tuple(
+        Index(
+            nombre_indice_trigramas(tabla, columna), columna,
+            postgresql_using="gin", postgresql_ops={columna: "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql")
+        for columna in COLUMNAS_BUSQUEDA[tabla]
+    )
+
+
+def _tabla_fts(tabla: str) -> str:
+    return f"{tabla}_busqueda"
+
+
+def _escapar_like(texto: str) -> str:
+    """Escapa los comodines de LIKE (se usa con escape="\\")."""
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _consulta_fts(texto: str, columnas) -> str:
+    """Consulta MATCH de FTS5: el texto como frase, solo en esas columnas."""
+    frase = texto.replace('"', '""')
+    return "{%s} : \"%s\"" % (" ".join(c.name for c in columnas), frase)
+
+
+def _usa_fts(tabla: str, texto: str) -> bool:
+    global _tablas_fts
+    if engine.dialect.name != "sqlite" or len(texto) < MIN_TRIGRAMA:
+        return False
+    if _tablas_fts is None:
+        with engine.connect() as conn:
+            _tablas_fts = set(conn.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE '%\\_busqueda' ESCAPE '\\'"
+            )).scalars())
+    return _tabla_fts(tabla) in _tablas_fts
+
+
+def _match_fts(tabla: str, texto: str, columnas):
+    nombre = _tabla_fts(tabla)
+    fts = table(nombre, column("rowid"), column("rank"))
+    return fts, literal_column(nombre).op("MATCH")(_consulta_fts(texto, columnas))
+
+
+def condicion_busqueda(texto: str, *columnas):
+    """
+    Condición "alguna de las columnas contiene el texto" (sin distinguir
+    mayúsculas), resuelta con el índice de búsqueda de la tabla.
+    Las columnas deben ser de una misma tabla de COLUMNAS_BUSQUEDA.
+    """
+    texto = texto.strip()
+    columnas = [c.expression for c in columnas]
+    tabla = columnas[0].table
+    if _usa_fts(tabla.name, texto):
+        fts, match = _match_fts(tabla.name, texto, columnas)
+        return tabla.c.id.in_(select(fts.c.rowid).where(match))
+    patron = f"%{_escapar_like(texto)}%"
+    return or_(*(c.ilike(patron, escape="\\") for c in columnas))
+
+
+def orden_busqueda(texto: str, *columnas):
+    """
+    Expresión de ORDER BY que pone primero los resultados más parecidos al
+    texto (usar junto con condicion_busqueda y las mismas columnas).
+    """
+    texto = texto.strip()
+    columnas = [c.expression for c in columnas]
+    tabla = columnas[0].table
+    if engine.dialect.name == "postgresql":
+        similitudes = [func.similarity(c, texto) for c in columnas]
+        similitud = similitudes[0] if len(similitudes) == 1 else func.greatest(*similitudes)
+        return similitud.desc()
+    if _usa_fts(tabla.name, texto):
+        fts, match = _match_fts(tabla.name, texto, columnas)
+        # rank de FTS5: menor es mejor
+        return select(fts.c.rank).where(fts.c.rowid == tabla.c.id, match).scalar_subquery().asc()
+    # Sin índice: primero las coincidencias al inicio del campo
+    prefijo = f"{_escapar_like(texto)}%"
+    return case((or_(*(c.ilike(prefijo, escape="\\") for c in columnas)), 0), else_=1).asc()
+
+
+def _crear_fts(conn: Connection, tabla: str) -> bool:
+    """Crea la tabla FTS5 de una tabla y sus triggers. True si se creó ahora."""
+    nombre = _tabla_fts(tabla)
+    columnas = COLUMNAS_BUSQUEDA[tabla]
+    existe = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nombre"), {"nombre": nombre}
+    ).first() is not None
+
+    lista = ", ".join(columnas)
+    nuevos = ", ".join(f"new.{c}" for c in columnas)
+    viejos = ", ".join(f"old.{c}" for c in columnas)
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {nombre} USING fts5("
+        f"{lista}, content='{tabla}', content_rowid='id', tokenize='trigram')"
+    ))
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS {nombre}_ai AFTER INSERT ON {tabla} BEGIN
+            INSERT INTO {nombre}(rowid, {lista}) VALUES (new.id, {nuevos});
+        END
+    """))
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS {nombre}_ad AFTER DELETE ON {tabla} BEGIN
+            INSERT INTO {nombre}({nombre}, rowid, {lista}) VALUES ('delete', old.id, {viejos});
+        END
+    """))
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS {nombre}_au AFTER UPDATE ON {tabla} BEGIN
+            INSERT INTO {nombre}({nombre}, rowid, {lista}) VALUES ('delete', old.id, {viejos});
+            INSERT INTO {nombre}(rowid, {lista}) VALUES (new.id, {nuevos});
+        END
+    """))
+    if not existe:
+        # Indexar las filas que ya tenía la tabla
+        conn.execute(text(f"INSERT INTO {nombre}({nombre}) VALUES ('rebuild')"))
+    return not existe
+
+
+def activar_trigramas(conn: Connection) -> None:
+    """Extensión pg_trgm (PostgreSQL); debe existir antes de crear los índices de trigramas."""
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+
+def crear_indices_busqueda(conn: Connection) -> list:
+    """
+    Crea las tablas FTS5 de búsqueda que falten (SQLite). No hace commit.
+    En PostgreSQL no hace nada: los índices de trigramas están en los modelos.
+
+    Returns:
+        Nombres de las tablas FTS5 creadas
+    """
+    global _tablas_fts
+    if conn.dialect.name != "sqlite":
+        return []
+    creadas = []
+    try:
+        for tabla in COLUMNAS_BUSQUEDA:
+            if _crear_fts(conn, tabla):
+                creadas.append(_tabla_fts(tabla))
+    except OperationalError as e:
+        # SQLite anterior a 3.34 (sin tokenizer trigram): se sigue buscando con LIKE
+        print(f"⚠️ Búsqueda sin índice FTS5: {e}")
+    _tablas_fts = None
+    return creadas
+
+
+def crear_tablas() -> list:
+    """
+    Crea las tablas que falten junto con sus índices de búsqueda.
+
+    Returns:
+        Nombres de las tablas FTS5 creadas (SQLite)
+    """
+    from app.core.database import Base
+    import app.models  # noqa: F401 (registra todas las tablas)
+
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            activar_trigramas(conn)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        return crear_indices_busqueda(conn)
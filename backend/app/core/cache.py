@@ -0,0 +1,94 @@
+"""
+Cache en memoria con expiración (TTL) y desalojo LRU.
+
+Se usa para datos que se leen en casi todos los requests y cambian poco
+(usuario del token, catálogos, etc.). Cada proceso (worker de uvicorn)
+tiene su propia instancia, por lo que el TTL acota cuánto tiempo puede
+quedar desactualizado un valor en otros workers.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Cache clave → valor con TTL y tamaño máximo, seguro entre threads.
+
+    - Al superar maxsize se descarta la entrada usada hace más tiempo (LRU).
+    - Con ttl <= 0 o maxsize <= 0 el cache queda deshabilitado.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, nombre: str = "cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.nombre = nombre
+        self._datos: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def habilitado(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, clave: Hashable, default: Any = None) -> Any:
+        """Obtiene un valor si existe y no expiró."""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self.misses += 1
+                return default
+            expira, valor = entrada
+            if expira < time.monotonic():
+                del self._datos[clave]
+                self.misses += 1
+                return default
+            self._datos.move_to_end(clave)
+            self.hits += 1
+            return valor
+
+    def set(self, clave: Hashable, valor: Any, ttl: Optional[float] = None) -> None:
+        """Guarda un valor. ttl permite una expiración menor a la del cache."""
+        if not self.habilitado:
+            return
+        duracion = self.ttl if ttl is None else min(ttl, self.ttl)
+        if duracion <= 0:
+            return
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + duracion, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maxsize:
+                self._datos.popitem(last=False)
+
+    def delete(self, clave: Hashable) -> None:
+        """Elimina una clave si existe."""
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def delete_where(self, condicion: Callable[[Hashable, Any], bool]) -> int:
+        """Elimina las entradas que cumplen la condición. Retorna cuántas se eliminaron."""
+        with self._lock:
+            claves = [clave for clave, (_, valor) in self._datos.items() if condicion(clave, valor)]
+            for clave in claves:
+                del self._datos[clave]
+            return len(claves)
+
+    def clear(self) -> None:
+        """Vacía el cache."""
+        with self._lock:
+            self._datos.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de uso del cache."""
+        with self._lock:
+            return {
+                "nombre": self.nombre,
+                "tamano": len(self._datos),
+                "maximo": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
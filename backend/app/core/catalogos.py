@@ -0,0 +1,123 @@
+"""
+Cache en memoria de los catálogos (sectores, líneas, clientes y roles).
+
+Son tablas de referencia chicas que cambian pocas veces al mes pero se leen
+en casi todos los requests (validar el sector y la línea de un estado, el
+cliente de un producto, el rol de un usuario, el árbol del timeline). Cada
+worker guarda una copia completa de cada tabla (columnas, no objetos ORM):
+
+- Versión por tabla: cualquier cambio en la tabla (en este worker o en
+  otro, vía el bus de invalidación de app/core/invalidacion.py) sube la
+  versión y descarta la copia. Una copia leída con una versión anterior
+  (cambio durante la carga) no se usa.
+- El TTL (CATALOGO_CACHE_TTL_SECONDS) acota cuánto puede quedar
+  desactualizada una copia si se pierde un aviso o se edita la base a mano.
+
+La copia puede estar desactualizada hasta el TTL, así que solo sirve para
+lecturas (existe, nombre, a qué sector pertenece): obtener() y listar()
+devuelven las columnas, no objetos de la sesión. Los endpoints que modifican
+un registro lo leen con la sesión (db.get). productos no está en el
+catálogo: es una tabla grande y sus valores (litros por unidad, años de
+vencimiento) se copian a los lotes que se crean.
+"""
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.invalidacion import bus_invalidacion
+from app.models.cliente import Cliente
+from app.models.linea import Linea
+from app.models.sector import Sector
+from app.models.user import Role
+
+
+class Catalogo:
+    """Copia completa de una tabla de referencia, ordenada e indexada por id."""
+
+    def __init__(self, modelo, orden: tuple, ttl: float):
+        self.modelo = modelo
+        self.nombre = f"catalogo_{modelo.__tablename__}"
+        self.orden = orden
+        self.ttl = ttl
+        self.version = 0
+        self._lock = threading.Lock()
+        # (versión, expira, filas por id en el orden del catálogo)
+        self._copia: Optional[tuple] = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def habilitado(self) -> bool:
+        return self.ttl > 0
+
+    def _cargar(self, db: Session) -> Dict[int, dict]:
+        columnas = self.modelo.__table__.columns
+        consulta = select(*columnas).order_by(*[getattr(self.modelo, c) for c in self.orden])
+        return {fila["id"]: dict(fila) for fila in db.execute(consulta).mappings()}
+
+    def filas(self, db: Session) -> Dict[int, dict]:
+        """Filas por id (no modificar). Las lee de la base si no hay copia vigente."""
+        with self._lock:
+            version = self.version
+            copia = self._copia
+            if copia is not None and copia[0] == version and copia[1] > time.monotonic():
+                self.hits += 1
+                return copia[2]
+            self.misses += 1
+
+        filas = self._cargar(db)
+        if self.habilitado:
+            with self._lock:
+                # Si se invalidó durante la carga, la próxima lectura vuelve a cargar
+                if self.version == version:
+                    self._copia = (version, time.monotonic() + self.ttl, filas)
+        return filas
+
+    def listar(self, db: Session, solo_activos: bool = True) -> List[dict]:
+        """Filas en el orden del catálogo (no modificar)."""
+        filas = self.filas(db).values()
+        if solo_activos and "activo" in self.modelo.__table__.columns:
+            return [fila for fila in filas if fila["activo"]]
+        return list(filas)
+
+    def obtener(self, db: Session, registro_id: Optional[int]) -> Optional[dict]:
+        """Columnas del registro por id (None si no existe). Solo para lecturas."""
+        if registro_id is None:
+            return None
+        datos = self.filas(db).get(registro_id)
+        return dict(datos) if datos is not None else None
+
+    def invalidar(self, claves=None) -> None:
+        """Descarta la copia (la llama el bus de invalidación)."""
+        with self._lock:
+            self.version += 1
+            self._copia = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "nombre": self.nombre,
+                "version": self.version,
+                "cargado": self._copia is not None,
+                "registros": len(self._copia[2]) if self._copia else 0,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_ttl = settings.CATALOGO_CACHE_TTL_SECONDS
+
+catalogo_sectores = Catalogo(Sector, ("nombre", "id"), _ttl)
+catalogo_lineas = Catalogo(Linea, ("nombre", "id"), _ttl)
+catalogo_clientes = Catalogo(Cliente, ("nombre", "id"), _ttl)
+catalogo_roles = Catalogo(Role, ("id",), _ttl)
+
+CATALOGOS = (catalogo_sectores, catalogo_lineas, catalogo_clientes, catalogo_roles)
+
+for _catalogo in CATALOGOS:
+    bus_invalidacion.suscribir(_catalogo.nombre, _catalogo.modelo, _catalogo.invalidar)
@@ -0,0 +1,183 @@
+"""
+Middleware de compresión de respuestas (brotli o gzip).
+
+- Solo comprime los media types configurados (JSON, CSV, texto) y deja
+  pasar sin tocar el resto (ej: text/event-stream del timeline, que debe
+  llegar evento por evento).
+- Respuestas completas: se comprimen si superan el tamaño mínimo.
+- Respuestas en streaming (ej: exportación CSV): se comprime cada bloque a
+  medida que se genera, sin acumular el archivo en memoria.
+
+Brotli se usa si el paquete está instalado y el cliente lo acepta; si no,
+gzip.
+"""
+
+import zlib
+from typing import Iterable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # Dependencia opcional
+    brotli = None
+
+
+def _codificacion_aceptada(accept_encoding: str, brotli_disponible: bool) -> Optional[str]:
+    """Elige "br" o "gzip" según Accept-Encoding (ignorando las de q=0)."""
+    aceptadas = set()
+    for parte in accept_encoding.lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        parametros = parametros.replace(" ", "")
+        if parametros in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        aceptadas.add(nombre.strip())
+
+    if brotli_disponible and "br" in aceptadas:
+        return "br"
+    if "gzip" in aceptadas:
+        return "gzip"
+    return None
+
+
+class _Compresor:
+    """Compresor incremental con la misma interfaz para gzip y brotli."""
+
+    def __init__(self, codificacion: str, nivel_gzip: int, calidad_brotli: int):
+        self.codificacion = codificacion
+        if codificacion == "br":
+            self._brotli = brotli.Compressor(quality=calidad_brotli)
+        else:
+            # wbits=31: formato gzip (encabezado + CRC)
+            self._zlib = zlib.compressobj(nivel_gzip, zlib.DEFLATED, 31)
+
+    def comprimir(self, datos: bytes) -> bytes:
+        """Comprime un bloque y lo deja listo para enviar (flush)."""
+        if self.codificacion == "br":
+            return self._brotli.process(datos) + self._brotli.flush()
+        return self._zlib.compress(datos) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finalizar(self) -> bytes:
+        if self.codificacion == "br":
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+class CompresionMiddleware:
+    """
+    Middleware ASGI de compresión.
+
+    Args:
+        app: Aplicación ASGI
+        tamano_minimo: Bytes mínimos para comprimir una respuesta completa
+        media_types: Media types que se comprimen (sin parámetros, ej: "application/json")
+        nivel_gzip: Nivel de gzip (1-9)
+        calidad_brotli: Calidad de brotli (0-11; 4-5 es un buen balance para respuestas dinámicas)
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        tamano_minimo: int = 1024,
+        media_types: Iterable[str] = ("application/json", "text/csv", "text/plain"),
+        nivel_gzip: int = 6,
+        calidad_brotli: int = 4
+    ):
+        self.app = app
+        self.tamano_minimo = tamano_minimo
+        self.media_types = {media_type.strip().lower() for media_type in media_types}
+        self.nivel_gzip = nivel_gzip
+        self.calidad_brotli = calidad_brotli
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        codificacion = _codificacion_aceptada(
+            Headers(scope=scope).get("accept-encoding", ""),
+            brotli is not None
+        )
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+
+        await _RespuestaComprimida(self, codificacion, send).ejecutar(scope, receive)
+
+
+class _RespuestaComprimida:
+    """Estado de compresión de una respuesta."""
+
+    def __init__(self, middleware: CompresionMiddleware, codificacion: str, send: Send):
+        self.middleware = middleware
+        self.codificacion = codificacion
+        self.send = send
+        self.inicio: Optional[Message] = None
+        self.comprimir = False
+        self.compresor: Optional[_Compresor] = None
+
+    async def ejecutar(self, scope: Scope, receive: Receive) -> None:
+        await self.middleware.app(scope, receive, self.enviar)
+
+    def _es_comprimible(self, headers: Headers) -> bool:
+        if headers.get("content-encoding"):
+            return False
+        media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return media_type in self.middleware.media_types
+
+    async def enviar(self, message: Message) -> None:
+        tipo = message["type"]
+
+        if tipo == "http.response.start":
+            # Esperar el primer bloque del cuerpo para decidir
+            self.inicio = message
+            self.comprimir = (
+                message["status"] not in (204, 304)
+                and self._es_comprimible(Headers(raw=message["headers"]))
+            )
+            if not self.comprimir:
+                await self.send(message)
+            return
+
+        if tipo != "http.response.body" or not self.comprimir:
+            await self.send(message)
+            return
+
+        cuerpo = message.get("body", b"")
+        hay_mas = message.get("more_body", False)
+
+        if self.compresor is None:
+            headers = MutableHeaders(raw=self.inicio["headers"])
+            headers.add_vary_header("Accept-Encoding")
+
+            if not hay_mas and len(cuerpo) < self.middleware.tamano_minimo:
+                # Respuesta chica: no vale la pena comprimir
+                self.comprimir = False
+                await self.send(self.inicio)
+                await self.send(message)
+                return
+
+            self.compresor = _Compresor(
+                self.codificacion, self.middleware.nivel_gzip, self.middleware.calidad_brotli
+            )
+            headers["Content-Encoding"] = self.codificacion
+
+            if not hay_mas:
+                # Respuesta completa: comprimir de una vez con Content-Length
+                comprimido = self.compresor.comprimir(cuerpo) + self.compresor.finalizar()
+                headers["Content-Length"] = str(len(comprimido))
+                await self.send(self.inicio)
+                await self.send({"type": "http.response.body", "body": comprimido})
+                return
+
+            # Streaming: el tamaño final no se conoce
+            if "content-length" in headers:
+                del headers["Content-Length"]
+            await self.send(self.inicio)
+
+        datos = self.compresor.comprimir(cuerpo) if cuerpo else b""
+        if not hay_mas:
+            datos += self.compresor.finalizar()
+        if datos or not hay_mas:
+            await self.send({"type": "http.response.body", "body": datos, "more_body": hay_mas})
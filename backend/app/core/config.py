@@ -24,11 +24,78 @@ class Settings:
             return database_url
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
     
+    # Pools de conexiones (por worker de uvicorn): el sync y el async (endpoints
+    # async), más la conexión del LISTEN con EVENTOS_BACKEND=postgres.
+    # Dimensionamiento: WEB_CONCURRENCY * (DB_POOL_SIZE + DB_MAX_OVERFLOW +
+    # DB_ASYNC_POOL_SIZE + DB_ASYNC_MAX_OVERFLOW + 1) debe quedar por debajo de
+    # max_connections de PostgreSQL menos una reserva para migraciones, psql y
+    # otros servicios. Ej: 3 workers * (5 + 10 + 5 + 5 + 1) = 78 conexiones de 100.
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_ASYNC_POOL_SIZE: int = int(os.getenv("DB_ASYNC_POOL_SIZE", "5"))
+    DB_ASYNC_MAX_OVERFLOW: int = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", "5"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # Segundos esperando una conexión libre
+    # Reciclar conexiones antes de que el proxy de Railway las corte por inactividad
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    # Tiempo máximo por sentencia SQL en milisegundos (0 = sin límite, solo PostgreSQL)
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+    DB_APPLICATION_NAME: str = os.getenv("DB_APPLICATION_NAME", "planproduccion-api")
+    
     # JWT
     SECRET_KEY: str = os.getenv("SECRET_KEY", "tu-clave-secreta-muy-segura-cambiar-en-produccion")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 24 horas
     
+    # Contraseñas (bcrypt)
+    # Costo del hash: cada +1 duplica el tiempo de login. Al cambiarlo, los hashes
+    # existentes se actualizan en el siguiente login de cada usuario
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    # Hashes simultáneos por worker (idealmente <= núcleos de CPU disponibles)
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    
+    # Cache de usuarios autenticados (token -> usuario). 0 para deshabilitar
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+    USER_CACHE_MAX_SIZE: int = int(os.getenv("USER_CACHE_MAX_SIZE", "1024"))
+    
+    # Cache del último lote de cada producto (validación y sugerencia de número). 0 para deshabilitar
+    ULTIMO_LOTE_CACHE_TTL_SECONDS: int = int(os.getenv("ULTIMO_LOTE_CACHE_TTL_SECONDS", "300"))
+    ULTIMO_LOTE_CACHE_MAX_SIZE: int = int(os.getenv("ULTIMO_LOTE_CACHE_MAX_SIZE", "5000"))
+    
+    # Cache de catálogos (sectores, líneas, clientes, roles). 0 para deshabilitar
+    CATALOGO_CACHE_TTL_SECONDS: int = int(os.getenv("CATALOGO_CACHE_TTL_SECONDS", "300"))
+    
+    # Eventos en tiempo real (SSE del timeline)
+    # "memoria": un solo worker | "postgres": NOTIFY/LISTEN entre workers
+    EVENTOS_BACKEND: str = os.getenv("EVENTOS_BACKEND", "memoria").lower()
+    EVENTOS_CANAL_PG: str = os.getenv("EVENTOS_CANAL_PG", "planproduccion_eventos")
+    
+    # Auditoría
+    # "transaccion": el log se guarda en el mismo commit del endpoint
+    # "cola": se encola después del commit y un thread lo inserta en bloque
+    AUDIT_MODO: str = os.getenv("AUDIT_MODO", "transaccion").lower()
+    AUDIT_BATCH_SIZE: int = int(os.getenv("AUDIT_BATCH_SIZE", "200"))  # Filas por INSERT
+    AUDIT_FLUSH_INTERVAL: float = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))  # Segundos
+    AUDIT_QUEUE_MAX_SIZE: int = int(os.getenv("AUDIT_QUEUE_MAX_SIZE", "10000"))
+    # Entradas que no se pudieron insertar (base caída o cola llena); se reintentan
+    AUDIT_SPILL_DIR: str = os.getenv("AUDIT_SPILL_DIR", "audit_spill")
+    # Particiones mensuales de audit_logs (PostgreSQL, ver migrate_audit_particiones.py)
+    AUDIT_PARTICIONES_ADELANTE: int = int(os.getenv("AUDIT_PARTICIONES_ADELANTE", "3"))  # Meses
+    # Meses completos que se conservan en la base (0 = no archivar nunca)
+    AUDIT_RETENCION_MESES: int = int(os.getenv("AUDIT_RETENCION_MESES", "24"))
+    AUDIT_ARCHIVO_DIR: str = os.getenv("AUDIT_ARCHIVO_DIR", "audit_archivo")
+    
+    # Compresión de respuestas (brotli si está instalado, si no gzip)
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # Bytes
+    COMPRESSION_MEDIA_TYPES: str = os.getenv("COMPRESSION_MEDIA_TYPES", "application/json,text/csv,text/plain")
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+    
+    @property
+    def compression_media_types_list(self) -> list:
+        return [media_type.strip() for media_type in self.COMPRESSION_MEDIA_TYPES.split(",") if media_type.strip()]
+    
     # CORS - URLs permitidas (separadas por coma)
     CORS_ORIGINS: str = os.getenv("CORS_ORIGINS", "http://localhost:5173,http://127.0.0.1:5173,http://localhost:5174,http://localhost:5175,http://localhost:5176,http://localhost:5177,http://localhost:5178")
     
@@ -1,10 +1,37 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.core.config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+
+def _engine_options(database_url: str) -> dict:
+    """
+    Opciones del engine según Settings.
+    
+    El pool (tamaño, overflow, recycle, pre-ping) solo se configura para
+    PostgreSQL; SQLite (tests/local) usa el pool por defecto de SQLAlchemy.
+    """
+    if make_url(database_url).get_backend_name() != "postgresql":
+        return {}
+    
+    options = [f"-c application_name={settings.DB_APPLICATION_NAME}"]
+    if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        options.append(f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}")
+    
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": {"options": " ".join(options)},
+    }
+
+
+engine = create_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -17,3 +44,94 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ============================================================================
+# ACCESO ASÍNCRONO (endpoints de solo lectura más consultados)
+# ============================================================================
+# Usa asyncpg en PostgreSQL y aiosqlite en SQLite. El engine se crea recién
+# en el primer uso para no requerir el driver async si no se usa.
+# Tiene su propio pool (DB_ASYNC_POOL_SIZE + DB_ASYNC_MAX_OVERFLOW), que se
+# suma al del engine sync en el máximo de conexiones por worker.
+
+_async_engine = None
+_AsyncSessionLocal = None
+
+
+def _async_engine_args(database_url: str) -> tuple:
+    """URL con driver async y opciones del engine según Settings."""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite"), {}
+    if backend != "postgresql":
+        return url, {}
+    
+    server_settings = {"application_name": settings.DB_APPLICATION_NAME}
+    if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        server_settings["statement_timeout"] = str(settings.DB_STATEMENT_TIMEOUT_MS)
+    
+    return url.set(drivername="postgresql+asyncpg"), {
+        "pool_size": settings.DB_ASYNC_POOL_SIZE,
+        "max_overflow": settings.DB_ASYNC_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": {"server_settings": server_settings},
+    }
+
+
+def get_async_engine():
+    """Engine async (se crea en el primer uso)."""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        url, options = _async_engine_args(settings.DATABASE_URL)
+        _async_engine = create_async_engine(url, **options)
+        _AsyncSessionLocal = async_sessionmaker(
+            _async_engine,
+            class_=AsyncSession,
+            autoflush=False,
+            expire_on_commit=False
+        )
+    return _async_engine
+
+
+async def get_async_db():
+    """Dependencia para obtener sesión asíncrona de base de datos."""
+    get_async_engine()
+    async with _AsyncSessionLocal() as db:
+        yield db
+
+
+async def dispose_async_engine():
+    """Cierra las conexiones del engine async (al apagar la aplicación)."""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _AsyncSessionLocal = None
+
+
+def _estado_pool(pool, max_overflow: int) -> dict:
+    stats = {"pool": type(pool).__name__}
+    if hasattr(pool, "checkedout"):
+        stats.update({
+            "tamano": pool.size(),
+            "en_uso": pool.checkedout(),
+            "disponibles": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "max_overflow": max_overflow,
+            "timeout": settings.DB_POOL_TIMEOUT,
+        })
+    return stats
+
+
+def pool_stats() -> dict:
+    """Estado actual de los pools de conexiones de este worker (sync y async)."""
+    stats = _estado_pool(engine.pool, settings.DB_MAX_OVERFLOW)
+    if _async_engine is None:
+        stats["async"] = {"pool": None, "creado": False}
+    else:
+        stats["async"] = _estado_pool(_async_engine.pool, settings.DB_ASYNC_MAX_OVERFLOW)
+    return stats
@@ -1,29 +1,88 @@
-from fastapi import Depends, HTTPException, status
+import time
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.core.database import get_db
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import get_db, get_async_db, SessionLocal
+from app.core.invalidacion import bus_invalidacion
 from app.core.security import decode_token
-from app.models.user import User
+from app.models.user import User, Role
 
 security = HTTPBearer()
 
+# Cache token -> datos del usuario autenticado.
+# Evita decodificar el JWT y consultar users/roles en cada request. Los
+# cambios en users y roles lo invalidan en todos los workers (ver
+# app/core/invalidacion.py).
+usuarios_cache = TTLCache(
+    maxsize=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+    nombre="usuarios"
+)
+
+
+def _columnas(obj) -> dict:
+    """Valores de las columnas de un modelo (para guardarlos en el cache)."""
+    return {column.key: getattr(obj, column.key) for column in obj.__table__.columns}
+
+
+def _usuario_desde_cache(db: Session, datos: dict) -> User:
+    """
+    Reconstruye el usuario cacheado y lo asocia a la sesión sin consultar la base.
+
+    Se usa merge(load=False), por lo que el usuario (y su rol) quedan como si
+    se hubieran leído de la base: los endpoints pueden modificarlo y hacer
+    commit igual que con el usuario consultado.
+    """
+    role = Role(**datos["role"])
+    make_transient_to_detached(role)
+
+    user = User(**datos["user"])
+    make_transient_to_detached(user)
+    set_committed_value(user, "role", role)
+
+    return db.merge(user, load=False)
+
+
+def invalidar_usuario_cache(user_ids) -> None:
+    """Elimina del cache todas las sesiones de esos usuarios (None: todas)."""
+    if user_ids is None:
+        usuarios_cache.clear()
+        return
+    usuarios_cache.delete_where(lambda _, datos: datos["user"]["id"] in user_ids)
+
+
+def invalidar_cache_usuarios(role_ids=None) -> None:
+    """Vacía el cache de usuarios (ej: cambios en roles)."""
+    usuarios_cache.clear()
+
+
+bus_invalidacion.suscribir(usuarios_cache.nombre, User, invalidar_usuario_cache)
+bus_invalidacion.suscribir("usuarios_roles", Role, invalidar_cache_usuarios)
+
+
+def autenticar_token(db: Session, token: str) -> User:
+    """Obtiene el usuario de un token JWT (usando el cache de usuarios)."""
+    datos = usuarios_cache.get(token)
+    if datos is not None:
+        # Solo se cachean usuarios activos; al desactivarlos se invalida el cache
+        return _usuario_desde_cache(db, datos)
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Obtiene el usuario actual a partir del token JWT."""
-    token = credentials.credentials
     payload = decode_token(token)
-    
+
     if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido o expirado",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+
     username: str = payload.get("sub")
     if username is None:
         raise HTTPException(
@@ -31,32 +90,85 @@ def get_current_user(
             detail="Token inválido",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    user = db.query(User).filter(User.username == username).first()
+
+    # Cargar el rol en la misma consulta (get_current_active_admin lo usa)
+    user = db.query(User).options(joinedload(User.role)).filter(User.username == username).first()
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuario no encontrado",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Usuario inactivo"
         )
-    
+
+    # Guardar en cache sin superar la expiración del token
+    ttl: Optional[float] = None
+    if payload.get("exp"):
+        ttl = payload["exp"] - time.time()
+    usuarios_cache.set(token, {"user": _columnas(user), "role": _columnas(user.role)}, ttl=ttl)
+
     return user
 
 
-def get_current_active_admin(current_user: User = Depends(get_current_user)) -> User:
-    """Verifica que el usuario actual sea administrador."""
-    if current_user.role.name != "admin":
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """Obtiene el usuario actual a partir del token JWT."""
+    return autenticar_token(db, credentials.credentials)
+
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """
+    Igual que get_current_user, para los endpoints async: usa la sesión async
+    del request, sin pasar por el threadpool ni tomar una conexión del pool
+    sync. El usuario queda en esa sesión (el rol ya cargado).
+    """
+    return await db.run_sync(autenticar_token, credentials.credentials)
+
+
+def get_current_user_sse(token: str = Query(..., description="Token JWT")) -> User:
+    """
+    Obtiene el usuario actual para conexiones SSE.
+
+    EventSource no permite enviar headers, por lo que el token llega como
+    query param. La sesión se cierra enseguida: la conexión SSE queda
+    abierta mucho tiempo y no debe retener una conexión del pool.
+    """
+    db = SessionLocal()
+    try:
+        user = autenticar_token(db, token)
+        db.expunge(user)
+        return user
+    finally:
+        db.close()
+
+
+def _verificar_admin(user: User) -> User:
+    if user.role.name != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="No tienes permisos de administrador"
         )
-    return current_user
+    return user
+
+
+def get_current_active_admin(current_user: User = Depends(get_current_user)) -> User:
+    """Verifica que el usuario actual sea administrador."""
+    return _verificar_admin(current_user)
+
+
+async def get_current_active_admin_async(current_user: User = Depends(get_current_user_async)) -> User:
+    """Verifica que el usuario actual sea administrador (endpoints async)."""
+    return _verificar_admin(current_user)
 
 
 # Alias para compatibilidad
@@ -0,0 +1,91 @@
+"""
+ETag y GET condicional (If-None-Match → 304 Not Modified).
+
+La versión de un recurso se calcula con una consulta mínima sobre las
+tablas de las que depende: cantidad de filas, id máximo y última fecha de
+modificación (updated_at o created_at). Cualquier alta, baja o edición
+cambia alguno de los tres valores. Si el cliente ya tiene esa versión se
+responde 304 sin consultar ni serializar los datos.
+
+Uso en un endpoint:
+
+    no_modificado = verificar_etag(request, response, db.execute(consulta_version(Sector)).one())
+    if no_modificado:
+        return no_modificado
+"""
+
+import hashlib
+from typing import Any, Iterable, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import String, cast, func, select
+
+from app.core.config import settings
+
+
+def _version_tabla(modelo, condiciones: Iterable = ()):
+    """Subconsulta escalar "filas:id_max:ultima_modificacion" de una tabla."""
+    ultima_modificacion = func.max(func.coalesce(modelo.updated_at, modelo.created_at))
+    return select(
+        cast(func.count(), String) + ":" +
+        func.coalesce(cast(func.max(modelo.id), String), "") + ":" +
+        func.coalesce(cast(ultima_modificacion, String), "")
+    ).select_from(modelo).where(*condiciones).scalar_subquery()
+
+
+def consulta_version(*tablas):
+    """
+    Consulta con la versión de cada tabla en una sola ida a la base.
+
+    Args:
+        tablas: Modelos, o tuplas (modelo, condiciones) para versionar solo
+            las filas que usa el recurso (ej: los estados de un día)
+    """
+    columnas = []
+    for tabla in tablas:
+        if isinstance(tabla, tuple):
+            columnas.append(_version_tabla(*tabla))
+        else:
+            columnas.append(_version_tabla(tabla))
+    return select(*columnas)
+
+
+def calcular_etag(request: Request, version: Any) -> str:
+    """ETag débil a partir de la versión de los datos y los query params."""
+    contenido = f"{settings.VERSION}|{request.url.path}|{request.url.query}|{tuple(version)}"
+    return f'W/"{hashlib.sha1(contenido.encode("utf-8")).hexdigest()[:20]}"'
+
+
+def _coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """Compara If-None-Match con el ETag (comparación débil, admite lista y *)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    valor = etag[2:] if etag.startswith("W/") else etag
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato.startswith("W/"):
+            candidato = candidato[2:]
+        if candidato == valor:
+            return True
+    return False
+
+
+def verificar_etag(request: Request, response: Response, version: Any) -> Optional[Response]:
+    """
+    Agrega ETag y Cache-Control a la respuesta.
+
+    Returns:
+        Respuesta 304 si el cliente ya tiene esta versión, None para seguir
+        con la respuesta completa
+    """
+    etag = calcular_etag(request, version)
+    # El navegador guarda la respuesta pero la revalida siempre con If-None-Match
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if _coincide(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,252 @@
+"""
+Difusión de eventos a clientes conectados (SSE).
+
+Los endpoints que modifican datos publican un evento en un canal (ej:
+"timeline") y cada conexión SSE suscrita a ese canal lo recibe en su
+propia cola asyncio.
+
+El transporte entre publicación y entrega es configurable
+(EVENTOS_BACKEND):
+- "memoria": los eventos se entregan dentro del mismo proceso. Sirve con un
+  solo worker de uvicorn.
+- "postgres": los eventos se publican con NOTIFY y cada worker los recibe
+  con LISTEN, así un cambio hecho en un worker llega a los clientes
+  conectados a cualquier otro.
+"""
+
+import asyncio
+import json
+import logging
+import select
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Límite de NOTIFY en PostgreSQL (8000 bytes) con margen
+TAMANO_MAXIMO_NOTIFY = 7500
+
+# Canales
+CANAL_TIMELINE = "timeline"  # Cambios de estados de línea y lotes
+CANAL_CACHE = "cache"  # Invalidación de caches en memoria (ver app/core/invalidacion.py)
+
+
+class BackendEventos:
+    """Transporte de eventos entre la publicación y la entrega local."""
+
+    # True si puede publicar dentro de una transacción (entregado solo con el commit)
+    en_transaccion = False
+
+    def iniciar(self, entregar: Callable[[str, dict], None]) -> None:
+        """Comienza a recibir eventos; entregar(canal, datos) los reparte localmente."""
+        self._entregar = entregar
+
+    def publicar(self, canal: str, datos: dict) -> None:
+        raise NotImplementedError
+
+    def publicar_en_transaccion(self, conn, canal: str, datos: dict) -> None:
+        """Publica en la transacción de conn (solo si en_transaccion)."""
+        raise NotImplementedError
+
+    def detener(self) -> None:
+        pass
+
+
+class BackendMemoria(BackendEventos):
+    """Entrega directa dentro del proceso (un solo worker)."""
+
+    def __init__(self):
+        self._entregar = None
+
+    def publicar(self, canal: str, datos: dict) -> None:
+        if self._entregar is not None:
+            self._entregar(canal, datos)
+
+
+class BackendPostgres(BackendEventos):
+    """
+    NOTIFY/LISTEN de PostgreSQL para varios workers.
+
+    La escucha usa una conexión psycopg2 dedicada (fuera del pool) en un
+    thread que se reconecta si la conexión se corta.
+    """
+
+    en_transaccion = True
+
+    def __init__(self, canal_pg: str):
+        self.canal_pg = canal_pg
+        self._entregar = None
+        self._detener = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def iniciar(self, entregar: Callable[[str, dict], None]) -> None:
+        self._entregar = entregar
+        self._detener.clear()
+        self._thread = threading.Thread(target=self._escuchar, name="eventos-listen", daemon=True)
+        self._thread.start()
+
+    def _notificar(self, conn, canal: str, datos: dict) -> None:
+        mensaje = json.dumps({"c": canal, "d": datos}, default=str)
+        if len(mensaje.encode("utf-8")) > TAMANO_MAXIMO_NOTIFY:
+            # Demasiado grande para NOTIFY: pedir a los clientes que recarguen
+            mensaje = json.dumps({"c": canal, "d": {"tipo": "resync"}})
+        conn.execute(text("SELECT pg_notify(:canal, :mensaje)"), {"canal": self.canal_pg, "mensaje": mensaje})
+
+    def publicar(self, canal: str, datos: dict) -> None:
+        with engine.connect() as conn:
+            self._notificar(conn, canal, datos)
+            conn.commit()
+
+    def publicar_en_transaccion(self, conn, canal: str, datos: dict) -> None:
+        # PostgreSQL entrega el NOTIFY al hacer commit y lo descarta con el rollback
+        self._notificar(conn, canal, datos)
+
+    def _conectar(self):
+        import psycopg2
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+        url = engine.url.set(drivername="postgresql")
+        conn = psycopg2.connect(url.render_as_string(hide_password=False))
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cur:
+            cur.execute(f'LISTEN "{self.canal_pg}"')
+        return conn
+
+    def _escuchar(self) -> None:
+        while not self._detener.is_set():
+            conn = None
+            try:
+                conn = self._conectar()
+                while not self._detener.is_set():
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notificacion = conn.notifies.pop(0)
+                        mensaje = json.loads(notificacion.payload)
+                        self._entregar(mensaje["c"], mensaje["d"])
+            except Exception:
+                logger.exception("Error escuchando eventos de PostgreSQL, reintentando")
+                self._detener.wait(5)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def detener(self) -> None:
+        self._detener.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+class Suscripcion:
+    """Cola de eventos de una conexión SSE."""
+
+    def __init__(self, canal: str, maxsize: int):
+        self.canal = canal
+        self.cola: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.loop = asyncio.get_running_loop()
+        self.desbordada = False
+
+    def _recibir(self, datos: dict) -> None:
+        """Se ejecuta en el event loop de la suscripción."""
+        try:
+            self.cola.put_nowait(datos)
+        except asyncio.QueueFull:
+            # El cliente no consume a tiempo: descartar y pedirle que recargue
+            self.desbordada = True
+
+    async def siguiente(self, timeout: float) -> Optional[dict]:
+        """Próximo evento, o None si no llegó ninguno en timeout segundos."""
+        if self.desbordada:
+            self.desbordada = False
+            while not self.cola.empty():
+                self.cola.get_nowait()
+            return {"tipo": "resync"}
+        try:
+            return await asyncio.wait_for(self.cola.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broadcaster:
+    """Registro de suscripciones por canal y publicación de eventos."""
+
+    def __init__(self, backend: BackendEventos, maxsize: int = 100):
+        self.backend = backend
+        self.maxsize = maxsize
+        self._suscripciones: Dict[str, Set[Suscripcion]] = {}
+        self._oyentes: Dict[str, List[Callable[[dict], None]]] = {}
+        self._lock = threading.Lock()
+
+    def iniciar(self) -> None:
+        self.backend.iniciar(self._entregar)
+
+    def detener(self) -> None:
+        self.backend.detener()
+
+    def suscribir(self, canal: str) -> Suscripcion:
+        """Crea una suscripción (llamar desde el event loop)."""
+        suscripcion = Suscripcion(canal, self.maxsize)
+        with self._lock:
+            self._suscripciones.setdefault(canal, set()).add(suscripcion)
+        return suscripcion
+
+    def escuchar(self, canal: str, callback: Callable[[dict], None]) -> None:
+        """
+        Registra una función que recibe los eventos del canal en este worker
+        (ej: invalidar un cache). Se llama desde el thread que recibe el
+        evento, por lo que debe ser rápida y thread-safe.
+        """
+        with self._lock:
+            self._oyentes.setdefault(canal, []).append(callback)
+
+    def cancelar(self, suscripcion: Suscripcion) -> None:
+        with self._lock:
+            self._suscripciones.get(suscripcion.canal, set()).discard(suscripcion)
+
+    def publicar(self, canal: str, datos: Dict[str, Any]) -> None:
+        """
+        Publica un evento. Se puede llamar desde endpoints sync o async;
+        llamar después del commit para no anunciar cambios que no se guardaron.
+        Un error al publicar no debe hacer fallar el request.
+        """
+        try:
+            self.backend.publicar(canal, datos)
+        except Exception:
+            logger.exception("No se pudo publicar el evento en '%s'", canal)
+
+    def _entregar(self, canal: str, datos: dict) -> None:
+        """Reparte un evento a las suscripciones locales (desde cualquier thread)."""
+        with self._lock:
+            suscripciones = list(self._suscripciones.get(canal, ()))
+            oyentes = list(self._oyentes.get(canal, ()))
+        for callback in oyentes:
+            try:
+                callback(datos)
+            except Exception:
+                logger.exception("Error procesando un evento de '%s'", canal)
+        for suscripcion in suscripciones:
+            try:
+                suscripcion.loop.call_soon_threadsafe(suscripcion._recibir, datos)
+            except RuntimeError:
+                # Event loop cerrado (apagando el worker)
+                self.cancelar(suscripcion)
+
+    def stats(self) -> Dict[str, int]:
+        """Conexiones suscritas por canal en este worker."""
+        with self._lock:
+            return {canal: len(suscripciones) for canal, suscripciones in self._suscripciones.items()}
+
+
+def _crear_backend() -> BackendEventos:
+    if settings.EVENTOS_BACKEND == "postgres":
+        return BackendPostgres(settings.EVENTOS_CANAL_PG)
+    return BackendMemoria()
+
+
+broadcaster = Broadcaster(_crear_backend())
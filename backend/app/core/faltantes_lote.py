@@ -0,0 +1,71 @@
+"""
+Reporte de números de lote faltantes (saltos de lote) en todo el historial.
+
+Para cada producto ordena los números de secuencia de sus lotes activos
+(Lote.numero_secuencia, el último grupo de dígitos de numero_lote) y busca
+los huecos entre números consecutivos con una sola consulta: LAG() sobre los
+números de cada producto, resuelta con el índice (producto_id,
+numero_secuencia). Funciona igual en PostgreSQL y SQLite.
+"""
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.orm import Session
+
+from app.models.lote import Lote
+
+# (producto_id, numero_anterior, lote_anterior, numero, lote)
+Hueco = Tuple[int, Optional[int], Optional[str], int, str]
+
+
+def calcular_faltantes(
+    db: Session,
+    producto_id: Optional[int] = None,
+    desde_uno: bool = False
+) -> List[Hueco]:
+    """
+    Huecos en la secuencia de lotes activos, ordenados por producto y número.
+
+    Args:
+        producto_id: Limitar a un producto
+        desde_uno: Contar también los números faltantes antes del primer lote
+            (la secuencia debería empezar en 1)
+
+    Returns:
+        Lista de (producto_id, numero_anterior, lote_anterior, numero, lote):
+        faltan los números numero_anterior + 1 a numero - 1 (desde 1 si no hay
+        anterior)
+    """
+    condiciones = [Lote.activo == True, Lote.numero_secuencia.isnot(None)]
+    if producto_id is not None:
+        condiciones.append(Lote.producto_id == producto_id)
+
+    # Un número por producto (los duplicados no cuentan dos veces)
+    secuencia = select(
+        Lote.producto_id,
+        Lote.numero_secuencia.label("numero"),
+        func.min(Lote.numero_lote).label("lote")
+    ).where(*condiciones).group_by(Lote.producto_id, Lote.numero_secuencia).subquery()
+
+    ventana = {"partition_by": secuencia.c.producto_id, "order_by": secuencia.c.numero}
+    vecinos = select(
+        secuencia.c.producto_id,
+        func.lag(secuencia.c.numero).over(**ventana).label("numero_anterior"),
+        func.lag(secuencia.c.lote).over(**ventana).label("lote_anterior"),
+        secuencia.c.numero,
+        secuencia.c.lote
+    ).subquery()
+
+    # Sin número anterior: el primer lote solo cuenta como salto si se pide desde el 1
+    base = literal(0) if desde_uno else vecinos.c.numero
+    consulta = select(
+        vecinos.c.producto_id,
+        vecinos.c.numero_anterior,
+        vecinos.c.lote_anterior,
+        vecinos.c.numero,
+        vecinos.c.lote
+    ).where(
+        vecinos.c.numero > func.coalesce(vecinos.c.numero_anterior, base) + 1
+    ).order_by(vecinos.c.producto_id, vecinos.c.numero)
+
+    return [tuple(fila) for fila in db.execute(consulta)]
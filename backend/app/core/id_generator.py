@@ -2,10 +2,16 @@
 Utilidad para generación automática de IDs/códigos únicos.
 Formato: PREFIJO + AÑO (2 dígitos) + SECUENCIA (4 dígitos)
 Ejemplo: PD250001 (Producto, año 2025, secuencia 0001)
+
+La secuencia se toma de un contador por prefijo y año (tabla contadores_codigo)
+en lugar de buscar el último código de la tabla de cada entidad.
 """
 from datetime import datetime
+from typing import List
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from app.models.contador_codigo import ContadorCodigo
 
 
 class TipoCodigo:
@@ -21,30 +27,86 @@ class TipoCodigo:
     AUDIT_LOG = "AU"
 
 
-def generar_codigo(
+def _ultima_secuencia_existente(db: Session, campo, prefijo: str, ano_str: str) -> int:
+    """
+    Obtiene la última secuencia ya usada en la tabla de la entidad.
+    Solo se ejecuta la primera vez que se usa un prefijo en el año, para
+    inicializar el contador a partir de los códigos existentes.
+    """
+    patron = f"{prefijo}{ano_str}%"
+    ultimo_codigo = db.query(campo).filter(
+        campo.like(patron)
+    ).order_by(campo.desc()).first()
+    
+    if ultimo_codigo and ultimo_codigo[0]:
+        try:
+            # La secuencia son los últimos 4 caracteres
+            return int(ultimo_codigo[0][-4:])
+        except (ValueError, IndexError):
+            return 0
+    return 0
+
+
+def _bloquear_contador(db: Session, campo, prefijo: str, ano: int) -> ContadorCodigo:
+    """
+    Obtiene la fila del contador bloqueada para la transacción actual.
+    
+    En PostgreSQL se usa SELECT ... FOR UPDATE, por lo que dos requests
+    concurrentes para el mismo prefijo se serializan sobre una sola fila
+    hasta el commit. En SQLite (tests) FOR UPDATE se ignora y la base
+    serializa las escrituras por sí misma.
+    """
+    contador = db.query(ContadorCodigo).filter(
+        ContadorCodigo.prefijo == prefijo,
+        ContadorCodigo.ano == ano
+    ).with_for_update().first()
+    
+    if contador is not None:
+        return contador
+    
+    # Primera vez en el año: crear el contador partiendo de los códigos existentes
+    inicial = _ultima_secuencia_existente(db, campo, prefijo, str(ano).zfill(2))
+    savepoint = db.begin_nested()
+    try:
+        contador = ContadorCodigo(prefijo=prefijo, ano=ano, ultimo_valor=inicial)
+        db.add(contador)
+        savepoint.commit()
+        return contador
+    except IntegrityError:
+        # Otro request creó el contador en paralelo, usar el suyo
+        savepoint.rollback()
+        return db.query(ContadorCodigo).filter(
+            ContadorCodigo.prefijo == prefijo,
+            ContadorCodigo.ano == ano
+        ).with_for_update().one()
+
+
+def reservar_codigos(
     db: Session,
     modelo,
     prefijo: str,
+    cantidad: int = 1,
     campo_codigo: str = "codigo"
-) -> str:
+) -> List[str]:
     """
-    Genera un código único para una entidad.
+    Reserva un bloque de códigos consecutivos para una entidad.
+    
+    Los códigos se toman del contador por prefijo/año (tabla contadores_codigo),
+    que queda bloqueado hasta el commit de la transacción. Si la transacción
+    hace rollback, la reserva también se deshace y no quedan huecos.
     
     Args:
         db: Sesión de base de datos
         modelo: Modelo SQLAlchemy de la entidad
-        prefijo: Prefijo del código (ej: "PD" para productos)
+        prefijo: Prefijo del código (ej: "LT" para lotes)
+        cantidad: Cantidad de códigos a reservar
         campo_codigo: Nombre del campo que almacena el código (por defecto "codigo")
     
     Returns:
-        Código único generado (ej: "PD250001")
+        Lista de códigos generados (ej: ["LT250042", "LT250043"])
     """
-    # Obtener los últimos 2 dígitos del año actual
-    ano_actual = datetime.now().year % 100  # Ej: 2025 -> 25
-    ano_str = str(ano_actual).zfill(2)  # Asegurar 2 dígitos
-    
-    # Patrón de búsqueda: PREFIJO + AÑO + cualquier secuencia
-    patron = f"{prefijo}{ano_str}%"
+    if cantidad < 1:
+        raise ValueError("La cantidad de códigos a reservar debe ser al menos 1")
     
     # Obtener el campo de código del modelo
     campo = getattr(modelo, campo_codigo, None)
@@ -52,32 +114,41 @@ def generar_codigo(
     if campo is None:
         raise ValueError(f"El modelo {modelo.__name__} no tiene el campo '{campo_codigo}'")
     
-    # Buscar el último código del año actual
-    ultimo_codigo = db.query(campo).filter(
-        campo.like(patron)
-    ).order_by(campo.desc()).first()
+    # Obtener los últimos 2 dígitos del año actual
+    ano_actual = datetime.now().year % 100  # Ej: 2025 -> 25
+    ano_str = str(ano_actual).zfill(2)  # Asegurar 2 dígitos
     
-    if ultimo_codigo and ultimo_codigo[0]:
-        # Extraer la secuencia del último código
-        ultimo = ultimo_codigo[0]
-        try:
-            # La secuencia son los últimos 4 caracteres
-            secuencia_actual = int(ultimo[-4:])
-            nueva_secuencia = secuencia_actual + 1
-        except (ValueError, IndexError):
-            # Si hay error al parsear, empezar desde 1
-            nueva_secuencia = 1
-    else:
-        # No hay códigos para este año, empezar desde 1
-        nueva_secuencia = 1
+    contador = _bloquear_contador(db, campo, prefijo, ano_actual)
+    primera_secuencia = contador.ultimo_valor + 1
+    contador.ultimo_valor = contador.ultimo_valor + cantidad
+    db.flush()
     
-    # Formatear la secuencia con 4 dígitos
-    secuencia_str = str(nueva_secuencia).zfill(4)
+    # Construir los códigos: PREFIJO + AÑO + SECUENCIA (4 dígitos)
+    return [
+        f"{prefijo}{ano_str}{str(secuencia).zfill(4)}"
+        for secuencia in range(primera_secuencia, primera_secuencia + cantidad)
+    ]
+
+
+def generar_codigo(
+    db: Session,
+    modelo,
+    prefijo: str,
+    campo_codigo: str = "codigo"
+) -> str:
+    """
+    Genera un código único para una entidad.
     
-    # Construir el código final
-    codigo = f"{prefijo}{ano_str}{secuencia_str}"
+    Args:
+        db: Sesión de base de datos
+        modelo: Modelo SQLAlchemy de la entidad
+        prefijo: Prefijo del código (ej: "PD" para productos)
+        campo_codigo: Nombre del campo que almacena el código (por defecto "codigo")
     
-    return codigo
+    Returns:
+        Código único generado (ej: "PD250001")
+    """
+    return reservar_codigos(db, modelo, prefijo, 1, campo_codigo)[0]
 
 
 def generar_codigo_producto(db: Session) -> str:
@@ -126,3 +197,9 @@ def generar_codigo_rol(db: Session) -> str:
     """Genera código para Rol (RL + año + secuencia)."""
     from app.models.user import Role
     return generar_codigo(db, Role, TipoCodigo.ROL, "codigo")
+
+
+def generar_codigos_lote(db: Session, cantidad: int) -> List[str]:
+    """Reserva un bloque de códigos para Lotes (carga masiva)."""
+    from app.models.lote import Lote
+    return reservar_codigos(db, Lote, TipoCodigo.LOTE, cantidad, "codigo")
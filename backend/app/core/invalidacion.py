@@ -0,0 +1,225 @@
+"""
+Bus de invalidación de caches en memoria entre workers.
+
+Cada worker de uvicorn guarda sus propios caches (usuarios, catálogos,
+último lote, autocompletar). Un cambio hecho en un worker tiene que
+descartar las copias de todos los demás. En lugar de que cada router avise
+a mano después del commit, el bus detecta los cambios en la sesión:
+
+- Los caches se suscriben a un tema con el modelo que lo afecta y el
+  atributo que usan como clave (por defecto el id): suscribir("usuarios",
+  User, ...) o suscribir("ultimo_lote", Lote, ..., atributo="producto_id").
+- En cada flush se juntan las claves (tabla, id) de los registros creados,
+  editados o eliminados (también el valor anterior del atributo, ej: el
+  producto del que se movió un lote).
+- PostgreSQL (EVENTOS_BACKEND=postgres): el aviso se envía con NOTIFY en la
+  misma transacción, así PostgreSQL lo entrega a los demás workers solo si
+  se hace commit. Cada worker lo recibe con el LISTEN del broadcaster.
+- Al hacer commit se aplica en este mismo worker (lee lo que acaba de
+  escribir sin esperar el aviso); con el rollback se descarta.
+- EVENTOS_BACKEND=memoria (SQLite, tests, un solo worker): los cambios se
+  aplican solo en el proceso, al hacer commit.
+
+Los cambios hechos sin el ORM (update()/delete() de Core) no pasan por el
+flush: registrarlos con registrar(db, tema, claves) antes del commit. Los
+TTL de cada cache acotan lo que queda desactualizado si se edita la base a
+mano.
+"""
+
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.eventos import broadcaster, CANAL_CACHE, TAMANO_MAXIMO_NOTIFY
+
+logger = logging.getLogger(__name__)
+
+# Claves en Session.info: cambios a aplicar al hacer commit y si ya se avisó con NOTIFY
+_CAMBIOS = "invalidaciones_pendientes"
+_NOTIFICADO = "invalidaciones_notificadas"
+
+# Identifica los avisos propios (ya se aplicaron al hacer commit)
+_ORIGEN = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+# Cambios por tema: claves cambiadas, o None si hay que descartar todo el tema
+Cambios = Dict[str, Optional[Set]]
+
+
+class _Tema:
+    def __init__(self, nombre: str, modelo, atributo: str):
+        self.nombre = nombre
+        self.modelo = modelo
+        self.atributo = atributo
+        self.callbacks: List[Callable[[Optional[Set]], None]] = []
+
+
+def _sumar(cambios: Cambios, tema: str, claves: Optional[Iterable]) -> None:
+    if claves is None or cambios.get(tema, set()) is None:
+        cambios[tema] = None
+    else:
+        cambios.setdefault(tema, set()).update(claves)
+
+
+class BusInvalidacion:
+    """Registro de temas y reparto de sus invalidaciones."""
+
+    def __init__(self):
+        self._temas: Dict[str, _Tema] = {}
+        self._por_modelo: Dict[type, List[_Tema]] = {}
+        self._lock = threading.Lock()
+        self.enviados = 0
+        self.recibidos = 0
+
+    def suscribir(
+        self,
+        tema: str,
+        modelo,
+        al_invalidar: Callable[[Optional[Set]], None],
+        atributo: str = "id"
+    ) -> None:
+        """
+        Llama a al_invalidar(claves) cuando cambian registros del modelo, con
+        los valores de `atributo` afectados (None: descartar todo). Se llama
+        desde el thread del commit o del LISTEN: debe ser rápida y thread-safe.
+        """
+        with self._lock:
+            if tema not in self._temas:
+                self._temas[tema] = _Tema(tema, modelo, atributo)
+                self._por_modelo.setdefault(modelo, []).append(self._temas[tema])
+            self._temas[tema].callbacks.append(al_invalidar)
+
+    def _aplicar(self, cambios: Cambios) -> None:
+        for nombre, claves in cambios.items():
+            tema = self._temas.get(nombre)
+            if tema is None:
+                continue
+            for callback in tema.callbacks:
+                try:
+                    callback(claves)
+                except Exception:
+                    logger.exception("Error invalidando el cache '%s'", nombre)
+
+    def _mensaje(self, cambios: Cambios) -> dict:
+        mensaje = {
+            "origen": _ORIGEN,
+            "temas": {tema: sorted(claves) if claves is not None else None for tema, claves in cambios.items()},
+        }
+        if len(json.dumps({"c": CANAL_CACHE, "d": mensaje}, default=str)) > TAMANO_MAXIMO_NOTIFY:
+            # Demasiadas claves para un NOTIFY: descartar los temas completos
+            mensaje["temas"] = {tema: None for tema in cambios}
+        return mensaje
+
+    def _cambios_del_flush(self, session: Session) -> Cambios:
+        cambios: Cambios = {}
+        editados = [
+            obj for obj in session.dirty
+            if type(obj) in self._por_modelo and session.is_modified(obj, include_collections=False)
+        ]
+        for obj in list(session.new) + editados + list(session.deleted):
+            temas = self._por_modelo.get(type(obj))
+            if not temas:
+                continue
+            estado = inspect(obj)
+            for tema in temas:
+                valores = {v for v in estado.attrs[tema.atributo].history.sum() if v is not None}
+                if not valores and tema.atributo in estado.unloaded:
+                    # Sin el valor cargado no se sabe qué clave cambió
+                    _sumar(cambios, tema.nombre, None)
+                else:
+                    _sumar(cambios, tema.nombre, valores)
+        return cambios
+
+    def _agregar_a_sesion(self, session: Session, cambios: Cambios) -> None:
+        """Guarda los cambios para el commit y, si se puede, avisa con NOTIFY en la transacción."""
+        if not cambios:
+            return
+        pendientes = session.info.setdefault(_CAMBIOS, {})
+        for tema, claves in cambios.items():
+            _sumar(pendientes, tema, claves)
+        if not broadcaster.backend.en_transaccion:
+            return
+        try:
+            broadcaster.backend.publicar_en_transaccion(session.connection(), CANAL_CACHE, self._mensaje(cambios))
+            session.info.setdefault(_NOTIFICADO, True)
+            self.enviados += 1
+        except Exception:
+            # Se vuelve a publicar todo después del commit
+            session.info[_NOTIFICADO] = False
+            logger.exception("No se pudo avisar la invalidación en la transacción")
+
+    def registrar(self, session: Session, tema: str, claves: Optional[Iterable] = None) -> None:
+        """
+        Registra un cambio hecho sin el ORM (ej: update() de Core) en la
+        transacción de la sesión. claves=None descarta todo el tema.
+        """
+        self._agregar_a_sesion(session, {tema: set(claves) if claves is not None else None})
+
+    def publicar(self, tema: str, claves: Optional[Iterable] = None) -> None:
+        """Invalida ahora en este worker y avisa a los demás (fuera de una transacción)."""
+        cambios = {tema: set(claves) if claves is not None else None}
+        self._aplicar(cambios)
+        broadcaster.publicar(CANAL_CACHE, self._mensaje(cambios))
+        self.enviados += 1
+
+    def _despues_del_commit(self, session: Session) -> None:
+        cambios = session.info.pop(_CAMBIOS, None)
+        notificado = session.info.pop(_NOTIFICADO, False)
+        if not cambios:
+            return
+        self._aplicar(cambios)
+        if not notificado:
+            broadcaster.publicar(CANAL_CACHE, self._mensaje(cambios))
+            self.enviados += 1
+
+    def _recibir(self, datos: dict) -> None:
+        """Aviso recibido por el canal de eventos (propio o de otro worker)."""
+        if "temas" not in datos or datos.get("origen") == _ORIGEN:
+            return
+        self.recibidos += 1
+        self._aplicar({
+            tema: set(claves) if claves is not None else None
+            for tema, claves in datos["temas"].items()
+        })
+
+    def stats(self) -> dict:
+        return {
+            "temas": sorted(self._temas),
+            "enviados": self.enviados,
+            "recibidos": self.recibidos,
+        }
+
+
+bus_invalidacion = BusInvalidacion()
+
+broadcaster.escuchar(CANAL_CACHE, bus_invalidacion._recibir)
+
+
+@event.listens_for(Session, "after_flush")
+def _juntar_cambios(session: Session, flush_context) -> None:
+    bus_invalidacion._agregar_a_sesion(session, bus_invalidacion._cambios_del_flush(session))
+
+
+@event.listens_for(Session, "after_commit")
+def _aplicar_cambios(session: Session) -> None:
+    # after_commit también se dispara al liberar un savepoint (begin_nested):
+    # los cambios se aplican recién con el commit de la transacción principal
+    if session.in_nested_transaction():
+        return
+    bus_invalidacion._despues_del_commit(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_cambios(session: Session) -> None:
+    # El rollback de un savepoint no descarta lo pendiente de la transacción
+    # principal (los cambios del savepoint quedan: a lo sumo se invalida de
+    # más). Con el rollback principal también se descartan los NOTIFY.
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_CAMBIOS, None)
+    session.info.pop(_NOTIFICADO, None)
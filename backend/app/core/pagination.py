@@ -0,0 +1,159 @@
+"""
+Paginación por cursor (keyset).
+
+En lugar de OFFSET, que obliga a la base a recorrer y descartar todas las
+filas de las páginas anteriores, el cursor guarda los valores de orden del
+último elemento entregado y la página siguiente se obtiene con:
+
+    WHERE (columna_orden, id) < (:ultimo_valor, :ultimo_id)
+
+que con un índice sobre (columna_orden, id) cuesta lo mismo en la página 1
+que en la 500.
+
+En SQLite las fechas con hora se guardan como texto, con o sin microsegundos
+según quién escribió la fila (CURRENT_TIMESTAMP del server_default o
+SQLAlchemy), y se comparan como texto. Las columnas DateTime se normalizan
+con strftime en el orden y en la comparación, así ambos coinciden.
+
+El cursor es un string opaco (JSON en base64) para el frontend. Para pedir
+la primera página en modo cursor se envía un cursor vacío (?cursor=).
+"""
+
+import base64
+import json
+from datetime import datetime, date
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, func, literal, tuple_
+
+from app.core.database import engine
+
+
+def _serializar_valor(valor: Any) -> Any:
+    """Convierte un valor de orden a algo serializable en JSON (conservando el tipo)."""
+    if isinstance(valor, datetime):
+        return {"dt": valor.isoformat()}
+    if isinstance(valor, date):
+        return {"d": valor.isoformat()}
+    return valor
+
+
+def _deserializar_valor(valor: Any) -> Any:
+    """Inversa de _serializar_valor."""
+    if isinstance(valor, dict):
+        if "dt" in valor:
+            return datetime.fromisoformat(valor["dt"])
+        if "d" in valor:
+            return date.fromisoformat(valor["d"])
+    return valor
+
+
+def codificar_cursor(orden: str, valores: List[Any]) -> str:
+    """
+    Codifica los valores de orden del último elemento de una página.
+
+    Args:
+        orden: Identificador del ordenamiento (ej: "fecha_produccion:desc"),
+            para rechazar cursores generados con otro orden
+        valores: Valores de las columnas de orden, en el mismo orden
+    """
+    payload = {"o": orden, "v": [_serializar_valor(v) for v in valores]}
+    data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: str, orden: str, cantidad: int) -> List[Any]:
+    """
+    Decodifica un cursor y valida que corresponda al ordenamiento actual.
+
+    Raises:
+        HTTPException 400 si el cursor es inválido o de otro ordenamiento
+    """
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        valores = [_deserializar_valor(v) for v in payload["v"]]
+        if payload["o"] != orden or len(valores) != cantidad:
+            raise ValueError("Cursor de otro ordenamiento")
+        return valores
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación inválido"
+        )
+
+
+def _clave_orden(columna):
+    """Expresión de orden de una columna (fechas con hora normalizadas en SQLite)."""
+    if engine.dialect.name == "sqlite" and isinstance(getattr(columna, "type", None), DateTime):
+        return func.strftime("%Y-%m-%d %H:%M:%f", columna)
+    return columna
+
+
+def preparar_consulta_cursor(
+    consulta,
+    columnas: list,
+    cursor: str,
+    size: int,
+    descendente: bool = True,
+    orden: str = ""
+):
+    """
+    Aplica el predicado keyset, el orden y el límite a una consulta.
+
+    Sirve tanto para Query (sesión sync) como para select() (sesión async).
+    Las columnas de orden se agregan al resultado para armar el cursor
+    siguiente, y se pide una fila extra para saber si hay página siguiente.
+    """
+    columnas = [_clave_orden(columna) for columna in columnas]
+    if cursor:
+        valores = decodificar_cursor(cursor, orden, len(columnas))
+        clave = tuple_(*columnas)
+        # Cada valor con el tipo de su columna (misma conversión que al guardar)
+        limite = tuple_(*[literal(valor, type_=columna.type) for valor, columna in zip(valores, columnas)])
+        consulta = consulta.filter(clave < limite if descendente else clave > limite)
+
+    order_by = [columna.desc() if descendente else columna.asc() for columna in columnas]
+    return consulta.add_columns(*columnas).order_by(*order_by).limit(size + 1)
+
+
+def resultado_cursor(filas: list, size: int, orden: str = "") -> Tuple[list, Optional[str]]:
+    """
+    Separa los items de las columnas de orden y arma el cursor siguiente.
+
+    Returns:
+        Tupla con (items de la página, cursor de la página siguiente o None)
+    """
+    siguiente = None
+    if len(filas) > size:
+        filas = filas[:size]
+        siguiente = codificar_cursor(orden, list(filas[-1][1:]))
+
+    return [fila[0] for fila in filas], siguiente
+
+
+def paginar_por_cursor(
+    query,
+    columnas: list,
+    cursor: str,
+    size: int,
+    descendente: bool = True,
+    orden: str = ""
+) -> Tuple[list, Optional[str]]:
+    """
+    Obtiene una página usando un predicado keyset en lugar de OFFSET.
+
+    Args:
+        query: Query ORM con los filtros ya aplicados (sin order_by)
+        columnas: Columnas/expresiones de orden; la última debe ser única (id)
+        cursor: Cursor recibido ("" para la primera página)
+        size: Tamaño de página
+        descendente: Dirección del orden (la misma para todas las columnas)
+        orden: Identificador del ordenamiento que se guarda en el cursor
+
+    Returns:
+        Tupla con (items de la página, cursor de la página siguiente o None)
+    """
+    filas = preparar_consulta_cursor(query, columnas, cursor, size, descendente, orden).all()
+    return resultado_cursor(filas, size, orden)
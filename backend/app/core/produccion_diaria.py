@@ -0,0 +1,131 @@
+"""
+Mantenimiento del acumulado de producción diaria (tabla produccion_diaria).
+
+Cada lote activo aporta a la fila (fecha_produccion, producto_id):
+1 lote, sus litros, pallets y parciales. Los endpoints de lotes calculan el
+aporte antes y después del cambio y aplican la diferencia en la misma
+transacción, por lo que el acumulado queda siempre consistente con lotes.
+
+Si el acumulado se desincroniza (carga manual de datos, restauración de un
+backup), se reconstruye con reconstruir_produccion_diaria()
+(ver rebuild_produccion_diaria.py).
+"""
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+
+from app.models.lote import Lote
+from app.models.produccion_diaria import ProduccionDiaria
+
+# (fecha, producto_id) -> (lotes, litros, pallets, parciales)
+Clave = Tuple[date, int]
+Aporte = Tuple[Clave, Tuple[int, float, int, int]]
+
+CAMPOS = ("total_lotes", "total_litros", "total_pallets", "total_parciales")
+
+
+def aporte_lote(lote: Lote) -> Optional[Aporte]:
+    """
+    Aporte de un lote al acumulado (None si el lote no está activo).
+    Se toma como una foto: llamarlo antes y después de modificar el lote.
+    """
+    if lote.activo is False:
+        return None
+    return (
+        (lote.fecha_produccion, lote.producto_id),
+        (1, float(lote.litros_totales or 0), int(lote.pallets or 0), int(lote.parciales or 0))
+    )
+
+
+def _sumar_a_fila(db: Session, clave: Clave, delta: Tuple[int, float, int, int]) -> None:
+    """Suma un delta a la fila de forma atómica, creándola si no existe."""
+    fecha, producto_id = clave
+    condicion = (ProduccionDiaria.fecha == fecha, ProduccionDiaria.producto_id == producto_id)
+    valores = {
+        getattr(ProduccionDiaria, campo): getattr(ProduccionDiaria, campo) + cantidad
+        for campo, cantidad in zip(CAMPOS, delta)
+    }
+
+    # UPDATE col = col + delta: dos requests concurrentes no se pisan
+    if db.query(ProduccionDiaria).filter(*condicion).update(valores, synchronize_session=False):
+        return
+
+    savepoint = db.begin_nested()
+    try:
+        db.execute(insert(ProduccionDiaria).values(
+            fecha=fecha, producto_id=producto_id, **dict(zip(CAMPOS, delta))
+        ))
+        savepoint.commit()
+    except IntegrityError:
+        # Otro request creó la fila en paralelo: sumar sobre la suya
+        savepoint.rollback()
+        db.query(ProduccionDiaria).filter(*condicion).update(valores, synchronize_session=False)
+
+
+def actualizar_produccion_diaria(
+    db: Session,
+    anteriores: Iterable[Optional[Aporte]] = (),
+    nuevos: Iterable[Optional[Aporte]] = ()
+) -> None:
+    """
+    Aplica al acumulado la diferencia entre los aportes anteriores y los nuevos.
+
+    - Crear: anteriores=[], nuevos=[aporte_lote(lote)]
+    - Editar: anteriores=[aporte antes del cambio], nuevos=[aporte después]
+    - Desactivar: anteriores=[aporte antes del cambio], nuevos=[]
+
+    Los aportes se agrupan por (fecha, producto), así un alta en bloque hace
+    una sola escritura por día y producto. No hace commit.
+    """
+    deltas: Dict[Clave, list] = defaultdict(lambda: [0, 0.0, 0, 0])
+    for signo, aportes in ((-1, anteriores), (1, nuevos)):
+        for aporte in aportes:
+            if aporte is None:
+                continue
+            clave, valores = aporte
+            for i, valor in enumerate(valores):
+                deltas[clave][i] += signo * valor
+
+    vaciadas = []
+    for clave, delta in deltas.items():
+        if not any(delta):
+            continue
+        _sumar_a_fila(db, clave, tuple(delta))
+        if delta[0] < 0:
+            vaciadas.append(clave)
+
+    # Quitar los días que quedaron sin lotes
+    for fecha, producto_id in vaciadas:
+        db.query(ProduccionDiaria).filter(
+            ProduccionDiaria.fecha == fecha,
+            ProduccionDiaria.producto_id == producto_id,
+            ProduccionDiaria.total_lotes <= 0
+        ).delete(synchronize_session=False)
+
+
+def reconstruir_produccion_diaria(db: Session) -> int:
+    """
+    Recalcula todo el acumulado a partir de la tabla lotes. No hace commit.
+
+    Returns:
+        Cantidad de filas (día, producto) generadas
+    """
+    db.query(ProduccionDiaria).delete(synchronize_session=False)
+    agregados = select(
+        Lote.fecha_produccion,
+        Lote.producto_id,
+        func.count(Lote.id),
+        func.coalesce(func.sum(Lote.litros_totales), 0),
+        func.coalesce(func.sum(Lote.pallets), 0),
+        func.coalesce(func.sum(Lote.parciales), 0)
+    ).where(
+        Lote.activo == True
+    ).group_by(
+        Lote.fecha_produccion, Lote.producto_id
+    )
+    db.execute(insert(ProduccionDiaria).from_select(["fecha", "producto_id", *CAMPOS], agregados))
+    return db.query(func.count()).select_from(ProduccionDiaria).scalar()
@@ -0,0 +1,56 @@
+"""
+Número de secuencia de los lotes.
+
+El número de un lote es el último grupo de dígitos de numero_lote
+(ej: "L-2024-0005" -> 5). Se guarda en Lote.numero_secuencia junto con el
+texto anterior a los dígitos (prefijo_secuencia) y la cantidad de dígitos
+(ancho_secuencia), para que el último número de un producto y el anterior a
+un número dado salgan del índice (producto_id, numero_secuencia) y para
+sugerir números con el mismo formato ("L-2024-0006").
+"""
+import re
+from typing import NamedTuple, Optional
+
+# Último grupo de dígitos, seguido opcionalmente de texto sin dígitos
+_ULTIMO_NUMERO = re.compile(r"(\d+)\D*$")
+
+# Números más largos no entran en BIGINT (y no son secuencias reales)
+MAX_DIGITOS = 18
+
+
+class Secuencia(NamedTuple):
+    numero: int
+    prefijo: str  # Texto antes de los dígitos
+    ancho: int  # Cantidad de dígitos (con ceros a la izquierda)
+
+
+def descomponer_numero_lote(numero_lote: Optional[str]) -> Optional[Secuencia]:
+    """
+    Separa el número de secuencia de un número de lote.
+
+    Ejemplos:
+    - "2024001" -> (2024001, "", 7)
+    - "L-001" -> (1, "L-", 3)
+    - "LOTE-2024-0005" -> (5, "LOTE-2024-", 4)
+    - "ABC123XYZ" -> (123, "ABC", 3)
+
+    Retorna None si no tiene dígitos o el número es demasiado largo.
+    """
+    if not numero_lote:
+        return None
+    coincidencia = _ULTIMO_NUMERO.search(numero_lote)
+    if not coincidencia or len(coincidencia.group(1)) > MAX_DIGITOS:
+        return None
+    return Secuencia(int(coincidencia.group(1)), numero_lote[:coincidencia.start(1)], len(coincidencia.group(1)))
+
+
+def formatear_numero_lote(numero_lote_referencia: str, numero: int) -> str:
+    """
+    Número de lote con el formato de otro lote y otro número de secuencia.
+    Ej: ("L-2024-0005", 6) -> "L-2024-0006"
+    """
+    secuencia = descomponer_numero_lote(numero_lote_referencia)
+    if secuencia is None:
+        return str(numero)
+    sufijo = numero_lote_referencia[len(secuencia.prefijo) + secuencia.ancho:]
+    return f"{secuencia.prefijo}{str(numero).zfill(secuencia.ancho)}{sufijo}"
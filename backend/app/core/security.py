@@ -1,11 +1,29 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min_rounds/max_rounds iguales al costo configurado: los hashes con otro
+# costo se marcan para actualizar (rehash transparente en el login)
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+# Pool acotado para bcrypt: el hash es CPU intensivo (libera el GIL), así
+# muchos logins simultáneos no bloquean el event loop ni ocupan todo el
+# threadpool de los endpoints sync
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="bcrypt"
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -18,6 +36,46 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifica la contraseña y, si el hash usa un costo distinto al configurado,
+    genera uno nuevo.
+
+    Returns:
+        Tupla con (contraseña válida, nuevo hash o None si no hace falta actualizarlo)
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+async def _en_pool_hash(funcion, *args):
+    """Ejecuta una función de hashing en el pool acotado."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, funcion, *args)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password sin bloquear el event loop."""
+    return await _en_pool_hash(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash sin bloquear el event loop."""
+    return await _en_pool_hash(get_password_hash, password)
+
+
+async def verify_and_update_password_async(
+    plain_password: str,
+    hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """verify_and_update_password sin bloquear el event loop."""
+    return await _en_pool_hash(verify_and_update_password, plain_password, hashed_password)
+
+
+def cerrar_pool_hash() -> None:
+    """Detiene el pool de hashing (al apagar la aplicación)."""
+    _hash_executor.shutdown(wait=False)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Crea un token JWT."""
     to_encode = data.copy()
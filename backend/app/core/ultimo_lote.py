@@ -0,0 +1,114 @@
+"""
+Cache del último lote de cada producto.
+
+La validación de lotes (salto de lote), la sugerencia del próximo número y
+el endpoint del último lote necesitan el último lote activo de un producto
+(el de mayor número de secuencia). La pantalla de carga los consulta
+mientras el operador escribe, así que se guarda por producto
+(id, numero_lote, numero_secuencia):
+
+- Lectura: si el producto no está en el cache se consulta una vez y se guarda
+  (también "sin lotes"). Si llega una invalidación durante la consulta el
+  resultado no se guarda (puede ser anterior al cambio).
+- Escritura: al crear, editar o eliminar un lote el bus de invalidación
+  (app/core/invalidacion.py) descarta la entrada de su producto (y la del
+  producto anterior si se cambió), en este worker y en los demás.
+
+El TTL acota el tiempo que una entrada puede quedar desactualizada si se
+pierde un aviso (ej: cambios hechos directo en la base).
+"""
+
+import threading
+from typing import NamedTuple, Optional
+
+from sqlalchemy import desc
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.invalidacion import bus_invalidacion
+from app.models.lote import Lote
+
+# Cache producto_id -> UltimoLote (o _SIN_LOTES)
+ultimos_lotes_cache = TTLCache(
+    maxsize=settings.ULTIMO_LOTE_CACHE_MAX_SIZE,
+    ttl=settings.ULTIMO_LOTE_CACHE_TTL_SECONDS,
+    nombre="ultimo_lote"
+)
+
+_SIN_LOTES = "sin_lotes"
+_NO_CACHEADO = object()
+
+# Aumenta con cada invalidación: una lectura solo se guarda si no cambió mientras consultaba
+_version = 0
+_lock = threading.Lock()
+
+
+class UltimoLote(NamedTuple):
+    id: int
+    numero_lote: str
+    numero_secuencia: Optional[int]
+
+
+def buscar_lote_anterior(
+    db: Session,
+    producto_id: int,
+    numero: Optional[int] = None,
+    opciones: tuple = ()
+) -> Optional[Lote]:
+    """
+    Lote activo del producto con el mayor número de secuencia menor a `numero`
+    (o el mayor de todos si numero es None). Una búsqueda en el índice
+    (producto_id, numero_secuencia), correcta aunque los lotes se carguen
+    fuera de orden.
+
+    Si el producto no tiene lotes con número, usa el último cargado (mayor id).
+    opciones: opciones de carga de la consulta (ej: joinedload de relaciones).
+    """
+    query = db.query(Lote).options(*opciones).filter(
+        Lote.producto_id == producto_id,
+        Lote.activo == True
+    )
+    con_numero = query.filter(Lote.numero_secuencia.isnot(None))
+    if numero is not None:
+        con_numero = con_numero.filter(Lote.numero_secuencia < numero)
+
+    lote = con_numero.order_by(desc(Lote.numero_secuencia), desc(Lote.id)).first()
+    if lote is None and numero is None:
+        lote = query.order_by(desc(Lote.id)).first()
+    return lote
+
+
+def obtener_ultimo_lote(db: Session, producto_id: int) -> Optional[UltimoLote]:
+    """Último lote activo del producto (None si no tiene), desde el cache si está."""
+    cacheado = ultimos_lotes_cache.get(producto_id, _NO_CACHEADO)
+    if cacheado is not _NO_CACHEADO:
+        return None if cacheado == _SIN_LOTES else cacheado
+
+    version = _version
+    lote = buscar_lote_anterior(db, producto_id)
+    ultimo = UltimoLote(lote.id, lote.numero_lote, lote.numero_secuencia) if lote else None
+    with _lock:
+        if _version == version:
+            ultimos_lotes_cache.set(producto_id, ultimo or _SIN_LOTES)
+    return ultimo
+
+
+def _descartar(producto_ids) -> None:
+    """Descarta las entradas de esos productos (None: todas)."""
+    global _version
+    with _lock:
+        _version += 1
+        if producto_ids is None:
+            ultimos_lotes_cache.clear()
+            return
+        for producto_id in producto_ids:
+            ultimos_lotes_cache.delete(producto_id)
+
+
+def invalidar_ultimo_lote(producto_id: int) -> None:
+    """Descarta la entrada de un producto que quedó desactualizada (cambio hecho fuera de la API)."""
+    bus_invalidacion.publicar(ultimos_lotes_cache.nombre, [producto_id])
+
+
+bus_invalidacion.suscribir(ultimos_lotes_cache.nombre, Lote, _descartar, atributo="producto_id")
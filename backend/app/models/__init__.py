@@ -6,8 +6,12 @@ from app.models.cliente import Cliente
 from app.models.estado_linea import EstadoLinea, TipoEstado
 from app.models.lote import Lote
 from app.models.audit_log import AuditLog, TipoAccion, TipoEntidad
+from app.models.contador_codigo import ContadorCodigo
+from app.models.produccion_diaria import ProduccionDiaria
+from app.models.auditoria_diaria import AuditoriaDiaria
 
 __all__ = [
     "User", "Role", "Sector", "Linea", "Producto", "Cliente", 
-    "EstadoLinea", "TipoEstado", "Lote", "AuditLog", "TipoAccion", "TipoEntidad"
+    "EstadoLinea", "TipoEstado", "Lote", "AuditLog", "TipoAccion", "TipoEntidad",
+    "ContadorCodigo", "ProduccionDiaria", "AuditoriaDiaria"
 ]
@@ -5,12 +5,14 @@ Registra todas las operaciones de creación, edición y eliminación
 de las entidades principales del sistema.
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Index, JSON
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
 
 from app.core.database import Base
+from app.core.busqueda import indices_trigramas
 
 
 class TipoAccion(enum.Enum):
@@ -31,6 +33,10 @@ class TipoEntidad(enum.Enum):
     CLIENTE = "cliente"
 
 
+# JSONB en PostgreSQL (indexable con GIN); en otras bases, JSON guardado como texto
+DatosJSON = JSON().with_variant(JSONB(), "postgresql")
+
+
 class AuditLog(Base):
     """
     Tabla de logs de auditoría.
@@ -40,16 +46,31 @@ class AuditLog(Base):
     - Qué tipo de acción (crear, editar, eliminar)
     - Qué entidad fue afectada
     - Cuál fue el ID de la entidad
-    - Detalles del cambio (valores anteriores y nuevos en JSON)
+    - Detalles del cambio (valores anteriores y nuevos en JSON; en las
+      ediciones solo los campos que cambiaron)
     - Cuándo se realizó la acción
     - IP desde donde se realizó (opcional)
+    
+    En PostgreSQL puede estar particionada por mes sobre fecha_hora (ver
+    migrate_audit_particiones.py); la clave primaria de la tabla pasa a ser
+    (id, fecha_hora), pero id sigue siendo único.
     """
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # Listado por fecha más reciente (y paginación por cursor sobre fecha, id)
+        Index("ix_audit_logs_fecha_hora_id", "fecha_hora", "id"),
+        # Historial de un registro
+        Index("ix_audit_logs_entidad_entidad_id", "entidad", "entidad_id"),
+        # Entradas que modificaron un campo (datos_nuevos ? 'campo'), solo PostgreSQL
+        Index("ix_audit_logs_datos_nuevos", "datos_nuevos", postgresql_using="gin").ddl_if(dialect="postgresql"),
+        # Búsqueda en descripción o username (search)
+        *indices_trigramas("audit_logs"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
     # Usuario que realizó la acción
-    usuario_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    usuario_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
     usuario_username = Column(String(100), nullable=True)  # Guardamos el username por si el usuario se elimina
     
     # Tipo de acción
@@ -61,8 +82,8 @@ class AuditLog(Base):
     entidad_descripcion = Column(String(255), nullable=True)  # Descripción legible (ej: "Producto: CODIGO001")
     
     # Detalles del cambio
-    datos_anteriores = Column(Text, nullable=True)  # JSON con los valores anteriores (para edición/eliminación)
-    datos_nuevos = Column(Text, nullable=True)  # JSON con los valores nuevos (para creación/edición)
+    datos_anteriores = Column(DatosJSON, nullable=True)  # Valores anteriores (para edición/eliminación)
+    datos_nuevos = Column(DatosJSON, nullable=True)  # Valores nuevos (para creación/edición)
     
     # Metadata
     fecha_hora = Column(DateTime, default=datetime.utcnow, nullable=False)
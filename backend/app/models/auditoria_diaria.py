@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Date
+from app.core.database import Base
+
+
+class AuditoriaDiaria(Base):
+    """
+    Cantidad de entradas de auditoría por día (UTC), acción, entidad y usuario.
+    Se incrementa junto con cada inserción en audit_logs (ver
+    app/core/auditoria_diaria.py), así las estadísticas de auditoría suman
+    unas pocas filas por día en lugar de recorrer audit_logs.
+    """
+    __tablename__ = "auditoria_diaria"
+
+    fecha = Column(Date, primary_key=True)
+    accion = Column(String(20), primary_key=True)
+    entidad = Column(String(50), primary_key=True)
+    usuario_username = Column(String(100), primary_key=True)
+    cantidad = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<AuditoriaDiaria {self.fecha} {self.accion} {self.entidad} {self.usuario_username}: {self.cantidad}>"
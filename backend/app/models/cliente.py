@@ -1,10 +1,13 @@
 from sqlalchemy import Column, Integer, String, Boolean, DateTime
 from sqlalchemy.sql import func
 from app.core.database import Base
+from app.core.busqueda import indices_trigramas
 
 
 class Cliente(Base):
     __tablename__ = "clientes"
+    # Búsqueda por texto parcial (search)
+    __table_args__ = indices_trigramas("clientes")
 
     id = Column(Integer, primary_key=True, index=True)
     codigo = Column(String(50), unique=True, nullable=False, index=True)
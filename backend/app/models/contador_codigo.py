@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class ContadorCodigo(Base):
+    """
+    Contador de secuencias para la generación de códigos.
+    Una fila por prefijo y año (ej: "LT" + 25). Guarda la última secuencia
+    entregada, de modo que generar un código es una lectura y escritura de
+    una sola fila bloqueada (SELECT ... FOR UPDATE) en lugar de un escaneo
+    de la tabla de la entidad.
+    """
+    __tablename__ = "contadores_codigo"
+
+    prefijo = Column(String(10), primary_key=True)
+    ano = Column(Integer, primary_key=True)  # Últimos 2 dígitos del año
+    ultimo_valor = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<ContadorCodigo {self.prefijo}{self.ano:02d} = {self.ultimo_valor}>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -40,12 +40,18 @@ class TipoEstado:
 
 class EstadoLinea(Base):
     __tablename__ = "estados_linea"
+    __table_args__ = (
+        # Timeline: estados de una línea que se solapan con un rango de fechas
+        Index("ix_estados_linea_linea_inicio_fin", "linea_id", "fecha_hora_inicio", "fecha_hora_fin"),
+        # Listado ordenado por fecha de inicio (y paginación por cursor)
+        Index("ix_estados_linea_inicio_id", "fecha_hora_inicio", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     codigo = Column(String(20), unique=True, nullable=False, index=True)
     
     # Relaciones con sector y línea
-    sector_id = Column(Integer, ForeignKey("sectores.id"), nullable=False)
+    sector_id = Column(Integer, ForeignKey("sectores.id"), nullable=False, index=True)
     linea_id = Column(Integer, ForeignKey("lineas.id"), nullable=False)
     
     # Tipo de estado
@@ -62,7 +68,7 @@ class EstadoLinea(Base):
     observaciones = Column(Text, nullable=True)
     
     # Usuario que registró el estado
-    usuario_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    usuario_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
     
     # Campos de auditoría
     activo = Column(Boolean, default=True)
@@ -11,7 +11,7 @@ class Linea(Base):
     codigo = Column(String(20), unique=True, nullable=False, index=True)
     nombre = Column(String(100), nullable=False, index=True)
     descripcion = Column(String(255), nullable=True)
-    sector_id = Column(Integer, ForeignKey("sectores.id"), nullable=False)
+    sector_id = Column(Integer, ForeignKey("sectores.id"), nullable=False, index=True)
     activo = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
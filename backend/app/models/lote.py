@@ -1,8 +1,10 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, ForeignKey, Text, Date
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, Float, ForeignKey, Text, Date, Index, text
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
 from datetime import date, timedelta
 from app.core.database import Base
+from app.core.secuencia_lote import descomponer_numero_lote
+from app.core.busqueda import indices_trigramas
 
 
 class Lote(Base):
@@ -11,6 +13,30 @@ class Lote(Base):
     Un lote está asociado a un producto y opcionalmente a un estado de línea de tipo "Producción".
     """
     __tablename__ = "lotes"
+    __table_args__ = (
+        # Último lote activo de un producto (salto de lote, sugerir número, último lote)
+        Index(
+            "ix_lotes_producto_id_activos", "producto_id", "id",
+            postgresql_where=text("activo"), sqlite_where=text("activo = 1")
+        ),
+        # Último número / número anterior de un producto (salto de lote, sugerir número)
+        Index(
+            "ix_lotes_producto_secuencia_activos", "producto_id", "numero_secuencia",
+            postgresql_where=text("activo"), sqlite_where=text("activo = 1")
+        ),
+        # Detección de lote duplicado
+        Index(
+            "ix_lotes_numero_producto_activos", "numero_lote", "producto_id",
+            postgresql_where=text("activo"), sqlite_where=text("activo = 1")
+        ),
+        # Historial por rango de fechas (y paginación por cursor sobre fecha, id)
+        Index(
+            "ix_lotes_fecha_produccion_activos", "fecha_produccion", "id",
+            postgresql_where=text("activo"), sqlite_where=text("activo = 1")
+        ),
+        # Búsqueda por número de lote parcial (search)
+        *indices_trigramas("lotes"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     codigo = Column(String(20), unique=True, nullable=False, index=True)
@@ -18,11 +44,17 @@ class Lote(Base):
     # Número de lote (ej: "2024001", "L-001", etc.)
     numero_lote = Column(String(50), nullable=False, index=True)
     
+    # Secuencia extraída de numero_lote (ej: "L-0005" -> 5, "L-", 4); se asigna
+    # sola al cambiar numero_lote. None si el número de lote no tiene dígitos
+    numero_secuencia = Column(BigInteger, nullable=True)
+    prefijo_secuencia = Column(String(50), nullable=True)
+    ancho_secuencia = Column(Integer, nullable=True)
+    
     # Producto asociado al lote
-    producto_id = Column(Integer, ForeignKey("productos.id"), nullable=False)
+    producto_id = Column(Integer, ForeignKey("productos.id"), nullable=False, index=True)
     
     # Estado de línea asociado (opcional, solo para estados tipo "produccion")
-    estado_linea_id = Column(Integer, ForeignKey("estados_linea.id"), nullable=True)
+    estado_linea_id = Column(Integer, ForeignKey("estados_linea.id"), nullable=True, index=True)
     
     # Cantidades
     pallets = Column(Integer, nullable=True, default=0)
@@ -43,7 +75,7 @@ class Lote(Base):
     observaciones = Column(Text, nullable=True)
     
     # Usuario que registró el lote
-    usuario_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    usuario_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
     
     # Campos de auditoría
     activo = Column(Boolean, default=True)
@@ -58,6 +90,15 @@ class Lote(Base):
     def __repr__(self):
         return f"<Lote {self.numero_lote} - Producto: {self.producto_id}>"
 
+    @validates("numero_lote")
+    def _asignar_secuencia(self, key, numero_lote):
+        """Mantiene las columnas de secuencia al asignar numero_lote."""
+        secuencia = descomponer_numero_lote(numero_lote)
+        self.numero_secuencia = secuencia.numero if secuencia else None
+        self.prefijo_secuencia = secuencia.prefijo if secuencia else None
+        self.ancho_secuencia = secuencia.ancho if secuencia else None
+        return numero_lote
+
     def calcular_litros_totales(self, litros_por_unidad: float = 1.0) -> float:
         """
         Calcula los litros totales basándose en pallets, parciales y litros por unidad.
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, Float, Date, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class ProduccionDiaria(Base):
+    """
+    Acumulado de producción por día y producto (solo lotes activos).
+    Se mantiene de forma incremental al crear, editar o desactivar lotes
+    (ver app/core/produccion_diaria.py), de modo que las estadísticas del
+    historial suman unas pocas filas por día en lugar de toda la tabla lotes.
+    """
+    __tablename__ = "produccion_diaria"
+
+    fecha = Column(Date, primary_key=True)
+    producto_id = Column(Integer, ForeignKey("productos.id"), primary_key=True, index=True)
+    total_lotes = Column(Integer, nullable=False, default=0)
+    total_litros = Column(Float, nullable=False, default=0.0)
+    total_pallets = Column(Integer, nullable=False, default=0)
+    total_parciales = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<ProduccionDiaria {self.fecha} - Producto: {self.producto_id} ({self.total_lotes} lotes)>"
@@ -2,10 +2,13 @@ from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, Foreig
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
+from app.core.busqueda import indices_trigramas
 
 
 class Producto(Base):
     __tablename__ = "productos"
+    # Búsqueda por texto parcial (search)
+    __table_args__ = indices_trigramas("productos")
 
     id = Column(Integer, primary_key=True, index=True)
     codigo = Column(String(50), unique=True, nullable=False, index=True)  # Auto-generado: PD250001
@@ -16,7 +19,7 @@ class Producto(Base):
     formato_lote = Column(String(50), nullable=True, index=True)
     
     # Cliente asociado
-    cliente_id = Column(Integer, ForeignKey("clientes.id"), nullable=True)
+    cliente_id = Column(Integer, ForeignKey("clientes.id"), nullable=True, index=True)
     
     # Tipo de producto (ej: HERBICIDA GRUPO 4)
     tipo_producto = Column(String(100), nullable=True)
@@ -3,6 +3,7 @@ from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from app.core.database import Base
+from app.core.busqueda import indices_trigramas
 
 
 class Role(Base):
@@ -21,6 +22,8 @@ class Role(Base):
 class User(Base):
     """Modelo de usuario."""
     __tablename__ = "users"
+    # Búsqueda por texto parcial (search)
+    __table_args__ = indices_trigramas("users")
 
     id = Column(Integer, primary_key=True, index=True)
     codigo = Column(String(20), unique=True, nullable=False, index=True)
@@ -31,7 +34,7 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     
     # Foreign key al rol
-    role_id = Column(Integer, ForeignKey("roles.id"), nullable=False)
+    role_id = Column(Integer, ForeignKey("roles.id"), nullable=False, index=True)
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
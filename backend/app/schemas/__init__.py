@@ -2,7 +2,7 @@ from app.schemas.role import RoleResponse
 from app.schemas.user import UserCreate, UserLogin, UserResponse, Token
 from app.schemas.sector import SectorCreate, SectorUpdate, SectorResponse, SectorList
 from app.schemas.linea import LineaCreate, LineaUpdate, LineaResponse, LineaList
-from app.schemas.producto import ProductoCreate, ProductoUpdate, ProductoResponse, ProductoList
+from app.schemas.producto import ProductoCreate, ProductoUpdate, ProductoResponse, ProductoList, ProductoSimple, ClienteSimple
 from app.schemas.cliente import ClienteCreate, ClienteUpdate, ClienteResponse, ClienteList
 from app.schemas.estado_linea import (
     EstadoLineaCreate,
@@ -18,10 +18,16 @@ from app.schemas.lote import (
     LoteResponse,
     LoteResponseConAdvertencias,
     LoteList,
+    LoteBulkCreate,
+    LoteBulkItem,
+    LoteBulkResponse,
     LoteWarning,
     WarningType,
     ValidacionLoteRequest,
     ValidacionLoteResponse,
+    RangoFaltante,
+    FaltantesProducto,
+    ReporteFaltantesLote,
 )
 
 __all__ = [
@@ -42,6 +48,8 @@ __all__ = [
     "ProductoUpdate",
     "ProductoResponse",
     "ProductoList",
+    "ProductoSimple",
+    "ClienteSimple",
     "ClienteCreate",
     "ClienteUpdate",
     "ClienteResponse",
@@ -57,8 +65,14 @@ __all__ = [
     "LoteResponse",
     "LoteResponseConAdvertencias",
     "LoteList",
+    "LoteBulkCreate",
+    "LoteBulkItem",
+    "LoteBulkResponse",
     "LoteWarning",
     "WarningType",
     "ValidacionLoteRequest",
     "ValidacionLoteResponse",
+    "RangoFaltante",
+    "FaltantesProducto",
+    "ReporteFaltantesLote",
 ]
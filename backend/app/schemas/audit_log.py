@@ -16,8 +16,8 @@ class AuditLogResponse(BaseModel):
     entidad: str
     entidad_id: int
     entidad_descripcion: Optional[str] = None
-    datos_anteriores: Optional[str] = None
-    datos_nuevos: Optional[str] = None
+    datos_anteriores: Optional[Dict[str, Any]] = None
+    datos_nuevos: Optional[Dict[str, Any]] = None
     fecha_hora: datetime
     ip_address: Optional[str] = None
     user_agent: Optional[str] = None
@@ -33,10 +33,11 @@ class AuditLogResponse(BaseModel):
 class AuditLogList(BaseModel):
     """Response paginada de logs de auditoría."""
     items: List[AuditLogResponse]
-    total: int
+    total: Optional[int] = None  # None en modo cursor si no se pide el total
     page: int
     size: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # Cursor de la página siguiente (modo cursor)
 
 
 class AuditLogFilters(BaseModel):
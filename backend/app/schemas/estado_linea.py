@@ -118,10 +118,11 @@ class EstadoLineaResponse(BaseModel):
 
 class EstadoLineaList(BaseModel):
     items: list[EstadoLineaResponse]
-    total: int
+    total: Optional[int] = None  # None en modo cursor si no se pide el total
     page: int
     size: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # Cursor de la página siguiente (modo cursor)
 
 
 class TipoEstadoOption(BaseModel):
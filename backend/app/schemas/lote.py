@@ -105,10 +105,11 @@ class LoteResponseConAdvertencias(BaseModel):
 class LoteList(BaseModel):
     """Schema para listado paginado de lotes."""
     items: List[LoteResponse]
-    total: int
+    total: Optional[int] = None  # None en modo cursor si no se pide el total
     page: int
     size: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # Cursor de la página siguiente (modo cursor)
 
 
 class ValidacionLoteRequest(BaseModel):
@@ -124,3 +125,51 @@ class ValidacionLoteResponse(BaseModel):
     advertencias: List[LoteWarning] = []
     lote_anterior: Optional[str] = None  # Número del lote anterior detectado
     lote_esperado: Optional[str] = None  # Número de lote esperado (si hay salto)
+
+
+class LoteBulkCreate(BaseModel):
+    """Schema para crear varios lotes en una sola operación (carga de fin de turno)."""
+    lotes: List[LoteCreate] = Field(..., min_length=1, max_length=500, description="Lotes a crear, en orden de carga")
+    ignorar_advertencias: bool = Field(False, description="Ignorar advertencias de todos los lotes y crearlos de todos modos")
+
+
+class LoteBulkItem(BaseModel):
+    """Resultado de un lote dentro de la carga masiva."""
+    indice: int  # Posición del lote en la lista enviada
+    numero_lote: str
+    lote: Optional[LoteResponse] = None
+    advertencias: List[LoteWarning] = []
+    creado: bool = False
+
+
+class LoteBulkResponse(BaseModel):
+    """Schema de respuesta para la carga masiva de lotes."""
+    items: List[LoteBulkItem]
+    creados: int = 0
+    creado: bool = False
+    mensaje: Optional[str] = None
+
+
+class RangoFaltante(BaseModel):
+    """Números de lote consecutivos que faltan en la secuencia de un producto."""
+    desde: int
+    hasta: int
+    cantidad: int
+    lote_anterior: Optional[str] = None  # Último lote antes del hueco (None si falta desde el 1)
+    lote_siguiente: str  # Primer lote después del hueco
+
+
+class FaltantesProducto(BaseModel):
+    """Huecos en la secuencia de lotes de un producto."""
+    producto_id: int
+    producto_codigo: Optional[str] = None
+    producto_nombre: Optional[str] = None
+    rangos: List[RangoFaltante]
+    total_faltantes: int
+
+
+class ReporteFaltantesLote(BaseModel):
+    """Reporte de saltos de lote de todos los productos."""
+    productos: List[FaltantesProducto]
+    total_productos: int
+    total_faltantes: int
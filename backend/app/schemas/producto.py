@@ -13,6 +13,16 @@ class ClienteSimple(BaseModel):
         from_attributes = True
 
 
+class ProductoSimple(BaseModel):
+    """Schema mínimo de producto (autocompletar)."""
+    id: int
+    codigo: str
+    nombre: str
+
+    class Config:
+        from_attributes = True
+
+
 class ProductoBase(BaseModel):
     nombre: str = Field(..., min_length=1, max_length=200)
     descripcion: Optional[str] = Field(None, max_length=500)
@@ -151,7 +161,8 @@ class ProductoResponse(ProductoBase):
 
 class ProductoList(BaseModel):
     items: list[ProductoResponse]
-    total: int
+    total: Optional[int] = None  # None en modo cursor si no se pide el total
     page: int
     size: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # Cursor de la página siguiente (modo cursor)
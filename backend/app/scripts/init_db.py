@@ -12,7 +12,8 @@ import os
 # Agregar el directorio backend al path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from app.core.database import engine, SessionLocal, Base
+from app.core.busqueda import crear_tablas
+from app.core.database import SessionLocal
 from app.core.security import get_password_hash
 from app.core.id_generator import generar_codigo_usuario, generar_codigo_rol
 from app.models.user import User, Role
@@ -26,8 +27,10 @@ def init_database():
     """Inicializa la base de datos con tablas, roles y usuario admin."""
     
     print("🔧 Creando tablas en la base de datos...")
-    Base.metadata.create_all(bind=engine)
+    creadas = crear_tablas()
     print("✅ Tablas creadas correctamente.")
+    if creadas:
+        print(f"✅ Índices de búsqueda creados: {', '.join(creadas)}")
     
     db = SessionLocal()
     
@@ -0,0 +1,99 @@
+"""
+Prueba de carga de los endpoints de lectura más usados.
+
+Lanza requests concurrentes contra un servidor en ejecución y muestra
+requests/segundo y latencias p50/p95 por endpoint. Sirve para comparar
+el rendimiento antes y después de cambios en el acceso a la base
+(ej: endpoints sync vs async).
+
+Uso:
+    cd backend
+    uvicorn main:app --workers 1 &
+    python benchmark_carga.py --url http://localhost:8000 --usuario admin --password admin123
+    python benchmark_carga.py --concurrencia 50 --requests 500
+"""
+import argparse
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+
+ENDPOINTS = [
+    "/api/lotes?page=1&size=20",
+    "/api/historial?page=1&size=20",
+    "/api/auditoria?page=1&size=20",
+    f"/api/estados-linea/timeline/{date.today().isoformat()}",
+]
+
+
+def _login(url: str, usuario: str, password: str) -> str:
+    """Obtiene un token de acceso."""
+    datos = json.dumps({"username": usuario, "password": password}).encode("utf-8")
+    request = urllib.request.Request(
+        f"{url}/api/auth/login",
+        data=datos,
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    with urllib.request.urlopen(request) as respuesta:
+        return json.loads(respuesta.read())["access_token"]
+
+
+def _pedir(url: str, token: str) -> tuple:
+    """Ejecuta un GET y retorna (segundos, código de estado)."""
+    request = urllib.request.Request(url, headers={"Authorization": f"Bearer {token}"})
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as respuesta:
+            respuesta.read()
+            codigo = respuesta.status
+    except urllib.error.HTTPError as e:
+        codigo = e.code
+    except urllib.error.URLError:
+        codigo = 0
+    return time.perf_counter() - inicio, codigo
+
+
+def _percentil(valores: list, p: float) -> float:
+    """Percentil p (0-100) de una lista ordenada."""
+    if not valores:
+        return 0.0
+    indice = min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))
+    return valores[indice]
+
+
+def benchmark(url: str, token: str, concurrencia: int, total: int):
+    """Imprime throughput y latencias de cada endpoint."""
+    print(f"Concurrencia: {concurrencia} | Requests por endpoint: {total}\n")
+    print(f"{'Endpoint':<50} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errores':>8}")
+    print("-" * 86)
+
+    with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+        for endpoint in ENDPOINTS:
+            destino = f"{url}{endpoint}"
+            inicio = time.perf_counter()
+            resultados = list(executor.map(lambda _: _pedir(destino, token), range(total)))
+            duracion = time.perf_counter() - inicio
+
+            latencias = sorted(segundos * 1000 for segundos, _ in resultados)
+            errores = sum(1 for _, codigo in resultados if codigo != 200)
+            print(
+                f"{endpoint[:50]:<50} {total / duracion:>8.1f} "
+                f"{statistics.median(latencias):>8.1f} {_percentil(latencias, 95):>8.1f} {errores:>8}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de carga de endpoints de lectura")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--usuario", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--concurrencia", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    benchmark(args.url, _login(args.url, args.usuario, args.password), args.concurrencia, args.requests)
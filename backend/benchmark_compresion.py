@@ -0,0 +1,78 @@
+"""
+Benchmark de compresión de respuestas.
+
+Para los endpoints con respuestas más grandes, compara el tamaño
+transferido y la latencia sin compresión, con gzip y con brotli.
+
+Uso:
+    cd backend
+    uvicorn main:app &
+    python benchmark_compresion.py --url http://localhost:8000 --usuario admin --password admin123
+"""
+import sys
+import os
+import argparse
+import statistics
+import time
+import urllib.request
+from datetime import date
+
+# Agregar el directorio backend al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_carga import _login
+
+ENDPOINTS = [
+    "/api/historial?page=1&size=100",
+    f"/api/estados-linea/timeline/{date.today().isoformat()}",
+    "/api/productos?page=1&size=1000",
+    "/api/historial/exportar/csv",
+]
+
+CODIFICACIONES = ["identity", "gzip", "br"]
+
+REPETICIONES = 10
+
+
+def _medir(url: str, token: str, codificacion: str) -> tuple:
+    """Retorna (bytes recibidos, Content-Encoding, latencia media en ms)."""
+    tamano, encoding, tiempos = 0, None, []
+    for _ in range(REPETICIONES):
+        request = urllib.request.Request(url, headers={
+            "Authorization": f"Bearer {token}",
+            "Accept-Encoding": codificacion,
+        })
+        inicio = time.perf_counter()
+        with urllib.request.urlopen(request) as respuesta:
+            # urllib no descomprime: se mide lo que viaja por la red
+            tamano = len(respuesta.read())
+            encoding = respuesta.headers.get("Content-Encoding")
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tamano, encoding, statistics.mean(tiempos)
+
+
+def benchmark(url: str, token: str):
+    """Imprime tamaño y latencia de cada endpoint por codificación."""
+    print(f"{'Endpoint':<45} {'Accept-Encoding':>15} {'Recibido':>12} {'Encoding':>9} {'ms':>8}")
+    print("-" * 93)
+    for endpoint in ENDPOINTS:
+        sin_comprimir = None
+        for codificacion in CODIFICACIONES:
+            tamano, encoding, latencia = _medir(f"{url}{endpoint}", token, codificacion)
+            sin_comprimir = sin_comprimir or tamano
+            ratio = f" ({tamano / sin_comprimir:.0%})" if sin_comprimir else ""
+            print(
+                f"{endpoint[:45]:<45} {codificacion:>15} {tamano:>8} B{ratio:<7} "
+                f"{encoding or '-':>9} {latencia:>8.1f}"
+            )
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de compresión de respuestas")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--usuario", default="admin")
+    parser.add_argument("--password", default="admin123")
+    args = parser.parse_args()
+
+    benchmark(args.url, _login(args.url, args.usuario, args.password))
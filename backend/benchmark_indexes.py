@@ -0,0 +1,126 @@
+"""
+Benchmark de las consultas más frecuentes para comparar planes de ejecución
+antes y después de crear los índices compuestos.
+
+Muestra el plan (EXPLAIN ANALYZE en PostgreSQL, EXPLAIN QUERY PLAN en SQLite)
+y el tiempo promedio de cada consulta, con las mismas formas que usan los
+endpoints.
+
+Uso:
+    cd backend
+    python benchmark_indexes.py > antes.txt
+    python migrate_add_indexes.py
+    python benchmark_indexes.py > despues.txt
+    diff antes.txt despues.txt
+"""
+import sys
+import os
+import time
+from datetime import datetime, time as dtime
+
+# Agregar el directorio backend al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import select, func, desc
+from app.core.database import engine
+from app.models import Lote, EstadoLinea, AuditLog
+
+REPETICIONES = 20
+
+
+def _valores_de_ejemplo(conn) -> dict:
+    """Toma valores reales de la base para armar las consultas."""
+    lote = conn.execute(
+        select(Lote.producto_id, Lote.numero_lote, Lote.fecha_produccion)
+        .order_by(desc(Lote.id)).limit(1)
+    ).first()
+    estado = conn.execute(
+        select(EstadoLinea.linea_id, EstadoLinea.fecha_hora_inicio)
+        .order_by(desc(EstadoLinea.id)).limit(1)
+    ).first()
+    auditoria = conn.execute(
+        select(AuditLog.entidad, AuditLog.entidad_id)
+        .order_by(desc(AuditLog.id)).limit(1)
+    ).first()
+
+    fecha_estado = estado.fecha_hora_inicio.date() if estado else datetime.now().date()
+    return {
+        "producto_id": lote.producto_id if lote else 1,
+        "numero_lote": lote.numero_lote if lote else "001",
+        "fecha_produccion": lote.fecha_produccion if lote else datetime.now().date(),
+        "linea_id": estado.linea_id if estado else 1,
+        "inicio_dia": datetime.combine(fecha_estado, dtime.min),
+        "fin_dia": datetime.combine(fecha_estado, dtime.max),
+        "entidad": auditoria.entidad if auditoria else "lote",
+        "entidad_id": auditoria.entidad_id if auditoria else 1,
+    }
+
+
+def _consultas(v: dict) -> list:
+    """Consultas con la misma forma que las de los endpoints."""
+    return [
+        ("Último lote del producto (detectar_salto_lote)",
+         select(Lote.id, Lote.numero_lote)
+         .where(Lote.producto_id == v["producto_id"], Lote.activo == True)
+         .order_by(desc(Lote.id)).limit(1)),
+        ("Lote duplicado (detectar_lote_duplicado)",
+         select(Lote.id)
+         .where(Lote.numero_lote == v["numero_lote"], Lote.producto_id == v["producto_id"], Lote.activo == True)
+         .limit(1)),
+        ("Historial por rango de fechas",
+         select(Lote.id)
+         .where(Lote.activo == True, Lote.fecha_produccion >= v["fecha_produccion"])
+         .order_by(desc(Lote.fecha_produccion)).limit(20)),
+        ("Timeline de una línea",
+         select(EstadoLinea.id)
+         .where(
+             EstadoLinea.linea_id == v["linea_id"],
+             EstadoLinea.fecha_hora_inicio <= v["fin_dia"],
+             (EstadoLinea.fecha_hora_fin >= v["inicio_dia"]) | (EstadoLinea.fecha_hora_fin == None)
+         )
+         .order_by(EstadoLinea.fecha_hora_inicio)),
+        ("Auditoría más reciente",
+         select(AuditLog.id).order_by(desc(AuditLog.fecha_hora)).limit(20)),
+        ("Auditoría de un registro",
+         select(AuditLog.id)
+         .where(AuditLog.entidad == v["entidad"], AuditLog.entidad_id == v["entidad_id"])),
+        ("Conteo de lotes por producto (eliminar_producto)",
+         select(func.count(Lote.id)).where(Lote.producto_id == v["producto_id"])),
+    ]
+
+
+def _ejecutar(conn, prefijo: str, stmt):
+    """Ejecuta la sentencia compilada con un prefijo opcional (EXPLAIN)."""
+    compilada = stmt.compile(dialect=engine.dialect)
+    if compilada.positional:
+        parametros = tuple(compilada.params[nombre] for nombre in compilada.positiontup)
+    else:
+        parametros = compilada.params
+    return conn.exec_driver_sql(f"{prefijo}{compilada}", parametros).fetchall()
+
+
+def benchmark():
+    """Imprime el plan y el tiempo promedio de cada consulta."""
+    es_postgres = engine.dialect.name == "postgresql"
+    explain = "EXPLAIN (ANALYZE, BUFFERS) " if es_postgres else "EXPLAIN QUERY PLAN "
+
+    with engine.connect() as conn:
+        valores = _valores_de_ejemplo(conn)
+
+        for nombre, stmt in _consultas(valores):
+            print("=" * 70)
+            print(nombre)
+            print("=" * 70)
+
+            for fila in _ejecutar(conn, explain, stmt):
+                print("  " + " | ".join(str(columna) for columna in fila))
+
+            inicio = time.perf_counter()
+            for _ in range(REPETICIONES):
+                _ejecutar(conn, "", stmt)
+            promedio_ms = (time.perf_counter() - inicio) * 1000 / REPETICIONES
+            print(f"\n  ⏱️ Promedio: {promedio_ms:.3f} ms ({REPETICIONES} ejecuciones)\n")
+
+
+if __name__ == "__main__":
+    benchmark()
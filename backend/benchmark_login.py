@@ -0,0 +1,78 @@
+"""
+Micro-benchmark del costo de bcrypt en el login.
+
+Mide cuántas verificaciones de contraseña (logins) por segundo soporta un
+worker con el costo configurado, en serie y a través del pool de hashing
+con varios logins simultáneos (ej: cambio de turno).
+
+Uso:
+    cd backend
+    python benchmark_login.py
+    BCRYPT_ROUNDS=10 PASSWORD_HASH_WORKERS=2 python benchmark_login.py --logins 80
+"""
+import sys
+import os
+import argparse
+import asyncio
+import time
+
+# Agregar el directorio backend al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core.security import get_password_hash, verify_password, verify_password_async
+
+PASSWORD = "contraseña-de-prueba"
+
+
+def _en_serie(hash_guardado: str, logins: int) -> float:
+    """Logins por segundo verificando de a uno."""
+    inicio = time.perf_counter()
+    for _ in range(logins):
+        verify_password(PASSWORD, hash_guardado)
+    return logins / (time.perf_counter() - inicio)
+
+
+async def _concurrente(hash_guardado: str, logins: int) -> float:
+    """Logins por segundo con todos los logins lanzados a la vez."""
+    inicio = time.perf_counter()
+    await asyncio.gather(*(verify_password_async(PASSWORD, hash_guardado) for _ in range(logins)))
+    return logins / (time.perf_counter() - inicio)
+
+
+async def _latencia_event_loop(hash_guardado: str, logins: int) -> float:
+    """Máximo retraso (ms) de una tarea periódica mientras se procesan los logins."""
+    retraso_maximo = 0.0
+    terminado = False
+
+    async def latido():
+        nonlocal retraso_maximo
+        while not terminado:
+            esperado = time.perf_counter() + 0.01
+            await asyncio.sleep(0.01)
+            retraso_maximo = max(retraso_maximo, time.perf_counter() - esperado)
+
+    tarea = asyncio.create_task(latido())
+    await _concurrente(hash_guardado, logins)
+    terminado = True
+    await tarea
+    return retraso_maximo * 1000
+
+
+def benchmark(logins: int):
+    """Imprime logins/segundo en serie y concurrente."""
+    hash_guardado = get_password_hash(PASSWORD)
+    print(f"BCRYPT_ROUNDS={settings.BCRYPT_ROUNDS} | PASSWORD_HASH_WORKERS={settings.PASSWORD_HASH_WORKERS}")
+    print(f"Logins simulados: {logins}\n")
+
+    print(f"  En serie:      {_en_serie(hash_guardado, logins):8.1f} logins/s")
+    print(f"  Concurrente:   {asyncio.run(_concurrente(hash_guardado, logins)):8.1f} logins/s")
+    print(f"  Retraso máximo del event loop: {asyncio.run(_latencia_event_loop(hash_guardado, logins)):.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmark de bcrypt")
+    parser.add_argument("--logins", type=int, default=40)
+    args = parser.parse_args()
+
+    benchmark(args.logins)
@@ -1,8 +1,7 @@
 """Script para crear las tablas en la base de datos."""
-from app.core.database import engine, Base
-from app.models import *
+from app.core.busqueda import crear_tablas
 
 if __name__ == "__main__":
     print("Creando tablas en la base de datos...")
-    Base.metadata.create_all(bind=engine)
+    crear_tablas()
     print("Tablas creadas exitosamente!")
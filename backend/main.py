@@ -13,19 +13,46 @@ from app.api.lotes import router as lotes_router
 from app.api.historial import router as historial_router
 from app.api.auditoria import router as auditoria_router
 from app.core.config import settings
-from app.core.database import engine, SessionLocal, Base
-from app.core.security import get_password_hash
+from app.core.compresion import CompresionMiddleware
+from app.core.database import engine, SessionLocal, pool_stats, dispose_async_engine
+from app.core.security import get_password_hash, cerrar_pool_hash
+from app.core.eventos import broadcaster
+from app.core.audit_cola import escritor_auditoria
+from app.core.autocompletar import indice_productos, indice_clientes
+from app.core.catalogos import CATALOGOS
+from app.core.deps import usuarios_cache
+from app.core.invalidacion import bus_invalidacion
+from app.core.ultimo_lote import ultimos_lotes_cache
 from app.core.id_generator import generar_codigo_usuario, generar_codigo_rol
+from app.core.produccion_diaria import reconstruir_produccion_diaria
+from app.core.auditoria_diaria import reconstruir_auditoria_diaria
+from app.core.audit_particiones import asegurar_particiones, es_particionada
+from app.core.busqueda import crear_tablas
 from app.models.user import User, Role
+from app.models import Lote, ProduccionDiaria, AuditLog, AuditoriaDiaria
 
 
 def init_database():
     """Inicializa la base de datos con tablas, roles y usuario admin."""
     print("🔧 Inicializando base de datos...")
     
-    # Crear todas las tablas
-    Base.metadata.create_all(bind=engine)
+    # Crear todas las tablas (con pg_trgm y las tablas FTS5 de búsqueda)
+    creadas = crear_tablas()
     print("✅ Tablas verificadas/creadas.")
+    if creadas:
+        print(f"✅ Índices de búsqueda creados: {', '.join(creadas)}")
+    
+    # audit_logs particionada: que existan las particiones de los próximos meses
+    # (si falla, la API inicia igual: las inserciones caen en la partición por defecto)
+    if engine.dialect.name == "postgresql":
+        try:
+            with engine.connect() as conn:
+                if es_particionada(conn):
+                    creadas = asegurar_particiones(conn, settings.AUDIT_PARTICIONES_ADELANTE)
+                    if creadas:
+                        print(f"✅ Particiones de auditoría creadas: {', '.join(creadas)}")
+        except Exception as e:
+            print(f"❌ No se pudieron crear las particiones de auditoría: {e}")
     
     db = SessionLocal()
     
@@ -65,6 +92,18 @@ def init_database():
             db.commit()
             print(f"  ✅ Usuario admin creado (usuario: admin, contraseña: admin123)")
         
+        # Primer arranque con el acumulado diario: calcularlo desde los lotes existentes
+        if not db.query(ProduccionDiaria).first() and db.query(Lote).filter(Lote.activo == True).first():
+            filas = reconstruir_produccion_diaria(db)
+            db.commit()
+            print(f"  ✅ Acumulado de producción diaria generado ({filas} filas)")
+        
+        # Primer arranque con los contadores de auditoría: calcularlos desde los logs
+        if not db.query(AuditoriaDiaria).first() and db.query(AuditLog).first():
+            filas = reconstruir_auditoria_diaria(db)
+            db.commit()
+            print(f"  ✅ Contadores de auditoría generados ({filas} filas)")
+        
         print("🎉 Base de datos inicializada correctamente.")
         
     except Exception as e:
@@ -78,7 +117,15 @@ def init_database():
 async def lifespan(app: FastAPI):
     """Inicialización al arrancar la aplicación."""
     init_database()
+    broadcaster.iniciar()
+    if settings.AUDIT_MODO == "cola":
+        escritor_auditoria.iniciar()
     yield
+    broadcaster.detener()
+    # Insertar (o guardar en disco) la auditoría pendiente antes de cerrar el pool
+    escritor_auditoria.detener()
+    await dispose_async_engine()
+    cerrar_pool_hash()
 
 
 app = FastAPI(
@@ -98,6 +145,16 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Compresión de respuestas JSON/CSV grandes (incluye la exportación CSV en streaming)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompresionMiddleware,
+        tamano_minimo=settings.COMPRESSION_MIN_SIZE,
+        media_types=settings.compression_media_types_list,
+        nivel_gzip=settings.COMPRESSION_GZIP_LEVEL,
+        calidad_brotli=settings.COMPRESSION_BROTLI_QUALITY,
+    )
+
 # Incluir routers
 app.include_router(auth_router, prefix="/api")
 app.include_router(users_router, prefix="/api")
@@ -117,6 +174,36 @@ def health_check():
     return {"status": "ok"}
 
 
+@app.get("/health/db")
+def health_db():
+    """Estado del pool de conexiones a la base de datos de este worker."""
+    return {"status": "ok", "pool": pool_stats()}
+
+
+@app.get("/health/auditoria")
+def health_auditoria():
+    """Estado de la cola de auditoría de este worker (AUDIT_MODO=cola)."""
+    if not escritor_auditoria.activo:
+        return {"status": "ok", "modo": settings.AUDIT_MODO}
+    return {"status": "ok", **escritor_auditoria.stats()}
+
+
+@app.get("/health/cache")
+def health_cache():
+    """Uso de los caches en memoria de este worker (hits/misses por cache)."""
+    return {
+        "status": "ok",
+        "caches": [
+            usuarios_cache.stats(),
+            ultimos_lotes_cache.stats(),
+            *[catalogo.stats() for catalogo in CATALOGOS],
+            indice_productos.stats(),
+            indice_clientes.stats(),
+        ],
+        "invalidacion": bus_invalidacion.stats(),
+    }
+
+
 @app.get("/")
 def root():
     """Endpoint raíz."""
@@ -0,0 +1,59 @@
+"""
+Mantenimiento de las particiones de audit_logs (solo PostgreSQL).
+
+- Crea las particiones del mes actual y de los AUDIT_PARTICIONES_ADELANTE
+  meses siguientes.
+- Archiva las particiones anteriores a AUDIT_RETENCION_MESES: las separa de
+  la tabla, las exporta a AUDIT_ARCHIVO_DIR/<partición>.csv.gz y las elimina.
+
+Pensado para ejecutarse una vez por día (cron o tarea programada de Railway).
+
+Uso:
+    cd backend
+    python mantener_auditoria.py [--sin-archivar]
+"""
+import sys
+import os
+import argparse
+
+# Agregar el directorio backend al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.audit_particiones import archivar_particiones, asegurar_particiones, es_particionada
+from app.core.config import settings
+from app.core.database import engine
+
+
+def mantener(archivar: bool = True):
+    """Crea las particiones próximas y archiva las vencidas."""
+
+    print("🔧 Mantenimiento de audit_logs...")
+
+    if engine.dialect.name != "postgresql":
+        print("  ⚠️ El particionado solo aplica a PostgreSQL")
+        return
+
+    with engine.connect() as conn:
+        if not es_particionada(conn):
+            print("  ⚠️ audit_logs no está particionada (ver migrate_audit_particiones.py)")
+            return
+
+        creadas = asegurar_particiones(conn, settings.AUDIT_PARTICIONES_ADELANTE)
+        print(f"  ✅ Particiones creadas: {', '.join(creadas) or 'ninguna'}")
+
+        if archivar and settings.AUDIT_RETENCION_MESES > 0:
+            archivos = archivar_particiones(conn, settings.AUDIT_RETENCION_MESES, settings.AUDIT_ARCHIVO_DIR)
+            for ruta in archivos:
+                print(f"  📦 Archivada: {ruta}")
+            if not archivos:
+                print("  ✅ No hay particiones para archivar")
+
+    print("\n🎉 Proceso completado!")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mantenimiento de particiones de auditoría")
+    parser.add_argument("--sin-archivar", action="store_true", help="Solo crear particiones")
+    args = parser.parse_args()
+
+    mantener(archivar=not args.sin_archivar)
@@ -0,0 +1,101 @@
+"""
+Script de migración para crear los índices compuestos y parciales
+en una base de datos existente.
+
+Los índices coinciden con los declarados en los modelos (create_all los crea
+en bases nuevas). En PostgreSQL se crean con CREATE INDEX CONCURRENTLY para
+no bloquear las escrituras sobre tablas grandes mientras se construyen.
+
+Uso:
+    cd backend
+    python migrate_add_indexes.py
+
+Para comparar los planes de ejecución antes y después, ver benchmark_indexes.py.
+"""
+import sys
+import os
+
+# Agregar el directorio backend al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from app.core.database import engine
+
+
+# (nombre, tabla, columnas, condición del índice parcial o None)
+INDICES = [
+    # Lotes: último lote activo por producto (salto de lote / sugerir número)
+    ("ix_lotes_producto_id_activos", "lotes", "producto_id, id", "activo"),
+    # Lotes: detección de duplicados
+    ("ix_lotes_numero_producto_activos", "lotes", "numero_lote, producto_id", "activo"),
+    # Lotes: historial por fecha de producción
+    ("ix_lotes_fecha_produccion_activos", "lotes", "fecha_produccion, id", "activo"),
+    # Lotes: claves foráneas
+    ("ix_lotes_producto_id", "lotes", "producto_id", None),
+    ("ix_lotes_estado_linea_id", "lotes", "estado_linea_id", None),
+    ("ix_lotes_usuario_id", "lotes", "usuario_id", None),
+    # Estados de línea: timeline por línea y rango de fechas
+    ("ix_estados_linea_linea_inicio_fin", "estados_linea", "linea_id, fecha_hora_inicio, fecha_hora_fin", None),
+    # Estados de línea: listado por fecha de inicio
+    ("ix_estados_linea_inicio_id", "estados_linea", "fecha_hora_inicio, id", None),
+    # Estados de línea: claves foráneas
+    ("ix_estados_linea_sector_id", "estados_linea", "sector_id", None),
+    ("ix_estados_linea_usuario_id", "estados_linea", "usuario_id", None),
+    # Auditoría: listado por fecha y consulta por registro
+    ("ix_audit_logs_fecha_hora_id", "audit_logs", "fecha_hora, id", None),
+    ("ix_audit_logs_entidad_entidad_id", "audit_logs", "entidad, entidad_id", None),
+    ("ix_audit_logs_usuario_id", "audit_logs", "usuario_id", None),
+    # Otras claves foráneas
+    ("ix_lineas_sector_id", "lineas", "sector_id", None),
+    ("ix_productos_cliente_id", "productos", "cliente_id", None),
+    ("ix_users_role_id", "users", "role_id", None),
+]
+
+
+def add_indexes():
+    """Crea los índices que no existen todavía."""
+
+    print("🔧 Creando índices...")
+
+    es_postgres = engine.dialect.name == "postgresql"
+
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for nombre, tabla, columnas, condicion in INDICES:
+            if es_postgres:
+                # Un CONCURRENTLY interrumpido deja el índice marcado como inválido:
+                # se elimina para volver a crearlo
+                invalido = conn.execute(text("""
+                    SELECT 1 FROM pg_index i
+                    JOIN pg_class c ON c.oid = i.indexrelid
+                    WHERE c.relname = :nombre AND NOT i.indisvalid
+                """), {"nombre": nombre}).fetchone()
+                if invalido:
+                    print(f"  ⚠️ Índice '{nombre}' inválido, se vuelve a crear")
+                    conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {nombre}"))
+
+                sql = f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} ON {tabla} ({columnas})"
+                if condicion:
+                    sql += f" WHERE {condicion}"
+            else:
+                sql = f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} ({columnas})"
+                if condicion:
+                    sql += f" WHERE {condicion} = 1"
+
+            try:
+                conn.execute(text(sql))
+                print(f"  ✅ Índice '{nombre}' creado/verificado")
+            except Exception as e:
+                print(f"  ⚠️ Advertencia en índice '{nombre}': {e}")
+
+        if es_postgres:
+            # Actualizar estadísticas para que el planificador use los índices nuevos
+            for tabla in sorted({tabla for _, tabla, _, _ in INDICES}):
+                conn.execute(text(f"ANALYZE {tabla}"))
+            print("  ✅ Estadísticas actualizadas (ANALYZE)")
+
+    print("\n🎉 Proceso completado!")
+
+
+if __name__ == "__main__":
+    add_indexes()
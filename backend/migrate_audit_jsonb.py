@@ -0,0 +1,168 @@
+"""
+Script de migración de los datos de auditoría a JSONB.
+
+- PostgreSQL: convierte datos_anteriores y datos_nuevos de TEXT a JSONB y
+  crea el índice GIN ix_audit_logs_datos_nuevos (consultas por campo
+  modificado). La conversión se hace en lotes sobre columnas nuevas, con
+  un commit por lote, para no bloquear audit_logs durante toda la
+  migración; solo el cambio final de columnas toma un lock exclusivo.
+- Otras bases (SQLite): el JSON sigue guardado como texto; solo se reescriben
+  los datos al formato nuevo.
+
+En ambos casos las ediciones antiguas pasan a guardar solo los campos que
+cambiaron y las creaciones omiten los campos vacíos.
+
+Uso:
+    cd backend
+    python migrate_audit_jsonb.py [--lote 5000]
+"""
+import sys
+import os
+import argparse
+import json
+
+# Agregar el directorio backend al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from app.core.audit import diferencias
+from app.core.database import engine
+
+
+def _cargar(valor):
+    """Texto JSON (o JSON ya decodificado) a diccionario."""
+    if valor is None or isinstance(valor, dict):
+        return valor
+    try:
+        return json.loads(valor)
+    except (TypeError, ValueError):
+        # Conservar el contenido aunque no sea JSON válido
+        return {"_texto": valor}
+
+
+def _convertir(accion: str, anterior, nuevo) -> tuple:
+    """Datos de una entrada en el formato nuevo: (anteriores, nuevos)."""
+    anterior, nuevo = _cargar(anterior), _cargar(nuevo)
+    if accion == "editar" and anterior and nuevo:
+        anterior, nuevo = diferencias(anterior, nuevo)
+    elif accion == "crear" and nuevo:
+        nuevo = {key: valor for key, valor in nuevo.items() if valor is not None}
+    return anterior or None, nuevo or None
+
+
+def _a_texto(datos):
+    return json.dumps(datos, ensure_ascii=False, default=str) if datos is not None else None
+
+
+def _convertir_lotes(conn, destino_anteriores: str, destino_nuevos: str, cast: str, tamano: int, desde_id: int = 0) -> int:
+    """
+    Recorre audit_logs por id desde desde_id y escribe los datos convertidos en
+    las columnas destino, un commit por lote. Retorna el último id procesado.
+    """
+    ultimo_id = desde_id
+    total = 0
+    while True:
+        filas = conn.execute(text("""
+            SELECT id, accion, datos_anteriores, datos_nuevos FROM audit_logs
+            WHERE id > :ultimo ORDER BY id LIMIT :tamano
+        """), {"ultimo": ultimo_id, "tamano": tamano}).all()
+        if not filas:
+            return ultimo_id
+
+        valores = []
+        for id_, accion, anterior, nuevo in filas:
+            anterior, nuevo = _convertir(accion, anterior, nuevo)
+            valores.append({"id": id_, "anterior": _a_texto(anterior), "nuevo": _a_texto(nuevo)})
+
+        conn.execute(text(f"""
+            UPDATE audit_logs
+            SET {destino_anteriores} = {cast.format(":anterior")},
+                {destino_nuevos} = {cast.format(":nuevo")}
+            WHERE id = :id
+        """), valores)
+        conn.commit()
+
+        ultimo_id = filas[-1][0]
+        total += len(filas)
+        print(f"  ... {total} entradas convertidas (id <= {ultimo_id})")
+
+
+def migrar_postgres(tamano: int):
+    with engine.connect() as conn:
+        tipo = conn.execute(text("""
+            SELECT data_type FROM information_schema.columns
+            WHERE table_name = 'audit_logs' AND column_name = 'datos_nuevos'
+        """)).scalar()
+
+        if tipo == "jsonb":
+            print("  ✅ Las columnas ya son JSONB")
+        else:
+            conn.execute(text("""
+                ALTER TABLE audit_logs
+                ADD COLUMN IF NOT EXISTS datos_anteriores_jsonb JSONB,
+                ADD COLUMN IF NOT EXISTS datos_nuevos_jsonb JSONB
+            """))
+            conn.commit()
+
+            ultimo_id = _convertir_lotes(
+                conn, "datos_anteriores_jsonb", "datos_nuevos_jsonb", "CAST({} AS JSONB)", tamano
+            )
+
+            # Cambio de columnas: bloquear escrituras, convertir lo insertado
+            # mientras tanto y reemplazar las columnas en la misma transacción
+            conn.execute(text("LOCK TABLE audit_logs IN ACCESS EXCLUSIVE MODE"))
+            filas = conn.execute(text("""
+                SELECT id, accion, datos_anteriores, datos_nuevos FROM audit_logs WHERE id > :ultimo
+            """), {"ultimo": ultimo_id}).all()
+            for id_, accion, anterior, nuevo in filas:
+                anterior, nuevo = _convertir(accion, anterior, nuevo)
+                conn.execute(text("""
+                    UPDATE audit_logs
+                    SET datos_anteriores_jsonb = CAST(:anterior AS JSONB), datos_nuevos_jsonb = CAST(:nuevo AS JSONB)
+                    WHERE id = :id
+                """), {"id": id_, "anterior": _a_texto(anterior), "nuevo": _a_texto(nuevo)})
+            conn.execute(text("""
+                ALTER TABLE audit_logs
+                DROP COLUMN datos_anteriores,
+                DROP COLUMN datos_nuevos
+            """))
+            conn.execute(text("ALTER TABLE audit_logs RENAME COLUMN datos_anteriores_jsonb TO datos_anteriores"))
+            conn.execute(text("ALTER TABLE audit_logs RENAME COLUMN datos_nuevos_jsonb TO datos_nuevos"))
+            conn.commit()
+            print("  ✅ Columnas convertidas a JSONB")
+
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_audit_logs_datos_nuevos "
+            "ON audit_logs USING gin (datos_nuevos)"
+        ))
+        conn.execute(text("ANALYZE audit_logs"))
+        print("  ✅ Índice GIN 'ix_audit_logs_datos_nuevos' creado/verificado")
+
+
+def migrar_texto(tamano: int):
+    with engine.connect() as conn:
+        _convertir_lotes(conn, "datos_anteriores", "datos_nuevos", "{}", tamano)
+    print("  ✅ Datos de auditoría reescritos (JSON como texto)")
+
+
+def migrate(tamano: int):
+    """Convierte los datos de auditoría existentes al formato nuevo."""
+
+    print("🔧 Migrando datos de auditoría...")
+
+    if engine.dialect.name == "postgresql":
+        migrar_postgres(tamano)
+    else:
+        migrar_texto(tamano)
+
+    print("\n🎉 Proceso completado!")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migración de auditoría a JSONB")
+    parser.add_argument("--lote", type=int, default=5000, help="Entradas por transacción")
+    args = parser.parse_args()
+
+    migrate(args.lote)
@@ -0,0 +1,146 @@
+"""
+Script de migración para particionar audit_logs por mes (solo PostgreSQL).
+
+Crea una tabla particionada por rango de fecha_hora con una partición por
+mes (desde el log más antiguo hasta AUDIT_PARTICIONES_ADELANTE meses
+adelante, más una partición por defecto), copia los logs mes a mes con un
+commit por mes y al final reemplaza la tabla con un lock breve, copiando
+antes los logs que todavía falten (los insertados durante la migración,
+aunque tengan un id menor: el escritor en bloque no confirma en orden de id).
+
+La clave primaria pasa a ser (id, fecha_hora): PostgreSQL exige que incluya
+la columna de partición. Los ids siguen saliendo de la misma secuencia.
+
+La tabla original queda como audit_logs_anterior; eliminarla con
+DROP TABLE audit_logs_anterior después de verificar la migración.
+
+Requiere haber ejecutado antes migrate_audit_jsonb.py.
+
+Uso:
+    cd backend
+    python migrate_audit_particiones.py
+
+Después, programar mantener_auditoria.py para crear las particiones
+siguientes y archivar las antiguas.
+"""
+import sys
+import os
+from datetime import date
+
+# Agregar el directorio backend al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from app.core.audit_particiones import crear_particiones, es_particionada, inicio_mes, sumar_meses
+from app.core.busqueda import activar_trigramas
+from app.core.config import settings
+from app.core.database import engine
+
+NUEVA = "audit_logs_nueva"
+
+# (nombre, definición) de los índices de la tabla particionada
+INDICES = [
+    ("ix_audit_logs_fecha_hora_id", "(fecha_hora, id)"),
+    ("ix_audit_logs_entidad_entidad_id", "(entidad, entidad_id)"),
+    ("ix_audit_logs_usuario_id", "(usuario_id)"),
+    ("ix_audit_logs_datos_nuevos", "USING gin (datos_nuevos)"),
+    ("ix_audit_logs_entidad_descripcion_trgm", "USING gin (entidad_descripcion gin_trgm_ops)"),
+    ("ix_audit_logs_usuario_username_trgm", "USING gin (usuario_username gin_trgm_ops)"),
+]
+
+# Índices de la tabla original que se renombran para liberar los nombres
+INDICES_ANTERIORES = [nombre for nombre, _ in INDICES] + ["ix_audit_logs_id"]
+
+
+def migrate():
+    """Convierte audit_logs en una tabla particionada por mes."""
+
+    print("🔧 Particionando audit_logs...")
+
+    if engine.dialect.name != "postgresql":
+        print("  ⚠️ El particionado solo aplica a PostgreSQL; no se hizo ningún cambio")
+        return
+
+    with engine.connect() as conn:
+        if es_particionada(conn):
+            print("  ✅ audit_logs ya está particionada")
+            return
+
+        tipo = conn.execute(text("""
+            SELECT data_type FROM information_schema.columns
+            WHERE table_name = 'audit_logs' AND column_name = 'datos_nuevos'
+        """)).scalar()
+        if tipo != "jsonb":
+            print("  ❌ Ejecutar primero migrate_audit_jsonb.py")
+            return
+
+        # Los índices de búsqueda usan pg_trgm
+        activar_trigramas(conn)
+        conn.commit()
+
+        ultimo_id, minimo = conn.execute(text("SELECT max(id), min(fecha_hora) FROM audit_logs")).one()
+        ultimo_id = ultimo_id or 0
+        hoy = date.today()
+
+        # 1. Tabla particionada con las mismas columnas y defaults (incluida la secuencia del id)
+        conn.execute(text(f"DROP TABLE IF EXISTS {NUEVA} CASCADE"))
+        conn.execute(text(f"CREATE TABLE {NUEVA} (LIKE audit_logs INCLUDING DEFAULTS) PARTITION BY RANGE (fecha_hora)"))
+        conn.execute(text(f"ALTER TABLE {NUEVA} ADD PRIMARY KEY (id, fecha_hora)"))
+        conn.execute(text(f"ALTER TABLE {NUEVA} ADD FOREIGN KEY (usuario_id) REFERENCES users (id)"))
+        conn.commit()
+
+        desde = inicio_mes(minimo.date() if minimo else hoy)
+        hasta = sumar_meses(inicio_mes(hoy), settings.AUDIT_PARTICIONES_ADELANTE)
+        creadas = crear_particiones(conn, desde, hasta, tabla=NUEVA)
+        print(f"  ✅ {len(creadas)} particiones mensuales creadas ({desde:%Y-%m} a {hasta:%Y-%m})")
+
+        # 2. Copia mes a mes de los logs existentes
+        mes = desde
+        while mes <= inicio_mes(hoy):
+            copiados = conn.execute(text(f"""
+                INSERT INTO {NUEVA} SELECT * FROM audit_logs
+                WHERE fecha_hora >= :desde AND fecha_hora < :hasta AND id <= :ultimo
+            """), {"desde": mes, "hasta": sumar_meses(mes, 1), "ultimo": ultimo_id}).rowcount
+            conn.commit()
+            print(f"  ... {mes:%Y-%m}: {copiados} logs copiados")
+            mes = sumar_meses(mes, 1)
+        # Fechas fuera de rango (ej: relojes adelantados) van a la partición por defecto
+        conn.execute(text(f"""
+            INSERT INTO {NUEVA} SELECT * FROM audit_logs
+            WHERE fecha_hora >= :desde AND id <= :ultimo
+        """), {"desde": sumar_meses(inicio_mes(hoy), 1), "ultimo": ultimo_id})
+        conn.commit()
+
+        # 3. Índices con los nombres definitivos (cada partición recibe el suyo)
+        for nombre in INDICES_ANTERIORES:
+            conn.execute(text(f"ALTER INDEX IF EXISTS {nombre} RENAME TO {nombre}_anterior"))
+        conn.commit()
+        for nombre, definicion in INDICES:
+            conn.execute(text(f"CREATE INDEX {nombre} ON {NUEVA} {definicion}"))
+            conn.commit()
+            print(f"  ✅ Índice '{nombre}' creado")
+
+        # 4. Reemplazo: copiar los logs que falten en la nueva y renombrar
+        conn.execute(text("LOCK TABLE audit_logs IN ACCESS EXCLUSIVE MODE"))
+        faltantes = conn.execute(text(f"""
+            INSERT INTO {NUEVA} SELECT * FROM audit_logs a
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {NUEVA} n WHERE n.id = a.id AND n.fecha_hora = a.fecha_hora
+            )
+        """)).rowcount
+        print(f"  ✅ {faltantes} logs insertados durante la migración copiados")
+        conn.execute(text("ALTER TABLE audit_logs RENAME TO audit_logs_anterior"))
+        conn.execute(text(f"ALTER TABLE {NUEVA} RENAME TO audit_logs"))
+        conn.execute(text("ALTER SEQUENCE IF EXISTS audit_logs_id_seq OWNED BY audit_logs.id"))
+        conn.commit()
+
+        conn.execute(text("ANALYZE audit_logs"))
+        conn.commit()
+
+    print("  ✅ audit_logs reemplazada por la tabla particionada")
+    print("  ℹ️ La tabla original quedó como audit_logs_anterior")
+    print("\n🎉 Proceso completado!")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,98 @@
+"""
+Script de migración para crear los índices de búsqueda por texto parcial.
+
+- PostgreSQL: activa pg_trgm y crea los índices GIN de trigramas de
+  COLUMNAS_BUSQUEDA con CREATE INDEX CONCURRENTLY (sin bloquear escrituras).
+  Si audit_logs está particionada, el índice se crea en cada partición y se
+  adjunta al de la tabla (las particiones nuevas lo reciben solas).
+- SQLite: crea las tablas FTS5 de búsqueda y sus triggers.
+
+Se puede volver a ejecutar: solo crea lo que falte.
+
+Uso:
+    cd backend
+    python migrate_busqueda.py
+"""
+import sys
+import os
+
+# Agregar el directorio backend al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from app.core.audit_particiones import es_particionada
+from app.core.busqueda import (
+    COLUMNAS_BUSQUEDA,
+    activar_trigramas,
+    crear_indices_busqueda,
+    nombre_indice_trigramas,
+)
+from app.core.database import engine
+
+
+def particiones_adjuntas(conn, tabla: str) -> list:
+    return list(conn.execute(text("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = :tabla
+        ORDER BY c.relname
+    """), {"tabla": tabla}).scalars())
+
+
+def crear_indices_postgres():
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        activar_trigramas(conn)
+        print("  ✅ Extensión pg_trgm activada")
+
+        for tabla, columnas in COLUMNAS_BUSQUEDA.items():
+            particionada = tabla == "audit_logs" and es_particionada(conn)
+            for columna in columnas:
+                nombre = nombre_indice_trigramas(tabla, columna)
+                if not particionada:
+                    conn.execute(text(
+                        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} "
+                        f"ON {tabla} USING gin ({columna} gin_trgm_ops)"
+                    ))
+                    print(f"  ✅ Índice '{nombre}' creado/verificado")
+                    continue
+
+                # Tabla particionada: índice solo en la tabla (inválido hasta adjuntar
+                # el de cada partición), creado partición por partición
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS {nombre} "
+                    f"ON ONLY {tabla} USING gin ({columna} gin_trgm_ops)"
+                ))
+                for particion in particiones_adjuntas(conn, tabla):
+                    indice_particion = f"{particion}_{columna}_trgm"
+                    conn.execute(text(
+                        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {indice_particion} "
+                        f"ON {particion} USING gin ({columna} gin_trgm_ops)"
+                    ))
+                    conn.execute(text(f"ALTER INDEX {nombre} ATTACH PARTITION {indice_particion}"))
+                print(f"  ✅ Índice '{nombre}' creado/verificado (por partición)")
+
+        conn.execute(text(f"ANALYZE {', '.join(COLUMNAS_BUSQUEDA)}"))
+
+
+def migrate():
+    """Crea los índices de búsqueda por texto."""
+
+    print("🔧 Creando índices de búsqueda...")
+
+    if engine.dialect.name == "postgresql":
+        crear_indices_postgres()
+    else:
+        with engine.begin() as conn:
+            creadas = crear_indices_busqueda(conn)
+        for nombre in creadas:
+            print(f"  ✅ Tabla FTS5 '{nombre}' creada")
+        if not creadas:
+            print("  ✅ Tablas FTS5 ya existen")
+
+    print("\n🎉 Proceso completado!")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,118 @@
+"""
+Script de migración para agregar el número de secuencia a los lotes.
+
+Agrega las columnas numero_secuencia, prefijo_secuencia y ancho_secuencia,
+las completa a partir de numero_lote en lotes (un commit por lote, para no
+bloquear la tabla) y crea el índice (producto_id, numero_secuencia) de los
+lotes activos. Se puede volver a ejecutar: solo completa las filas que
+falten.
+
+Uso:
+    cd backend
+    python migrate_lotes_secuencia.py [--lote 5000]
+"""
+import sys
+import os
+import argparse
+
+# Agregar el directorio backend al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import inspect, text
+from app.core.database import engine
+from app.core.secuencia_lote import descomponer_numero_lote
+
+COLUMNAS = [
+    ("numero_secuencia", "BIGINT"),
+    ("prefijo_secuencia", "VARCHAR(50)"),
+    ("ancho_secuencia", "INTEGER"),
+]
+
+INDICE = "ix_lotes_producto_secuencia_activos"
+
+
+def agregar_columnas():
+    existentes = {columna["name"] for columna in inspect(engine).get_columns("lotes")}
+    with engine.begin() as conn:
+        for nombre, tipo in COLUMNAS:
+            if nombre in existentes:
+                print(f"  ✅ Columna '{nombre}' ya existe")
+                continue
+            conn.execute(text(f"ALTER TABLE lotes ADD COLUMN {nombre} {tipo}"))
+            print(f"  ✅ Columna '{nombre}' agregada")
+
+
+def completar_secuencias(tamano: int):
+    """Calcula la secuencia de los lotes que no la tienen, por bloques de id."""
+    ultimo_id = 0
+    total = 0
+    with engine.connect() as conn:
+        while True:
+            # ancho_secuencia queda NULL solo si no se calculó (o el lote no tiene dígitos)
+            filas = conn.execute(text("""
+                SELECT id, numero_lote FROM lotes
+                WHERE id > :ultimo AND ancho_secuencia IS NULL
+                ORDER BY id LIMIT :tamano
+            """), {"ultimo": ultimo_id, "tamano": tamano}).all()
+            if not filas:
+                break
+
+            valores = []
+            for id_, numero_lote in filas:
+                secuencia = descomponer_numero_lote(numero_lote)
+                if secuencia:
+                    valores.append({
+                        "id": id_,
+                        "numero": secuencia.numero,
+                        "prefijo": secuencia.prefijo,
+                        "ancho": secuencia.ancho,
+                    })
+            if valores:
+                conn.execute(text("""
+                    UPDATE lotes
+                    SET numero_secuencia = :numero, prefijo_secuencia = :prefijo, ancho_secuencia = :ancho
+                    WHERE id = :id
+                """), valores)
+            conn.commit()
+
+            ultimo_id = filas[-1][0]
+            total += len(valores)
+            print(f"  ... {total} lotes completados (id <= {ultimo_id})")
+
+
+def crear_indice():
+    es_postgres = engine.dialect.name == "postgresql"
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if es_postgres:
+            conn.execute(text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDICE} "
+                "ON lotes (producto_id, numero_secuencia) WHERE activo"
+            ))
+            conn.execute(text("ANALYZE lotes"))
+        else:
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {INDICE} "
+                "ON lotes (producto_id, numero_secuencia) WHERE activo = 1"
+            ))
+    print(f"  ✅ Índice '{INDICE}' creado/verificado")
+
+
+def migrate(tamano: int):
+    """Agrega y completa el número de secuencia de los lotes."""
+
+    print("🔧 Migrando número de secuencia de lotes...")
+
+    agregar_columnas()
+    completar_secuencias(tamano)
+    crear_indice()
+
+    print("\n🎉 Proceso completado!")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migración del número de secuencia de lotes")
+    parser.add_argument("--lote", type=int, default=5000, help="Lotes por transacción")
+    args = parser.parse_args()
+
+    migrate(args.lote)
@@ -0,0 +1,47 @@
+"""
+Reconstruye los contadores diarios de auditoría (tabla auditoria_diaria)
+a partir de audit_logs.
+
+Los contadores se mantienen solo al registrar auditoría desde la API.
+Ejecutar este script después de cargar o borrar logs directamente en la
+base, o si las estadísticas de auditoría no coinciden con los logs.
+
+Uso:
+    cd backend
+    python rebuild_auditoria_diaria.py
+"""
+import sys
+import os
+
+# Agregar el directorio backend al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import engine, SessionLocal, Base
+from app.core.auditoria_diaria import reconstruir_auditoria_diaria
+from app.models import AuditoriaDiaria
+
+
+def rebuild():
+    """Crea la tabla si no existe y recalcula los contadores en una transacción."""
+
+    print("🔧 Reconstruyendo auditoria_diaria...")
+
+    Base.metadata.create_all(bind=engine, tables=[AuditoriaDiaria.__table__])
+
+    db = SessionLocal()
+    try:
+        filas = reconstruir_auditoria_diaria(db)
+        db.commit()
+        print(f"  ✅ {filas} filas (día, acción, entidad, usuario) generadas")
+    except Exception as e:
+        db.rollback()
+        print(f"  ❌ Error: {e}")
+        raise
+    finally:
+        db.close()
+
+    print("\n🎉 Proceso completado!")
+
+
+if __name__ == "__main__":
+    rebuild()
@@ -0,0 +1,47 @@
+"""
+Reconstruye el acumulado de producción diaria (tabla produccion_diaria)
+a partir de los lotes activos.
+
+El acumulado se mantiene solo al crear, editar o eliminar lotes desde la API.
+Ejecutar este script después de cargar o corregir lotes directamente en la
+base, o si las estadísticas del historial no coinciden con los lotes.
+
+Uso:
+    cd backend
+    python rebuild_produccion_diaria.py
+"""
+import sys
+import os
+
+# Agregar el directorio backend al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import engine, SessionLocal, Base
+from app.core.produccion_diaria import reconstruir_produccion_diaria
+from app.models import ProduccionDiaria
+
+
+def rebuild():
+    """Crea la tabla si no existe y recalcula el acumulado en una transacción."""
+
+    print("🔧 Reconstruyendo produccion_diaria...")
+
+    Base.metadata.create_all(bind=engine, tables=[ProduccionDiaria.__table__])
+
+    db = SessionLocal()
+    try:
+        filas = reconstruir_produccion_diaria(db)
+        db.commit()
+        print(f"  ✅ {filas} filas (día, producto) generadas")
+    except Exception as e:
+        db.rollback()
+        print(f"  ❌ Error: {e}")
+        raise
+    finally:
+        db.close()
+
+    print("\n🎉 Proceso completado!")
+
+
+if __name__ == "__main__":
+    rebuild()
@@ -0,0 +1,126 @@
+"""
+Verificación de la paginación por cursor del historial.
+
+Crea una base SQLite temporal con lotes que empatan en cada campo de orden y
+con created_at guardado en los dos formatos que aparecen en una base real
+(CURRENT_TIMESTAMP sin microsegundos y valores escritos por SQLAlchemy con
+microsegundos). Recorre el historial con cursor para cada orden_campo
+permitido, en ambas direcciones, y comprueba que:
+
+- se entregan todos los lotes, cada uno una sola vez (sin repetir páginas);
+- el orden es el mismo que el del modo con OFFSET.
+
+Uso:
+    cd backend
+    python verificar_cursor_historial.py
+"""
+import sys
+import os
+import asyncio
+import tempfile
+from datetime import date
+
+# Base temporal: se define antes de importar la aplicación
+_directorio = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_directorio, 'verificar_cursor.db')}"
+
+# Agregar el directorio backend al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from app.core.database import engine, Base, get_async_db, dispose_async_engine
+import app.models  # noqa: F401 (registra todas las tablas)
+from app.api.historial import ORDEN_CAMPOS, get_historial
+
+TOTAL_LOTES = 23
+TAMANO_PAGINA = 4
+
+
+def crear_datos():
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO productos (id, codigo, nombre, activo) VALUES (1, 'P1', 'Producto', 1)"))
+        for i in range(1, TOTAL_LOTES + 1):
+            conn.execute(text(
+                "INSERT INTO lotes (id, codigo, numero_lote, producto_id, fecha_produccion, activo, litros_totales) "
+                "VALUES (:id, :codigo, :numero, 1, :fecha, 1, :litros)"
+            ), {
+                "id": i,
+                "codigo": f"L{i:04d}",
+                "numero": f"{i % 5:03d}",
+                "fecha": date(2024, 1, 1 + i % 3),
+                "litros": None if i % 7 == 0 else float(i % 4),
+            })
+        # created_at en los dos formatos, con empates en cada uno
+        conn.execute(text("UPDATE lotes SET created_at = '2024-01-01 10:00:00' WHERE id % 3 = 0"))
+        conn.execute(text("UPDATE lotes SET created_at = '2024-01-01 10:00:00.250000' WHERE id % 3 = 1"))
+        conn.execute(text("UPDATE lotes SET created_at = '2024-01-01 09:59:59.999999' WHERE id % 3 = 2"))
+
+
+async def _pagina(db, orden_campo: str, orden_direccion: str, page: int = 1, size: int = TAMANO_PAGINA, cursor=None):
+    return await get_historial(
+        page=page, size=size, fecha_desde=None, fecha_hasta=None, producto_id=None, numero_lote=None,
+        orden_campo=orden_campo, orden_direccion=orden_direccion, cursor=cursor, db=db, current_user=None
+    )
+
+
+async def recorrer(orden_campo: str, orden_direccion: str) -> list:
+    """Ids en el orden en que los entrega el cursor (corta si no termina)."""
+    generador = get_async_db()
+    db = await generador.__anext__()
+    try:
+        ids, cursor = [], ""
+        for _ in range(TOTAL_LOTES + 1):
+            respuesta = await _pagina(db, orden_campo, orden_direccion, cursor=cursor)
+            ids.extend(item.id for item in respuesta.items)
+            if not respuesta.next_cursor:
+                break
+            cursor = respuesta.next_cursor
+        return ids
+    finally:
+        await generador.aclose()
+
+
+async def verificar() -> bool:
+    correcto = True
+    for orden_campo in ORDEN_CAMPOS:
+        for orden_direccion in ("asc", "desc"):
+            ids = await recorrer(orden_campo, orden_direccion)
+            completo = sorted(ids) == list(range(1, TOTAL_LOTES + 1))
+            if completo:
+                print(f"  ✅ {orden_campo} {orden_direccion}: {len(ids)} lotes, sin repetidos")
+            else:
+                correcto = False
+                print(f"  ❌ {orden_campo} {orden_direccion}: {ids}")
+            # Los valores de orden deben quedar monótonos en la dirección pedida
+            generador = get_async_db()
+            db = await generador.__anext__()
+            try:
+                todos = (await _pagina(db, orden_campo, orden_direccion, size=100)).items
+            finally:
+                await generador.aclose()
+            valores = {item.id: getattr(item, orden_campo) for item in todos}
+            secuencia = [valores[i] for i in ids if i in valores]
+            if orden_campo == "litros_totales":
+                secuencia = [v or 0 for v in secuencia]
+            esperado = sorted(secuencia, reverse=orden_direccion == "desc")
+            if secuencia != esperado:
+                correcto = False
+                print(f"  ❌ {orden_campo} {orden_direccion}: orden incorrecto {secuencia}")
+    return correcto
+
+
+def main():
+    print("🔧 Verificando la paginación por cursor del historial...")
+    crear_datos()
+    correcto = asyncio.run(verificar())
+    asyncio.run(dispose_async_engine())
+    engine.dispose()
+    if not correcto:
+        print("\n❌ La paginación por cursor no recorre todos los lotes")
+        sys.exit(1)
+    print("\n🎉 Proceso completado!")
+
+
+if __name__ == "__main__":
+    main()
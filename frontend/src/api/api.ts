@@ -413,14 +413,33 @@ export interface TimelineSector {
 export interface TimelineResponse {
   fecha: string;
   sectores: TimelineSector[];
-  estados: TimelineEstado[];
+  // Se omite con incluir_estados=false (los estados ya vienen en cada línea)
+  estados?: TimelineEstado[];
   tipos_estado: TipoEstadoOption[];
 }
 
 export interface TimelineParams {
   sector_id?: number;
   linea_id?: number;
-}
+  incluir_estados?: boolean;
+}
+
+// Mensajes del canal de eventos del timeline (SSE)
+export type TimelineEvento =
+  | { tipo: "estado"; estado: TimelineEstado }
+  | { tipo: "estado_eliminado"; id: number }
+  | {
+      tipo: "lote";
+      accion: "creado" | "actualizado" | "eliminado";
+      lote: {
+        id: number;
+        numero_lote: string;
+        producto_id: number;
+        estado_linea_id: number | null;
+        fecha_produccion: string;
+      };
+    }
+  | { tipo: "resync" };
 
 // Interfaces para Lotes
 export type WarningType = 'lote_duplicado' | 'salto_lote' | 'fecha_muy_antigua' | 'fecha_futura';
@@ -431,6 +450,13 @@ export interface LoteWarning {
   detalle: string | null;
 }
 
+// Producto en /productos/autocomplete
+export interface ProductoOpcion {
+  id: number;
+  codigo: string;
+  nombre: string;
+}
+
 export interface ProductoSimple {
   id: number;
   codigo: string;
@@ -613,6 +639,12 @@ export const productosApi = {
     return response.data;
   },
 
+  // Solo id, código y nombre (índice en memoria del backend)
+  autocomplete: async (q = "", limite = 20): Promise<ProductoOpcion[]> => {
+    const response = await api.get<ProductoOpcion[]>("/productos/autocomplete", { params: { q, limite } });
+    return response.data;
+  },
+
   get: async (id: number): Promise<Producto> => {
     const response = await api.get<Producto>(`/productos/${id}`);
     return response.data;
@@ -640,6 +672,12 @@ export const clientesApi = {
     return response.data;
   },
 
+  // Solo id, código y nombre (índice en memoria del backend)
+  autocomplete: async (q = "", limite = 20): Promise<ClienteSimple[]> => {
+    const response = await api.get<ClienteSimple[]>("/clientes/autocomplete", { params: { q, limite } });
+    return response.data;
+  },
+
   get: async (id: number): Promise<Cliente> => {
     const response = await api.get<Cliente>(`/clientes/${id}`);
     return response.data;
@@ -695,6 +733,36 @@ export const estadosLineaApi = {
     const response = await api.get<TimelineResponse>(`/estados-linea/timeline/${fecha}`, { params });
     return response.data;
   },
+
+  // Suscribe a los cambios del timeline de un día. Retorna la conexión para cerrarla.
+  // onReconectado se llama cuando la conexión se recupera tras un corte
+  // (pudieron perderse eventos: conviene recargar el timeline).
+  subscribeTimeline: (
+    fecha: string,
+    params: TimelineParams,
+    onEvento: (evento: TimelineEvento) => void,
+    onReconectado?: () => void
+  ): EventSource => {
+    const query = new URLSearchParams({ token: localStorage.getItem("token") || "" });
+    if (params.sector_id) query.set("sector_id", String(params.sector_id));
+    if (params.linea_id) query.set("linea_id", String(params.linea_id));
+
+    const source = new EventSource(`${API_URL}/estados-linea/timeline/${fecha}/eventos?${query}`);
+    let conectado = false;
+    let cortado = false;
+    source.onopen = () => {
+      if (conectado && cortado) onReconectado?.();
+      conectado = true;
+      cortado = false;
+    };
+    source.onerror = () => {
+      cortado = true;
+    };
+    source.onmessage = (event) => {
+      onEvento(JSON.parse(event.data) as TimelineEvento);
+    };
+    return source;
+  },
 };
 
 // Funciones para Lotes
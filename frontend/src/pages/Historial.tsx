@@ -3,7 +3,7 @@ import { History, Download, Search, Package, Droplets, LayoutGrid, Tag } from "l
 import { historialApi, productosApi } from "../api/api";
 import type {
   Lote,
-  Producto,
+  ProductoOpcion,
   HistorialResponse,
   HistorialEstadisticas,
   HistorialParams,
@@ -13,7 +13,7 @@ import "./Historial.css";
 export default function Historial() {
   const [lotes, setLotes] = useState<Lote[]>([]);
   const [estadisticas, setEstadisticas] = useState<HistorialEstadisticas | null>(null);
-  const [productos, setProductos] = useState<Producto[]>([]);
+  const [productos, setProductos] = useState<ProductoOpcion[]>([]);
   const [loading, setLoading] = useState(true);
   const [exporting, setExporting] = useState(false);
   const [error, setError] = useState<string | null>(null);
@@ -36,8 +36,7 @@ export default function Historial() {
   // Cargar productos para el filtro
   const loadProductos = useCallback(async () => {
     try {
-      const response = await productosApi.list({ size: 1000, activo: true });
-      setProductos(response.items);
+      setProductos(await productosApi.autocomplete("", 1000));
     } catch (err) {
       console.error("Error loading productos:", err);
     }
@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback, useMemo } from "react";
+import { useState, useEffect, useCallback, useMemo, useRef } from "react";
 import {
   Calendar,
   ChevronLeft,
@@ -17,6 +17,8 @@ import type {
   TimelineResponse,
   TimelineEstado,
   TimelineSector,
+  TimelineParams,
+  TimelineEvento,
   Sector,
   Linea,
 } from "../api/api";
@@ -89,7 +91,7 @@ function Timeline() {
     setLoading(true);
     setError(null);
     try {
-      const params: { sector_id?: number; linea_id?: number } = {};
+      const params: TimelineParams = { incluir_estados: false };
       if (selectedSectorId) params.sector_id = selectedSectorId as number;
       if (selectedLineaId) params.linea_id = selectedLineaId as number;
 
@@ -107,6 +109,71 @@ function Timeline() {
     loadTimelineData();
   }, [loadTimelineData]);
 
+  // Último timeline cargado, para consultarlo al recibir eventos sin re-suscribir
+  const timelineRef = useRef<TimelineResponse | null>(null);
+  useEffect(() => {
+    timelineRef.current = timelineData;
+  }, [timelineData]);
+
+  // Aplicar un cambio recibido por el canal de eventos sin recargar todo el timeline
+  const aplicarEvento = useCallback(
+    (evento: TimelineEvento) => {
+      if (evento.tipo === "resync") {
+        loadTimelineData();
+        return;
+      }
+      if (evento.tipo !== "estado" && evento.tipo !== "estado_eliminado") return;
+
+      if (evento.tipo === "estado") {
+        const lineaVisible = timelineRef.current?.sectores.some((sector) =>
+          sector.lineas.some((linea) => linea.id === evento.estado.linea_id)
+        );
+        if (!lineaVisible) {
+          // Línea que no está en pantalla (nueva o reactivada): recargar
+          loadTimelineData();
+          return;
+        }
+      }
+
+      const idEstado = evento.tipo === "estado" ? evento.estado.id : evento.id;
+      setTimelineData((actual) => {
+        if (!actual) return actual;
+        return {
+          ...actual,
+          sectores: actual.sectores.map((sector) => ({
+            ...sector,
+            lineas: sector.lineas.map((linea) => {
+              const estados = linea.estados.filter((e) => e.id !== idEstado);
+              if (evento.tipo === "estado" && linea.id === evento.estado.linea_id) {
+                estados.push(evento.estado);
+                estados.sort((a, b) => a.fecha_hora_inicio.localeCompare(b.fecha_hora_inicio));
+              } else if (estados.length === linea.estados.length) {
+                return linea;
+              }
+              return { ...linea, estados };
+            }),
+          })),
+        };
+      });
+    },
+    [loadTimelineData]
+  );
+
+  // Suscripción a cambios en tiempo real del día y filtros seleccionados
+  useEffect(() => {
+    const params: TimelineParams = {};
+    if (selectedSectorId) params.sector_id = selectedSectorId as number;
+    if (selectedLineaId) params.linea_id = selectedLineaId as number;
+
+    const source = estadosLineaApi.subscribeTimeline(
+      selectedDate,
+      params,
+      aplicarEvento,
+      loadTimelineData
+    );
+    return () => source.close();
+  }, [selectedDate, selectedSectorId, selectedLineaId, aplicarEvento, loadTimelineData]);
+
   // Actualizar hora actual cada minuto
   useEffect(() => {
     const interval = setInterval(() => {
@@ -12,8 +12,8 @@ interface AuditLog {
   entidad: string;
   entidad_id: number;
   entidad_descripcion: string | null;
-  datos_anteriores: string | null;
-  datos_nuevos: string | null;
+  datos_anteriores: Record<string, unknown> | null;
+  datos_nuevos: Record<string, unknown> | null;
   fecha_hora: string;
   ip_address: string | null;
   user_agent: string | null;
@@ -142,14 +142,9 @@ export default function Auditoria() {
     }
   };
 
-  const formatJSON = (jsonString: string | null) => {
-    if (!jsonString) return null;
-    try {
-      const parsed = JSON.parse(jsonString);
-      return JSON.stringify(parsed, null, 2);
-    } catch {
-      return jsonString;
-    }
+  const formatJSON = (datos: Record<string, unknown> | null) => {
+    if (!datos) return null;
+    return JSON.stringify(datos, null, 2);
   };
 
   const clearFilters = () => {